@@ -3,23 +3,68 @@ Encryption API Routes
 """
 
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from itertools import chain
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+from urllib.parse import quote
 import base64
+import json
 import mimetypes
 
 from app.core.encryption import encryption_engine
-from app.core.emoji_encoder import emoji_encoder
+from app.core.executor import CryptoTimeoutError
+from app.core.admission import AdmissionRejected
+from app.core.emoji_encoder import EmojiStreamReader, dense_length, emoji_encoder, encode_chunks
 from app.core.config import settings
+from app.core import streaming
 from app.schemas.encryption import (
     EncryptTextRequest, EncryptTextResponse,
+    EncryptBatchRequest, EncryptBatchResponse,
     DecryptTextRequest, DecryptTextResponse,
     EncryptFileResponse, DecryptFileRequest, DecryptFileResponse,
-    EncryptedData, FileMetadata
+    RewrapRequest, RewrapResponse, EncryptedData, FileMetadata
 )
 
 router = APIRouter()
 
 
+BUSY_ERRORS = (CryptoTimeoutError, AdmissionRejected)
+
+
+def busy_error(e: Exception) -> HTTPException:
+    """503 for crypto work that was rejected or could not finish in time"""
+    retry_after = getattr(e, "retry_after", 1)
+    return HTTPException(
+        status_code=503,
+        detail=f"Encryption service busy, please retry: {str(e)}",
+        headers={"Retry-After": str(retry_after)}
+    )
+
+
+def validate_extension(filename: str) -> None:
+    """Reject file types outside ALLOWED_EXTENSIONS"""
+    file_ext = f".{filename.rsplit('.', 1)[-1].lower()}" if '.' in filename else ''
+    if file_ext not in settings.ALLOWED_EXTENSIONS.split(','):
+        raise HTTPException(
+            status_code=400,
+            detail=f"File type not allowed. Allowed: {settings.ALLOWED_EXTENSIONS}"
+        )
+
+
+def compression_policy(compress: Optional[bool]) -> Optional[str]:
+    """Per-request compression flag to an engine policy (None = server default)"""
+    if compress is None:
+        return None
+    return "auto" if compress else "off"
+
+
+def content_disposition(filename: str) -> str:
+    """Attachment header that survives non-ASCII filenames"""
+    fallback = filename.encode('ascii', 'replace').decode('ascii').replace('"', '')
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+
 @router.post("/text/encrypt", response_model=EncryptTextResponse)
 async def encrypt_text(request: EncryptTextRequest):
     """
@@ -28,10 +73,19 @@ async def encrypt_text(request: EncryptTextRequest):
     - **plaintext**: Text to encrypt
     - **password**: Encryption password
     - **use_emoji**: Convert to emoji format (optional)
+    - **additional_passwords**: Further recipients; the text is encrypted once
+      with a key slot per password (optional)
+    - **compress**: Compress before encrypting (optional, defaults to the server
+      setting); leave off when the text mixes secrets with attacker-controlled input
     """
     try:
         # Encrypt
-        encrypted_data = encryption_engine.encrypt(request.plaintext, request.password)
+        passwords = [request.password, *request.additional_passwords]
+        encrypted_data = await encryption_engine.encrypt_async(
+            request.plaintext,
+            passwords if len(passwords) > 1 else request.password,
+            compression=compression_policy(request.compress)
+        )
         
         response_data = {
             "success": True,
@@ -46,6 +100,54 @@ async def encrypt_text(request: EncryptTextRequest):
         
         return response_data
         
+    except BUSY_ERRORS as e:
+        raise busy_error(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Encryption failed: {str(e)}")
+
+
+@router.post("/text/encrypt-batch", response_model=EncryptBatchResponse)
+async def encrypt_text_batch(request: EncryptBatchRequest):
+    """
+    Encrypt many text messages under one password
+    
+    The key is derived once for the whole batch; each message gets its own
+    nonce and can be decrypted individually with /text/decrypt.
+    
+    - **plaintexts**: Texts to encrypt
+    - **password**: Encryption password
+    - **use_emoji**: Convert each item to emoji format (optional)
+    """
+    if len(request.plaintexts) > settings.MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch too large (max {settings.MAX_BATCH_SIZE} messages)"
+        )
+    
+    try:
+        encrypted_items = await encryption_engine.encrypt_many_async(
+            request.plaintexts,
+            request.password,
+            compression=compression_policy(request.compress)
+        )
+        
+        items = []
+        for encrypted_data in encrypted_items:
+            item = {"encrypted_data": encrypted_data}
+            if request.use_emoji:
+                item["emoji"] = emoji_encoder.encode(encrypted_data)
+            items.append(item)
+        
+        return {
+            "success": True,
+            "count": len(items),
+            "items": items
+        }
+        
+    except BUSY_ERRORS as e:
+        raise busy_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Encryption failed: {str(e)}")
 
@@ -58,11 +160,27 @@ async def decrypt_text(request: DecryptTextRequest):
     - **password**: Decryption password
     - **emoji**: Emoji-encoded ciphertext (OR provide ciphertext components)
     - **ciphertext**, **salt**, **nonce**, **tag**: Individual components
+    - **mode**, **key_slots**: Multi-recipient payloads (instead of salt)
     """
     try:
         # Determine if emoji format or standard
         if request.emoji:
             encrypted_data = emoji_encoder.decode(request.emoji)
+        elif request.key_slots:
+            if not all([request.ciphertext, request.nonce, request.tag]):
+                raise HTTPException(
+                    status_code=400,
+                    detail="Multi-recipient payloads need ciphertext, nonce, tag and key_slots"
+                )
+            encrypted_data = {
+                "mode": request.mode,
+                "ciphertext": request.ciphertext,
+                "nonce": request.nonce,
+                "tag": request.tag,
+                "cipher": request.cipher,
+                "compression": request.compression,
+                "key_slots": [slot.model_dump(exclude_none=True) for slot in request.key_slots]
+            }
         else:
             if not all([request.ciphertext, request.salt, request.nonce, request.tag]):
                 raise HTTPException(
@@ -74,17 +192,24 @@ async def decrypt_text(request: DecryptTextRequest):
                 "salt": request.salt,
                 "nonce": request.nonce,
                 "tag": request.tag,
-                "kdf": request.kdf
+                "kdf": request.kdf,
+                "kdf_params": request.kdf_params,
+                "cipher": request.cipher,
+                "compression": request.compression
             }
         
         # Decrypt
-        plaintext = encryption_engine.decrypt(encrypted_data, request.password)
+        plaintext = await encryption_engine.decrypt_async(encrypted_data, request.password)
         
         return {
             "success": True,
             "plaintext": plaintext
         }
         
+    except HTTPException:
+        raise
+    except BUSY_ERRORS as e:
+        raise busy_error(e)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -94,13 +219,22 @@ async def decrypt_text(request: DecryptTextRequest):
 @router.post("/file/encrypt", response_model=EncryptFileResponse)
 async def encrypt_file(
     file: UploadFile = File(...),
-    password: str = Form(...)
+    password: str = Form(...),
+    envelope: bool = Form(False),
+    additional_passwords: List[str] = Form([]),
+    compress: Optional[bool] = Form(None)
 ):
     """
     Encrypt file with password
     
     - **file**: File to encrypt (TXT, PDF, PNG, JPG)
     - **password**: Encryption password
+    - **envelope**: Encrypt under a random data key wrapped by the password,
+      so the password can later be changed via /file/rewrap (optional)
+    - **additional_passwords**: Further recipients (repeat the field); the file
+      is encrypted once with a key slot per password (optional)
+    - **compress**: Compress before encrypting (optional, defaults to the server
+      setting; already-compressed formats such as PNG/JPG are skipped)
     """
     try:
         # Validate file size
@@ -112,12 +246,7 @@ async def encrypt_file(
             )
         
         # Validate file extension
-        file_ext = f".{file.filename.rsplit('.', 1)[-1].lower()}" if '.' in file.filename else ''
-        if file_ext not in settings.ALLOWED_EXTENSIONS.split(','):
-            raise HTTPException(
-                status_code=400,
-                detail=f"File type not allowed. Allowed: {settings.ALLOWED_EXTENSIONS}"
-            )
+        validate_extension(file.filename)
         
         # Get file metadata
         metadata = FileMetadata(
@@ -127,7 +256,12 @@ async def encrypt_file(
         )
         
         # Encrypt file data
-        encrypted_data = encryption_engine.encrypt_bytes(file_data, password)
+        encrypted_data = await encryption_engine.encrypt_bytes_async(
+            file_data,
+            [password, *additional_passwords] if additional_passwords else password,
+            envelope=envelope,
+            compression=compression_policy(compress)
+        )
         
         # Add metadata to encrypted data for preservation
         encrypted_data["filename"] = file.filename
@@ -142,6 +276,10 @@ async def encrypt_file(
         
     except HTTPException:
         raise
+    except BUSY_ERRORS as e:
+        raise busy_error(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"File encryption failed: {str(e)}")
 
@@ -156,14 +294,14 @@ async def decrypt_file(request: DecryptFileRequest):
     """
     try:
         # Extract metadata if present
-        metadata_dict = request.encrypted_data.dict() if hasattr(request.encrypted_data, 'dict') else request.encrypted_data
+        metadata_dict = request.encrypted_data.model_dump(exclude_none=True)
         
         # Extract metadata from encrypted data if available
         filename = metadata_dict.get("filename", "decrypted_file")
         mimetype = metadata_dict.get("mimetype", "application/octet-stream")
         
         # Decrypt file data
-        decrypted_data = encryption_engine.decrypt_bytes(
+        decrypted_data = await encryption_engine.decrypt_bytes_async(
             metadata_dict,
             request.password
         )
@@ -182,6 +320,211 @@ async def decrypt_file(request: DecryptFileRequest):
             "metadata": metadata
         }
         
+    except BUSY_ERRORS as e:
+        raise busy_error(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"File decryption failed: {str(e)}")
+
+
+@router.post("/file/rewrap", response_model=RewrapResponse)
+async def rewrap_file(request: RewrapRequest):
+    """
+    Change the password of an envelope-mode payload
+    
+    Only the small key slot is re-encrypted; ciphertext, nonce and tag are
+    returned unchanged, so the cost does not depend on the file size.
+    
+    - **password**: Current password
+    - **new_password**: New password
+    - **encrypted_data**: Envelope payload from /file/encrypt with envelope=true
+    """
+    try:
+        encrypted_data = await encryption_engine.rewrap_async(
+            request.encrypted_data.model_dump(exclude_none=True),
+            request.password,
+            request.new_password
+        )
+        return {
+            "success": True,
+            "encrypted_data": encrypted_data
+        }
+        
+    except BUSY_ERRORS as e:
+        raise busy_error(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Rewrap failed: {str(e)}")
+
+
+async def encrypt_upload_stream(file: UploadFile, password: str) -> Tuple[Iterator[bytes], Optional[int]]:
+    """
+    Start encrypting an upload into the chunked stream format
+    
+    Returns:
+        (iterator over the encrypted stream, its exact size if the upload size is known)
+    """
+    size = file.size
+    if size is not None and size > settings.MAX_STREAM_FILE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File too large (max {settings.MAX_STREAM_FILE_SIZE} bytes)"
+        )
+    validate_extension(file.filename)
+    
+    metadata = FileMetadata(
+        filename=file.filename,
+        size=size or 0,
+        mimetype=mimetypes.guess_type(file.filename)[0] or "application/octet-stream"
+    )
+    header_metadata = json.dumps(metadata.model_dump()).encode('utf-8')
+    
+    chunks = await encryption_engine.iter_encrypt_stream_async(
+        file.file,
+        password,
+        metadata=header_metadata
+    )
+    if size is None:
+        return chunks, None
+    return chunks, streaming.encrypted_size(size, settings.STREAM_CHUNK_SIZE, len(header_metadata))
+
+
+async def decrypt_stream_response(reader: BinaryIO, password: str) -> StreamingResponse:
+    """Stream back the plaintext of an encrypted stream as the original file"""
+    header, chunks = await encryption_engine.open_stream_async(reader, password)
+    
+    # Authenticate the first chunk up front so a wrong password is a 400
+    first = await run_in_threadpool(next, chunks)
+    
+    try:
+        metadata = json.loads(header.metadata.decode('utf-8')) if header.metadata else {}
+    except ValueError:
+        metadata = {}
+    filename = metadata.get("filename", "decrypted_file")
+    mimetype = metadata.get("mimetype", "application/octet-stream")
+    
+    return StreamingResponse(
+        chain([first], chunks),
+        media_type=mimetype,
+        headers={"Content-Disposition": content_disposition(filename)}
+    )
+
+
+@router.post("/file/encrypt/binary", response_class=StreamingResponse)
+async def encrypt_file_binary(
+    file: UploadFile = File(...),
+    password: str = Form(...)
+):
+    """
+    Encrypt file with password, streaming back a binary encrypted file
+    
+    Unlike /file/encrypt there is no base64/JSON wrapping: the response is the
+    chunked stream container (application/octet-stream), encrypted chunk by
+    chunk so memory use does not grow with file size.
+    
+    - **file**: File to encrypt (TXT, PDF, PNG, JPG)
+    - **password**: Encryption password
+    """
+    try:
+        chunks, size = await encrypt_upload_stream(file, password)
+        
+        headers = {"Content-Disposition": content_disposition(f"{file.filename}.enc")}
+        if size is not None:
+            headers["Content-Length"] = str(size)
+        
+        return StreamingResponse(chunks, media_type="application/octet-stream", headers=headers)
+        
+    except HTTPException:
+        raise
+    except BUSY_ERRORS as e:
+        raise busy_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"File encryption failed: {str(e)}")
+
+
+@router.post("/file/decrypt/binary", response_class=StreamingResponse)
+async def decrypt_file_binary(
+    file: UploadFile = File(...),
+    password: str = Form(...)
+):
+    """
+    Decrypt a binary encrypted file (from /file/encrypt/binary)
+    
+    The plaintext is streamed back as the original file type. Each chunk is
+    authenticated before it is sent; if a later chunk fails (tampering or
+    truncation) the response is aborted.
+    
+    - **file**: Encrypted file
+    - **password**: Decryption password
+    """
+    try:
+        return await decrypt_stream_response(file.file, password)
+        
+    except BUSY_ERRORS as e:
+        raise busy_error(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"File decryption failed: {str(e)}")
+
+
+@router.post("/file/encrypt/emoji", response_class=StreamingResponse)
+async def encrypt_file_emoji(
+    file: UploadFile = File(...),
+    password: str = Form(...)
+):
+    """
+    Encrypt file with password, streaming back the encrypted file as dense emoji text
+    
+    The chunked stream container from /file/encrypt/binary, converted to v2
+    emoji while it is produced, so large files never become one big string.
+    
+    - **file**: File to encrypt (TXT, PDF, PNG, JPG)
+    - **password**: Encryption password
+    """
+    try:
+        chunks, size = await encrypt_upload_stream(file, password)
+        
+        headers = {"Content-Disposition": content_disposition(f"{file.filename}.emoji.txt")}
+        if size is not None:
+            # Every alphabet emoji is 4 bytes of UTF-8
+            headers["Content-Length"] = str(4 * dense_length(size))
+        
+        return StreamingResponse(
+            encode_chunks(chunks),
+            media_type="text/plain; charset=utf-8",
+            headers=headers
+        )
+        
+    except HTTPException:
+        raise
+    except BUSY_ERRORS as e:
+        raise busy_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"File encryption failed: {str(e)}")
+
+
+@router.post("/file/decrypt/emoji", response_class=StreamingResponse)
+async def decrypt_file_emoji(
+    file: UploadFile = File(...),
+    password: str = Form(...)
+):
+    """
+    Decrypt an emoji-encoded encrypted file (from /file/encrypt/emoji)
+    
+    The emoji text is decoded incrementally while chunks are decrypted, with
+    the same streaming guarantees as /file/decrypt/binary.
+    
+    - **file**: Emoji text file
+    - **password**: Decryption password
+    """
+    try:
+        return await decrypt_stream_response(EmojiStreamReader(file.file), password)
+        
+    except BUSY_ERRORS as e:
+        raise busy_error(e)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
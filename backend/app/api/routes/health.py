@@ -6,6 +6,12 @@ from fastapi import APIRouter
 from datetime import datetime
 
 from app.core.config import settings
+from app.core.admission import kdf_admission
+from app.core.encryption import encryption_engine
+from app.core.qr_images import qr_image_cache
+from app.core.status_cache import status_cache
+from app.core.sweeper import token_sweeper
+from app.db.database import pool_stats
 
 router = APIRouter()
 
@@ -23,6 +29,8 @@ async def health_check():
         "environment": settings.ENVIRONMENT,
         "timestamp": datetime.utcnow().isoformat(),
         "kdf_algorithm": settings.KDF_ALGORITHM,
+        "kdf_params": encryption_engine.kdf_params(),
+        "cipher": encryption_engine.cipher_id,
         "version": "1.0.0"
     }
 
@@ -31,3 +39,24 @@ async def health_check():
 async def ping():
     """Simple ping endpoint"""
     return {"message": "pong"}
+
+
+@router.get("/metrics")
+async def metrics():
+    """
+    Runtime metrics for capacity planning
+    
+    Returns KDF admission queue depth, memory budget usage and wait times,
+    derived-key cache counters when the cache is enabled, QR image cache,
+    token status cache and expired-token sweeper counters, and database
+    pool occupancy, connection hold times and write/lock waits
+    """
+    key_cache = encryption_engine.key_cache
+    return {
+        "kdf_admission": kdf_admission.stats(),
+        "key_cache": key_cache.stats() if key_cache else {"enabled": False},
+        "qr_image_cache": qr_image_cache.stats(),
+        "qr_token_sweeper": token_sweeper.stats(),
+        "qr_status_cache": status_cache.stats(),
+        "database": pool_stats()
+    }
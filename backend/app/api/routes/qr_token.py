@@ -2,36 +2,69 @@
 QR Token API Routes
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Request
-from sqlalchemy.orm import Session
-import json
-import qrcode
-import io
+from fastapi import APIRouter, HTTPException, Depends, Request, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 import base64
+import json
+import re
 from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
 
-from app.db.database import get_db
+from app.db.database import get_async_db
 from app.db.models import QRToken
+from app.db.repositories import QRTokenRepository
 from app.schemas.qr_token import (
-    CreateQRTokenRequest, CreateQRTokenResponse,
+    CreateQRTokenRequest, CreateQRTokenResponse, CreateQRTokenBatchRequest,
     ViewQRTokenResponse, QRTokenStatus
 )
 from app.core.config import settings
+from app.core.status_cache import status_cache
+from app.core.qr_images import (
+    DEFAULT_BOX_SIZE, ERROR_CORRECTION, FORMATS, MAX_BOX_SIZE, MIN_BOX_SIZE,
+    qr_image_cache, render_qr_png
+)
 
 router = APIRouter()
 
+# Tokens are secrets.token_urlsafe(32) (43 characters)
+TOKEN_PATTERN = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+# One entity tag in an If-None-Match list: "*" or an optionally weak quoted tag
+ENTITY_TAG = re.compile(r'\*|(?:W/)?"[^"]*"')
+
+
+def token_url(token: str) -> str:
+    """Frontend URL a token's QR code points to"""
+    return f"{settings.FRONTEND_URL}/qr/{token}"
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    True if an If-None-Match header lists etag (weak comparison, RFC 9110)
+
+    Each listed tag is compared exactly, ignoring W/ prefixes; "*" matches.
+    """
+    etag = etag[2:] if etag.startswith("W/") else etag
+    for tag in ENTITY_TAG.findall(if_none_match):
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == etag:
+            return True
+    return False
+
 
 @router.post("/create", response_model=CreateQRTokenResponse)
 async def create_qr_token(
     request: CreateQRTokenRequest,
     http_request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a single-use QR token for secure message sharing
     
     - **encrypted_message**: Encrypted message data (dict)
     - **expiry_hours**: Token expiry in hours (1-168)
+    - **include_image**: Inline a base64 PNG (default true); set false and use
+      image_url to render only when the image is actually shown
     """
     try:
         # Generate token
@@ -41,124 +74,247 @@ async def create_qr_token(
         # Create QR token record
         qr_token = QRToken(
             token=token,
-            encrypted_message=json.dumps(request.encrypted_message),
+            payload=QRToken.encode_message(request.encrypted_message),
             expires_at=expires_at
         )
         
-        db.add(qr_token)
-        db.commit()
-        db.refresh(qr_token)
+        await QRTokenRepository(db).add(qr_token)
         
         # Generate QR code URL - point to frontend, not API
         # Frontend will handle the nice UI for decryption
-        qr_url = f"{settings.FRONTEND_URL}/qr/{token}"
+        qr_url = token_url(token)
         
-        # Generate QR code image
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(qr_url)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        img_io = io.BytesIO()
-        img.save(img_io, 'PNG')
-        img_io.seek(0)
-        
-        qr_image_b64 = base64.b64encode(img_io.getvalue()).decode('utf-8')
+        # Render off the event loop (and through the image cache)
+        qr_image_b64 = None
+        if request.include_image:
+            image = await run_in_threadpool(qr_image_cache.get, qr_url)
+            qr_image_b64 = base64.b64encode(image.content).decode('utf-8')
         
         return {
             "success": True,
             "token": token,
             "url": qr_url,
             "qr_image": qr_image_b64,
+            "image_url": str(http_request.url_for("get_qr_image", token=token)),
             "expires_at": expires_at
         }
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"QR token creation failed: {str(e)}")
 
 
-@router.get("/view/{token}", response_model=ViewQRTokenResponse)
-async def view_qr_token(token: str, db: Session = Depends(get_db)):
+@router.post("/create-batch", response_class=StreamingResponse)
+async def create_qr_token_batch(
+    request: CreateQRTokenBatchRequest,
+    http_request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    View QR token content (single-use only)
+    Create many single-use QR tokens in one transaction
     
-    - **token**: QR token string
+    Give either encrypted_messages (one token each) or encrypted_message
+    plus count (a token per recipient for the same message). All rows go in
+    with one bulk INSERT; the response streams one JSON object per line
+    (application/x-ndjson) with index, token, url, image_url and expires_at,
+    plus qr_image when include_image is set. A message that cannot be
+    stored gets an {index, error} line instead and no token.
+    
+    - **encrypted_messages** / **encrypted_message** + **count**: Payloads (1 to QR_BATCH_MAX_SIZE)
+    - **expiry_hours**: Token expiry in hours (1-168)
+    - **include_image**: Inline base64 PNGs (default false; use image_url)
+    """
+    if request.encrypted_messages is not None:
+        if request.encrypted_message is not None or request.count is not None:
+            raise HTTPException(
+                status_code=400,
+                detail="Give either encrypted_messages or encrypted_message with count"
+            )
+        messages = request.encrypted_messages
+        shared = None
+    elif request.encrypted_message is not None and request.count is not None:
+        # Shared message: encode once
+        messages = [request.encrypted_message] * request.count
+        try:
+            shared = QRToken.encode_message(request.encrypted_message)
+        except (TypeError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid encrypted message: {str(e)}")
+    else:
+        raise HTTPException(
+            status_code=400,
+            detail="Give either encrypted_messages or encrypted_message with count"
+        )
+
+    expires_at = QRToken.calculate_expiry(request.expiry_hours)
+    # One (token, error) pair per requested item, in request order
+    results: List[Tuple[Optional[str], Optional[str]]] = []
+    rows = []
+    for message in messages:
+        try:
+            payload = shared if shared is not None else QRToken.encode_message(message)
+        except (TypeError, ValueError) as e:
+            results.append((None, f"Invalid encrypted message: {str(e)}"))
+            continue
+        token = QRToken.generate_token()
+        rows.append({"token": token, "payload": payload, "expires_at": expires_at})
+        results.append((token, None))
+
+    try:
+        if rows:
+            await QRTokenRepository(db).add_many(rows)
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"QR token creation failed: {str(e)}")
+    
+    # url_for once; every token's image URL shares the prefix
+    image_prefix = str(http_request.url_for("get_qr_image", token="_"))[:-1]
+    
+    async def lines(results: List[Tuple[Optional[str], Optional[str]]]) -> AsyncIterator[bytes]:
+        expiry = expires_at.isoformat()
+        for index, (token, error) in enumerate(results):
+            if token is None:
+                yield (json.dumps({"index": index, "error": error}) + "\n").encode('utf-8')
+                continue
+            item = {
+                "index": index,
+                "token": token,
+                "url": token_url(token),
+                "image_url": image_prefix + token,
+                "expires_at": expiry
+            }
+            if request.include_image:
+                # Rendered directly: one-off images would only churn the LRU
+                png = await run_in_threadpool(render_qr_png, item["url"])
+                item["qr_image"] = base64.b64encode(png).decode('utf-8')
+            yield (json.dumps(item) + "\n").encode('utf-8')
+    
+    return StreamingResponse(lines(results), media_type="application/x-ndjson")
+
+
+@router.get("/image/{token}", name="get_qr_image")
+async def get_qr_image(
+    token: str,
+    request: Request,
+    format: str = Query("png", description="png or svg"),
+    size: int = Query(DEFAULT_BOX_SIZE, ge=MIN_BOX_SIZE, le=MAX_BOX_SIZE, description="Pixels per module"),
+    ec: str = Query("L", description="Error correction level: L, M, Q or H"),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    # Find token
-    qr_token = db.query(QRToken).filter(QRToken.token == token).first()
+    QR code image for a token, rendered on demand
     
-    if not qr_token:
+    The image only encodes the token's frontend URL and never consumes the
+    token. Only existing tokens are rendered (checked against the status
+    cache, then the database), so the endpoint cannot be used to fill the
+    image cache or burn CPU on arbitrary URLs. Responses carry a strong
+    ETag and are served from an in-memory LRU when possible; If-None-Match
+    revalidation returns 304.
+    
+    - **token**: QR token string
+    - **format**: png (default) or svg
+    - **size**: Pixels (PNG) or units (SVG) per module
+    - **ec**: Error correction level (L default; H survives more damage)
+    """
+    fmt, ec = format.lower(), ec.upper()
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail="format must be png or svg")
+    if ec not in ERROR_CORRECTION:
+        raise HTTPException(status_code=400, detail="ec must be one of L, M, Q, H")
+    if not TOKEN_PATTERN.match(token):
+        raise HTTPException(status_code=404, detail="Token not found")
+    if await status_cache.get(token) is None and not await QRTokenRepository(db).exists(token):
         raise HTTPException(status_code=404, detail="Token not found")
     
-    # Check if valid
-    if not qr_token.is_valid():
-        reason = "already viewed" if qr_token.viewed else "expired"
-        raise HTTPException(status_code=403, detail=f"Token {reason}")
+    image = await run_in_threadpool(qr_image_cache.get, token_url(token), fmt, size, ec)
+    headers = {
+        "ETag": image.etag,
+        # Private: the URL (and image) reveal the token
+        "Cache-Control": f"private, max-age={settings.QR_IMAGE_MAX_AGE}, immutable"
+    }
+    if etag_matches(request.headers.get("if-none-match", ""), image.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=image.content, media_type=image.media_type, headers=headers)
+
+
+@router.get("/view/{token}", response_model=ViewQRTokenResponse)
+async def view_qr_token(token: str, db: AsyncSession = Depends(get_async_db)):
+    """
+    View QR token content (single-use only)
+    
+    - **token**: QR token string
+    """
+    # Claim and read in one conditional UPDATE (single-use under concurrency)
+    tokens = QRTokenRepository(db)
+    consumed = await tokens.consume(token)
     
-    # Mark as viewed (single-use)
-    encrypted_message = json.loads(qr_token.encrypted_message)
-    qr_token.mark_as_viewed()
-    db.commit()
+    if consumed is None:
+        reason = await tokens.reason(token)
+        if reason == "not found":
+            raise HTTPException(status_code=404, detail="Token not found")
+        raise HTTPException(status_code=403, detail=f"Token {reason or 'already viewed'}")
     
+    await status_cache.invalidate(token)
     return {
         "success": True,
-        "encrypted_message": encrypted_message,
-        "viewed_at": qr_token.viewed_at
+        "encrypted_message": QRToken.decode_message(consumed.payload),
+        "viewed_at": consumed.viewed_at
     }
 
 
 @router.get("/status/{token}")
-async def get_qr_token_status(token: str, db: Session = Depends(get_db)):
+async def get_qr_token_status(token: str, db: AsyncSession = Depends(get_async_db)):
     """
     Get QR token status and encrypted message without marking as viewed
     This allows the UI to load without consuming the one-time token
     
     - **token**: QR token string
     """
-    qr_token = db.query(QRToken).filter(QRToken.token == token).first()
-    
-    if not qr_token:
-        raise HTTPException(status_code=404, detail="Token not found")
-    
-    # Check if valid
-    if not qr_token.is_valid():
-        reason = "already viewed" if qr_token.viewed else "expired"
-        raise HTTPException(status_code=403, detail=f"Token {reason}")
+    # Polling is served from the status cache; only valid tokens are cached
+    entry = await status_cache.get(token)
+    if entry is None:
+        qr_token = await QRTokenRepository(db).get(token)
+        
+        if not qr_token:
+            raise HTTPException(status_code=404, detail="Token not found")
+        
+        # Check if valid
+        if not qr_token.is_valid():
+            reason = "already viewed" if qr_token.viewed else "expired"
+            raise HTTPException(status_code=403, detail=f"Token {reason}")
+        
+        entry = {
+            "encrypted_message": QRToken.decode_message(qr_token.payload),
+            "created_at": qr_token.created_at,
+            "expires_at": qr_token.expires_at
+        }
+        await status_cache.set(token, entry)
+    elif datetime.utcnow() > entry["expires_at"]:
+        await status_cache.invalidate(token)
+        raise HTTPException(status_code=403, detail="Token expired")
     
     # Return encrypted message WITHOUT marking as viewed yet
-    encrypted_message = json.loads(qr_token.encrypted_message)
-    
     return {
         "success": True,
-        "encrypted_message": encrypted_message,
+        "encrypted_message": entry["encrypted_message"],
         "token": token,
-        "valid": qr_token.is_valid(),
-        "viewed": qr_token.viewed,
-        "created_at": qr_token.created_at,
-        "expires_at": qr_token.expires_at,
-        "viewed_at": qr_token.viewed_at
+        "valid": True,
+        "viewed": False,
+        "created_at": entry["created_at"],
+        "expires_at": entry["expires_at"],
+        "viewed_at": None
     }
 
 
 @router.delete("/{token}")
-async def delete_qr_token(token: str, db: Session = Depends(get_db)):
+async def delete_qr_token(token: str, db: AsyncSession = Depends(get_async_db)):
     """
     Delete a QR token (admin operation)
     
     - **token**: QR token string
     """
-    qr_token = db.query(QRToken).filter(QRToken.token == token).first()
-    
-    if not qr_token:
+    deleted = await QRTokenRepository(db).delete(token)
+    if not deleted:
         raise HTTPException(status_code=404, detail="Token not found")
     
-    db.delete(qr_token)
-    db.commit()
-    
+    await status_cache.invalidate(token)
     return {"success": True, "message": "Token deleted"}
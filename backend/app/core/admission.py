@@ -0,0 +1,208 @@
+"""
+Memory-budgeted admission control for Argon2 key derivation
+Every Argon2 hash allocates ARGON2_MEMORY_COST KiB; this caps the total in flight
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.executor import crypto_executor
+
+
+class AdmissionRejected(Exception):
+    """Raised when the KDF queue is full or the queue wait timed out"""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class KDFCostExceeded(ValueError):
+    """Raised when a single KDF call needs more memory than the whole budget"""
+
+
+class Reservation:
+    """Handle for admitted budget; see MemoryAdmissionController.admit"""
+
+    def __init__(self):
+        self.job: Optional[asyncio.Future] = None
+
+    def release_when(self, job: asyncio.Future) -> None:
+        """Keep the budget until job finishes, even if the block exits first"""
+        self.job = job
+
+
+class MemoryAdmissionController:
+    """
+    FIFO admission queue around KDF calls, budgeted in KiB of KDF memory
+
+    Requests whose memory cost fits the remaining budget run immediately;
+    others wait (up to max_wait seconds) in a queue of at most max_queue
+    entries. Anything beyond that is rejected so callers can answer 503.
+    """
+
+    def __init__(
+        self,
+        budget_kib: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        max_wait: Optional[float] = None
+    ):
+        self._budget_kib = budget_kib
+        self._max_queue = max_queue
+        self._max_wait = max_wait
+        self.in_flight_kib = 0
+        self._waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+
+        # Metrics
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+        self.avg_hold = 0.0
+
+    @property
+    def budget_kib(self) -> int:
+        """Total KiB of KDF memory allowed in flight"""
+        return (
+            self._budget_kib
+            or settings.KDF_MEMORY_BUDGET
+            or settings.ARGON2_MEMORY_COST * crypto_executor.max_workers
+        )
+
+    @property
+    def max_queue(self) -> int:
+        return settings.KDF_QUEUE_SIZE if self._max_queue is None else self._max_queue
+
+    @property
+    def max_wait(self) -> float:
+        return settings.KDF_QUEUE_TIMEOUT if self._max_wait is None else self._max_wait
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self, cost_kib: int) -> int:
+        """Estimate seconds until a request of this cost could be admitted"""
+        concurrency = max(1, self.budget_kib // max(1, cost_kib))
+        rounds = (self.queue_depth + 1) / concurrency
+        return max(1, math.ceil(rounds * (self.avg_hold or 1.0)))
+
+    @asynccontextmanager
+    async def admit(self, cost_kib: int):
+        """
+        Hold cost_kib of the memory budget for the duration of the block
+
+        Yields a Reservation: when the block hands the KDF to a worker pool,
+        pass the job's future to reservation.release_when so the budget stays
+        held until the job finishes, even if the caller stops waiting (e.g.
+        on a timeout) while it is still running.
+
+        Args:
+            cost_kib: Memory the KDF call will allocate (KiB)
+
+        Raises:
+            KDFCostExceeded: If cost_kib alone exceeds the budget (it could
+                never be admitted without breaking the memory cap)
+            AdmissionRejected: If the queue is full or the wait exceeded max_wait
+        """
+        if cost_kib > self.budget_kib:
+            self.rejected += 1
+            raise KDFCostExceeded(
+                f"KDF memory cost {cost_kib} KiB exceeds the {self.budget_kib} KiB budget"
+            )
+        waited = await self._acquire(cost_kib)
+        self.admitted += 1
+        self.total_wait += waited
+        self.max_wait_seen = max(self.max_wait_seen, waited)
+
+        started = time.monotonic()
+        reservation = Reservation()
+
+        def release(_=None) -> None:
+            held = time.monotonic() - started
+            self.avg_hold = held if not self.avg_hold else 0.8 * self.avg_hold + 0.2 * held
+            self._release(cost_kib)
+
+        try:
+            yield reservation
+        finally:
+            if reservation.job is not None and not reservation.job.done():
+                reservation.job.add_done_callback(release)
+            else:
+                release()
+
+    async def _acquire(self, cost_kib: int) -> float:
+        if not self._waiters and self.in_flight_kib + cost_kib <= self.budget_kib:
+            self.in_flight_kib += cost_kib
+            return 0.0
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(
+                "Too many key derivations queued",
+                retry_after=self.retry_after(cost_kib)
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (cost_kib, future)
+        self._waiters.append(entry)
+        self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.max_wait or None)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Granted just as the timeout fired - keep the slot
+                return time.monotonic() - started
+            self._waiters.remove(entry)
+            self.timed_out += 1
+            self.rejected += 1
+            raise AdmissionRejected(
+                f"Key derivation queue wait exceeded {self.max_wait} seconds",
+                retry_after=self.retry_after(cost_kib)
+            )
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release(cost_kib)
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+            raise
+        return time.monotonic() - started
+
+    def _release(self, cost_kib: int) -> None:
+        self.in_flight_kib -= cost_kib
+        # Wake waiters in FIFO order while they fit
+        while self._waiters:
+            next_cost, future = self._waiters[0]
+            if self.in_flight_kib + next_cost > self.budget_kib:
+                break
+            self._waiters.popleft()
+            self.in_flight_kib += next_cost
+            future.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, budget usage and wait-time metrics"""
+        return {
+            "budget_kib": self.budget_kib,
+            "in_flight_kib": self.in_flight_kib,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "queue_limit": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait_seconds": self.total_wait / self.admitted if self.admitted else 0.0,
+            "max_wait_seconds": self.max_wait_seen,
+            "avg_kdf_seconds": self.avg_hold
+        }
+
+
+# Singleton instance
+kdf_admission = MemoryAdmissionController()
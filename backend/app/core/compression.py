@@ -0,0 +1,121 @@
+"""
+Optional compression before encryption
+
+Opt-in (COMPRESSION=off by default): compressing secrets together with
+attacker-influenced data lets ciphertext length leak plaintext content
+(CRIME/BREACH-style compression oracles). Only enable it where that mix
+cannot happen, and keep it off per request otherwise.
+
+Payloads record the codec id used, so decryption never depends on the
+current setting.
+"""
+
+import lzma
+import zlib
+from typing import Optional, Tuple
+
+from app.core.config import settings
+
+CODECS = ("zlib", "lzma")
+POLICIES = ("off", "auto") + CODECS
+
+# Compact numeric ids for binary/emoji encodings
+CODEC_CODES = {"zlib": 1, "lzma": 2}
+CODEC_NAMES = {v: k for k, v in CODEC_CODES.items()}
+
+# Below this, codec framing outweighs any saving
+MIN_COMPRESS_SIZE = 128
+# auto: lzma (best ratio) up to this size, zlib (much faster) above it
+LZMA_MAX_SIZE = 64 * 1024
+# Sampled prefix must shrink at least this much to bother compressing
+SAMPLE_SIZE = 4096
+MAX_SAMPLE_RATIO = 0.9
+
+# Already-compressed formats (PNG, JPEG, GIF, WebP, zip/docx, gzip, xz, bzip2,
+# zstd); PDFs are left to sampling since their text parts often compress
+_COMPRESSED_MAGIC = (
+    b"\x89PNG", b"\xff\xd8\xff", b"GIF8", b"RIFF", b"PK\x03\x04",
+    b"\x1f\x8b", b"\xfd7zXZ", b"BZh", b"\x28\xb5\x2f\xfd",
+)
+
+
+def looks_compressible(data: bytes) -> bool:
+    """Cheap check: skip tiny inputs, known compressed formats and high-entropy samples"""
+    if len(data) < MIN_COMPRESS_SIZE or data.startswith(_COMPRESSED_MAGIC):
+        return False
+    sample = data[:SAMPLE_SIZE]
+    return len(zlib.compress(sample, 1)) <= len(sample) * MAX_SAMPLE_RATIO
+
+
+def choose_codec(data: bytes, policy: Optional[str] = None) -> Optional[str]:
+    """
+    Codec to use for data under a policy
+
+    Args:
+        data: Plaintext
+        policy: off, auto, zlib or lzma (defaults to COMPRESSION)
+
+    Returns:
+        Codec name, or None to store data uncompressed
+    """
+    policy = policy or settings.COMPRESSION
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown compression policy: {policy}")
+    if policy == "off" or not looks_compressible(data):
+        return None
+    if policy == "auto":
+        return "lzma" if len(data) <= LZMA_MAX_SIZE else "zlib"
+    return policy
+
+
+def compress(data: bytes, policy: Optional[str] = None) -> Tuple[bytes, Optional[str]]:
+    """
+    Compress data if the policy and content call for it
+
+    Returns:
+        (bytes to encrypt, codec name or None); the original data is kept
+        when compression would not make it smaller
+    """
+    codec = choose_codec(data, policy)
+    if codec is None:
+        return data, None
+    if codec == "zlib":
+        packed = zlib.compress(data, 6)
+    else:
+        packed = lzma.compress(data, format=lzma.FORMAT_XZ, preset=6)
+    if len(packed) >= len(data):
+        return data, None
+    return packed, codec
+
+
+def decompress(data: bytes, codec: Optional[str], max_size: Optional[int] = None) -> bytes:
+    """
+    Undo compress()
+
+    Output is capped at max_size (defaults to MAX_FILE_SIZE) so a crafted
+    payload cannot expand into a decompression bomb.
+
+    Raises:
+        ValueError: For unknown codecs, corrupt data or oversized output
+    """
+    if not codec:
+        return data
+    limit = max_size or settings.MAX_FILE_SIZE
+    try:
+        if codec == "zlib":
+            decompressor = zlib.decompressobj()
+            result = decompressor.decompress(data, limit + 1)
+            complete = decompressor.eof
+        elif codec == "lzma":
+            decompressor = lzma.LZMADecompressor(format=lzma.FORMAT_XZ)
+            result = decompressor.decompress(data, limit + 1)
+            complete = decompressor.eof
+        else:
+            raise ValueError(f"Unsupported compression codec: {codec}")
+    except (zlib.error, lzma.LZMAError):
+        raise ValueError("Decompression failed - data is corrupted")
+    if len(result) > limit:
+        raise ValueError(f"Decompressed data exceeds {limit} bytes")
+    if not complete:
+        raise ValueError("Decompression failed - data is truncated")
+    return result
@@ -22,6 +22,15 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./securecom.db"
+    ASYNC_DATABASE_URL: str = ""  # empty = DATABASE_URL with its async driver (aiosqlite/asyncpg)
+    DB_POOL_SIZE: int = 5  # connections kept open per engine
+    DB_MAX_OVERFLOW: int = 10  # extra connections allowed under load
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True  # check connections on checkout
+    SQLITE_JOURNAL_MODE: str = "WAL"  # readers don't block the writer
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # safe with WAL, far fewer fsyncs
+    SQLITE_BUSY_TIMEOUT: int = 5000  # ms a writer waits for the lock
     
     # CORS
     CORS_ORIGINS: List[str] = ["*"]  # Allow all origins in development
@@ -35,13 +44,50 @@ class Settings(BaseSettings):
     ARGON2_TIME_COST: int = 2
     ARGON2_MEMORY_COST: int = 65536
     ARGON2_PARALLELISM: int = 4
+    KDF_AUTO_CALIBRATE: bool = False  # benchmark Argon2 at startup
+    KDF_TARGET_MS: float = 250.0  # target derivation latency for calibration
+    KDF_MAX_COST_FACTOR: int = 4  # payload KDF costs accepted up to this multiple of the ARGON2_* settings
+    MAX_BATCH_SIZE: int = 1000  # messages per /text/encrypt-batch call
+    MAX_RECIPIENTS: int = 16  # passwords (key slots) per multi-recipient payload
+    # Compress before encrypting: off, auto, zlib or lzma. Off by default -
+    # ciphertext length can then leak plaintext content (compression oracles)
+    COMPRESSION: str = "off"
+    CIPHER: str = "auto"  # aes-256-gcm, chacha20-poly1305, xchacha20-poly1305 or auto (fastest on this host)
+    EMOJI_VERSION: int = 2  # emoji output format: 1 = base64 alphabet, 2 = dense (~40% shorter); both decode
+    
+    # Crypto worker pool (KDF + cipher work runs off the event loop)
+    CRYPTO_EXECUTOR: str = "thread"  # "thread" or "process"
+    CRYPTO_POOL_SIZE: int = 0  # 0 = number of available CPUs
+    CRYPTO_TASK_TIMEOUT: float = 30.0  # seconds per task, 0 disables
+    
+    # Derived-key cache for repeat decryptions (opt-in; keys stay in memory up to the TTL)
+    KEY_CACHE_ENABLED: bool = False
+    KEY_CACHE_SIZE: int = 256  # entries
+    KEY_CACHE_TTL: float = 60.0  # seconds
+    
+    # KDF admission control (bounds Argon2 memory in flight)
+    KDF_MEMORY_BUDGET: int = 0  # KiB, 0 = ARGON2_MEMORY_COST x CRYPTO_POOL_SIZE
+    KDF_QUEUE_SIZE: int = 64  # requests allowed to wait for budget
+    KDF_QUEUE_TIMEOUT: float = 10.0  # seconds a request may wait, 0 = no limit
     
     # File Upload
     MAX_FILE_SIZE: int = 10485760  # 10MB
+    MAX_STREAM_FILE_SIZE: int = 1073741824  # 1GB (binary streaming endpoints)
+    STREAM_CHUNK_SIZE: int = 65536  # plaintext bytes per chunk in streamed files
+    STREAM_PARALLELISM: int = 0  # chunks encrypted/decrypted at once per file, 0 = CPU count, 1 = sequential
     ALLOWED_EXTENSIONS: str = ".txt,.pdf,.png,.jpg,.jpeg"
     
     # QR Token
     QR_TOKEN_EXPIRY_HOURS: int = 24
+    QR_BATCH_MAX_SIZE: int = 5000  # tokens per /api/qr/create-batch request
+    QR_IMAGE_CACHE_SIZE: int = 256  # rendered QR images kept in memory
+    QR_IMAGE_MAX_AGE: int = 86400  # seconds clients may cache /api/qr/image responses
+    QR_SWEEP_INTERVAL: int = 300  # seconds between purges of expired/viewed tokens, 0 = off
+    QR_SWEEP_BATCH_SIZE: int = 500  # rows deleted per transaction
+    QR_SWEEP_VIEWED_GRACE: int = 3600  # seconds viewed/expired tokens are kept (so they report "already viewed"/"expired")
+    QR_STATUS_CACHE_TTL: float = 5.0  # seconds /api/qr/status results are cached, 0 = off
+    QR_STATUS_CACHE_SIZE: int = 1024  # entries (in-process cache)
+    QR_STATUS_CACHE_URL: str = ""  # redis:// URL to share the cache between workers
     
     # Frontend URL (for QR codes)
     FRONTEND_URL: str = "https://securecom.netlify.app"
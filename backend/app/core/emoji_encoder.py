@@ -1,9 +1,32 @@
 """
 Emoji Encoder/Decoder for Visual Ciphertext
-Converts base64 ciphertext into emoji sequences
+Converts ciphertext into emoji sequences
+
+Two formats, told apart on decode:
+
+    v1  base64 text, one emoji per base64 character (6 bits per emoji)
+    v2  the packed payload (app.core.envelope) on a 1024-emoji alphabet
+        (10 bits per emoji), starting with DENSE_MARKER; about 40% shorter
+        than v1 and also carries multi-recipient payloads
+
+Every alphabet emoji is a single codepoint, so conversion works on whole
+byte planes with precomputed translation tables instead of per-character
+Python loops; file-sized payloads convert in milliseconds. For unbounded
+input, EmojiStreamEncoder/EmojiStreamDecoder (and encode_chunks,
+decode_chunks, EmojiStreamReader) convert v2 emoji piece by piece.
 """
 
-from typing import Dict
+import codecs
+import io
+import logging
+import re
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.ciphers import CIPHER_CODES, CIPHER_NAMES
+from app.core.compression import CODEC_CODES, CODEC_NAMES
+from app.core.config import settings
+from app.core import envelope
+from app.core.kdf import PARAM_ORDER
 
 # Expanded emoji mapping - using diverse emojis for better variety!
 # Includes faces, animals, objects, nature, food, activities, and more
@@ -36,21 +59,545 @@ EMOJI_MAP = {
 # Reverse mapping
 EMOJI_TO_B64 = {v: k for k, v in EMOJI_MAP.items()}
 
+# Slow-path patterns for error reporting and stats on invalid input
+ALPHABET_CHARS = re.compile('[' + re.escape(''.join(EMOJI_TO_B64)) + ']')
+INVALID_CHARS = re.compile('[^' + re.escape(''.join(EMOJI_TO_B64)) + r'\s]')
+
+logger = logging.getLogger(__name__)
+
+
+class _PlaneCodec:
+    """
+    Bulk ASCII <-> single-codepoint emoji conversion
+
+    A string encoded as UTF-32-LE is one 4-byte codepoint per character, so
+    its byte planes (data[i::4]) can be processed with C-level
+    bytes.translate calls instead of a Python loop per character:
+
+    - encode: translate the ASCII text into each plane of the matching
+      emoji codepoints and interleave the planes
+    - decode: low byte XOR a per-second-byte mask identifies the emoji (the
+      mask multiplier is searched at import so every alphabet emoji gets a
+      distinct key); re-encoding the result and comparing all four planes
+      then rejects anything that is not exactly an alphabet emoji
+    """
+
+    def __init__(self, mapping: Dict[str, str]):
+        codepoints = {ord(char): ord(emoji) for char, emoji in mapping.items()}
+        self.multiplier = next(
+            m for m in range(1, 256)
+            if len({self._key(cp, m) for cp in codepoints.values()}) == len(codepoints)
+        )
+        self.mask = bytes((b * self.multiplier) & 0xFF for b in range(256))
+
+        planes = [bytearray(256) for _ in range(4)]
+        planes[2][0] = 0xFF  # unknown keys decode to NUL, which never re-encodes to a match
+        keys = bytearray(256)
+        for char, cp in codepoints.items():
+            for i in range(4):
+                planes[i][char] = (cp >> (8 * i)) & 0xFF
+            keys[self._key(cp, self.multiplier)] = char
+        self.planes = [bytes(plane) for plane in planes]
+        self.keys = bytes(keys)
+
+    @staticmethod
+    def _key(cp: int, multiplier: int) -> int:
+        return (cp & 0xFF) ^ (((cp >> 8) * multiplier) & 0xFF)
+
+    def encode(self, text: str) -> str:
+        """ASCII text (alphabet characters only) to emoji"""
+        data = text.encode('ascii')
+        out = bytearray(4 * len(data))
+        for i in range(3):
+            out[i::4] = data.translate(self.planes[i])
+        return out.decode('utf-32-le')
+
+    def decode(self, emoji_str: str) -> Optional[str]:
+        """Emoji back to ASCII, or None if any character is not an alphabet emoji"""
+        try:
+            data = emoji_str.encode('utf-32-le')
+        except UnicodeEncodeError:  # lone surrogates
+            return None
+        count = len(emoji_str)
+        low, second, third, high = data[0::4], data[1::4], data[2::4], data[3::4]
+        keys = (
+            int.from_bytes(low, 'little') ^ int.from_bytes(second.translate(self.mask), 'little')
+        ).to_bytes(count, 'little')
+        text = keys.translate(self.keys)
+        valid = (
+            text.translate(self.planes[0]) == low
+            and text.translate(self.planes[1]) == second
+            and text.translate(self.planes[2]) == third
+            and high.count(0) == count
+        )
+        return text.decode('ascii') if valid else None
+
+
+_codec = _PlaneCodec(EMOJI_MAP)
+
+
+# v2: start marker and a trailing marker for final blocks holding 4 bytes
+# (both outside the alphabet)
+DENSE_MARKER = '🧬'
+DENSE_TRIM = '🧩'
+DENSE_BITS = 10
+VARIATION_SELECTOR = '\ufe0f'  # appended to some emoji by chat apps and keyboards
+
+
+def _dense_alphabet() -> str:
+    """
+    1024 single-codepoint pictographs: Misc Symbols and Pictographs (minus the
+    skin tone modifiers, which fuse with the preceding emoji), Emoticons,
+    Transport and Map, then Supplemental Symbols and Pictographs
+    """
+    codepoints = [cp for cp in range(0x1F300, 0x1F600) if not 0x1F3FB <= cp <= 0x1F3FF]
+    codepoints += range(0x1F600, 0x1F650)
+    codepoints += range(0x1F680, 0x1F6C6)
+    codepoints += range(0x1F90D, 0x1F90D + (1 << DENSE_BITS) - len(codepoints))
+    return ''.join(map(chr, codepoints))
+
+
+DENSE_ALPHABET = _dense_alphabet()
+DENSE_CHARS = re.compile('[' + re.escape(DENSE_ALPHABET + DENSE_MARKER + DENSE_TRIM) + ']')
+
+
+def _table(func) -> bytes:
+    return bytes(func(b) & 0xFF for b in range(256))
+
+
+# _SELECT[k] turns a key plane into a 0xFF/0x00 mask of positions equal to k
+_SELECT = [_table(lambda b, k=k: 0xFF if b == k else 0) for k in range(256)]
+
+
+def _or(*planes: bytes) -> bytes:
+    """Bytewise OR of equal-length byte strings"""
+    combined = 0
+    for plane in planes:
+        combined |= int.from_bytes(plane, 'little')
+    return combined.to_bytes(len(planes[0]), 'little')
+
+
+def _lookup(keys: bytes, values: bytes, tables: Dict[int, Tuple[bytes, ...]]) -> Tuple[bytes, ...]:
+    """
+    Two-byte table lookup on whole planes
+
+    Output plane i holds tables[key][i][value] at each position (0 where the
+    key has no tables); each key's translation is masked in with big-int AND/OR.
+    """
+    size = len(values)
+    results = [0] * len(next(iter(tables.values())))
+    for key, key_tables in tables.items():
+        mask = int.from_bytes(keys.translate(_SELECT[key]), 'little')
+        if not mask:
+            continue
+        for i, table in enumerate(key_tables):
+            results[i] |= int.from_bytes(values.translate(table), 'little') & mask
+    return tuple(result.to_bytes(size, 'little') for result in results)
+
+
+class _DenseCodec:
+    """
+    Bulk bytes <-> 10-bit emoji conversion
+
+    Every 5 bytes (b0..b4) become 4 symbols (s0..s3). Each symbol is held as a
+    low byte and a 2-bit high byte, and both come out of whole byte planes
+    (data[k::5]) with shift tables and a big-int OR, e.g.
+
+        s1 = (b1 & 0x3F) << 4 | b2 >> 4
+           -> high = (b1 >> 4) & 3, low = (b1 << 4) | (b2 >> 4)
+
+    Symbols map to UTF-32 codepoint planes (and back) with _lookup: the high
+    byte of a symbol, or the second byte of a codepoint, picks the table for
+    the other byte. A final block of r < 5 bytes takes r symbols; for r == 4
+    (indistinguishable from a full block) DENSE_TRIM follows.
+    """
+
+    # byte planes -> (low, high) symbol planes
+    _ENCODE = {
+        "b0_low": _table(lambda b: b << 2), "b1_low0": _table(lambda b: b >> 6),
+        "b1_low": _table(lambda b: b << 4), "b2_low1": _table(lambda b: b >> 4),
+        "b2_low": _table(lambda b: b << 6), "b3_low2": _table(lambda b: b >> 2),
+        "b0_high": _table(lambda b: b >> 6), "b1_high": _table(lambda b: (b >> 4) & 3),
+        "b2_high": _table(lambda b: (b >> 2) & 3), "b3_high": _table(lambda b: b & 3),
+    }
+    # (low, high) symbol planes -> byte planes
+    _DECODE = {
+        "h0": _table(lambda b: (b - 1) << 6), "l0": _table(lambda b: b >> 2),
+        "l0_b1": _table(lambda b: (b & 3) << 6), "h1": _table(lambda b: (b - 1) << 4),
+        "l1": _table(lambda b: b >> 4), "l1_b2": _table(lambda b: (b & 0x0F) << 4),
+        "h2": _table(lambda b: (b - 1) << 2), "l2": _table(lambda b: b >> 6),
+        "l2_b3": _table(lambda b: (b & 0x3F) << 2), "h3": _table(lambda b: b - 1),
+    }
+
+    def __init__(self, alphabet: str):
+        self.alphabet = alphabet
+        self.plane = ord(alphabet[0]) >> 16
+        if any(ord(char) >> 16 != self.plane for char in alphabet):
+            raise ValueError("Dense alphabet must lie in a single Unicode plane")
+
+        # symbol high byte -> (codepoint byte 0, codepoint byte 1) by symbol low byte
+        to_emoji: Dict[int, Tuple[bytearray, ...]] = {}
+        # codepoint byte 1 -> (symbol low, symbol high + 1) by codepoint byte 0;
+        # a high byte of 0 marks a character outside the alphabet
+        to_symbol: Dict[int, Tuple[bytearray, ...]] = {}
+        for symbol, char in enumerate(alphabet):
+            cp = ord(char)
+            high, low = divmod(symbol, 256)
+            cp_low, cp_mid = cp & 0xFF, (cp >> 8) & 0xFF
+            emoji_tables = to_emoji.setdefault(high, (bytearray(256), bytearray(256)))
+            emoji_tables[0][low], emoji_tables[1][low] = cp_low, cp_mid
+            symbol_tables = to_symbol.setdefault(cp_mid, (bytearray(256), bytearray(256)))
+            symbol_tables[0][cp_low], symbol_tables[1][cp_low] = low, high + 1
+        self.to_emoji = {k: tuple(map(bytes, v)) for k, v in to_emoji.items()}
+        self.to_symbol = {k: tuple(map(bytes, v)) for k, v in to_symbol.items()}
+
+    def encode(self, data: bytes) -> str:
+        """Bytes to marker-prefixed emoji"""
+        return DENSE_MARKER + self.encode_symbols(data) + (DENSE_TRIM if len(data) % 5 == 4 else '')
+
+    def encode_symbols(self, data: bytes) -> str:
+        """Bytes to emoji without markers (block-aligned pieces concatenate)"""
+        if not data:
+            return ''
+        count = (len(data) // 5) * 4 + len(data) % 5
+        padded = data + bytes(-len(data) % 5)
+        b0, b1, b2, b3, b4 = (padded[k::5] for k in range(5))
+        t = self._ENCODE
+        low_planes = (
+            _or(b0.translate(t["b0_low"]), b1.translate(t["b1_low0"])),
+            _or(b1.translate(t["b1_low"]), b2.translate(t["b2_low1"])),
+            _or(b2.translate(t["b2_low"]), b3.translate(t["b3_low2"])),
+            b4,
+        )
+        high_planes = (
+            b0.translate(t["b0_high"]), b1.translate(t["b1_high"]),
+            b2.translate(t["b2_high"]), b3.translate(t["b3_high"]),
+        )
+
+        low, high = bytearray(4 * len(b0)), bytearray(4 * len(b0))
+        for j in range(4):
+            low[j::4], high[j::4] = low_planes[j], high_planes[j]
+        cp_low, cp_mid = _lookup(bytes(high[:count]), bytes(low[:count]), self.to_emoji)
+
+        out = bytearray(4 * count)
+        out[0::4], out[1::4], out[2::4] = cp_low, cp_mid, bytes([self.plane]) * count
+        return out.decode('utf-32-le')
+
+    def decode(self, emoji_str: str) -> bytes:
+        """
+        Marker-prefixed emoji back to bytes
+
+        Raises:
+            ValueError: For characters outside the alphabet, misplaced markers
+                or non-zero padding bits
+        """
+        body = emoji_str[len(DENSE_MARKER):].replace(VARIATION_SELECTOR, '')
+        trimmed = body.endswith(DENSE_TRIM)
+        if trimmed:
+            body = body[:-len(DENSE_TRIM)]
+        return self.decode_symbols(body, trimmed)
+
+    def decode_symbols(self, body: str, trimmed: bool = False) -> bytes:
+        """
+        Emoji without markers back to bytes
+
+        Args:
+            body: Alphabet emoji only
+            trimmed: The string ended with DENSE_TRIM
+
+        Raises:
+            ValueError: For characters outside the alphabet or non-zero padding bits
+        """
+        count = len(body)
+        try:
+            raw = body.encode('utf-32-le')
+        except UnicodeEncodeError:  # lone surrogates
+            raw = None
+        if raw is not None:
+            low, high = _lookup(raw[1::4], raw[0::4], self.to_symbol)
+        if (
+            raw is None
+            or 0 in high
+            or raw[2::4].count(self.plane) != count
+            or raw[3::4].count(0) != count
+        ):
+            unknown = [char for char in body if char not in self.alphabet]
+            sample = ''.join(unknown[:5])
+            raise ValueError(f"Invalid emoji characters detected: '{sample}...' ({len(unknown)} total). The encrypted message may have been corrupted or tampered with.")
+
+        blocks, rest = divmod(count, 4)
+        if trimmed and (rest or not blocks):
+            raise ValueError("Invalid emoji format - misplaced end marker")
+        length = 5 * blocks + rest - (1 if trimmed else 0)
+
+        low += bytes(-count % 4)
+        high += b'\x01' * (-count % 4)
+        l0, l1, l2, l3 = (low[j::4] for j in range(4))
+        h0, h1, h2, h3 = (high[j::4] for j in range(4))
+        t = self._DECODE
+        planes = (
+            _or(h0.translate(t["h0"]), l0.translate(t["l0"])),
+            _or(l0.translate(t["l0_b1"]), h1.translate(t["h1"]), l1.translate(t["l1"])),
+            _or(l1.translate(t["l1_b2"]), h2.translate(t["h2"]), l2.translate(t["l2"])),
+            _or(l2.translate(t["l2_b3"]), h3.translate(t["h3"])),
+            l3,
+        )
+
+        data = bytearray(5 * len(l0))
+        for k in range(5):
+            data[k::5] = planes[k]
+        if any(data[length:]):
+            raise ValueError("Invalid emoji format - non-zero padding bits. The message may have been tampered with.")
+        return bytes(data[:length])
+
+
+_dense_codec = _DenseCodec(DENSE_ALPHABET)
+
+
+def dense_length(size: int) -> int:
+    """Number of emoji (codepoints) in the dense encoding of size bytes, markers included"""
+    return 1 + 4 * (size // 5) + size % 5 + (1 if size % 5 == 4 else 0)
+
+
+class EmojiStreamEncoder:
+    """
+    Incremental dense (v2) encoder, same interface as codecs.IncrementalEncoder
+
+    Whole 5-byte blocks are converted as they arrive; at most 4 bytes are
+    held back, so output of any size is produced in bounded memory.
+    """
+
+    def __init__(self):
+        self._pending = b''
+        self._started = False
+
+    def encode(self, data: bytes, final: bool = False) -> str:
+        """Emoji for the blocks completed by data (everything left when final)"""
+        data = self._pending + data
+        prefix = '' if self._started else DENSE_MARKER
+        self._started = True
+        if final:
+            self._pending = b''
+            return prefix + _dense_codec.encode(data)[len(DENSE_MARKER):]
+        cut = len(data) - len(data) % 5
+        self._pending = data[cut:]
+        return prefix + _dense_codec.encode_symbols(data[:cut])
+
+
+class EmojiStreamDecoder:
+    """
+    Incremental dense (v2) decoder, same interface as codecs.IncrementalDecoder
+
+    Accepts text split anywhere (whitespace and U+FE0F are dropped). The last
+    4-emoji group is held back until more input or final, since a trailing
+    DENSE_TRIM changes how many bytes it holds.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._started = False
+        self._trimmed = False
+
+    def decode(self, text: str, final: bool = False) -> bytes:
+        """
+        Bytes for the groups completed by text (everything left when final)
+
+        Raises:
+            ValueError: For input that is not a dense emoji stream, or is
+                corrupted or truncated
+        """
+        text = ''.join(text.split()).replace(VARIATION_SELECTOR, '')
+        if self._trimmed and text:
+            raise ValueError("Invalid emoji format - data after the end marker")
+        self._buffer += text
+
+        if not self._started:
+            if len(self._buffer) < len(DENSE_MARKER) and not final:
+                return b''
+            if not self._buffer.startswith(DENSE_MARKER):
+                raise ValueError("Invalid emoji format - not a dense (v2) emoji stream")
+            self._buffer = self._buffer[len(DENSE_MARKER):]
+            self._started = True
+        if self._buffer.endswith(DENSE_TRIM):
+            self._buffer = self._buffer[:-len(DENSE_TRIM)]
+            self._trimmed = True
+
+        if final:
+            body, self._buffer = self._buffer, ''
+            return _dense_codec.decode_symbols(body, self._trimmed)
+        cut = len(self._buffer) - 4 - len(self._buffer) % 4
+        if cut <= 0:
+            return b''
+        body, self._buffer = self._buffer[:cut], self._buffer[cut:]
+        return _dense_codec.decode_symbols(body)
+
+
+def encode_chunks(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Dense emoji text for a byte stream, one piece per input chunk"""
+    encoder = EmojiStreamEncoder()
+    for chunk in chunks:
+        piece = encoder.encode(chunk)
+        if piece:
+            yield piece
+    yield encoder.encode(b'', final=True)
+
+
+def decode_chunks(chunks: Iterable[str]) -> Iterator[bytes]:
+    """Bytes for a dense emoji text stream, split anywhere"""
+    decoder = EmojiStreamDecoder()
+    for chunk in chunks:
+        data = decoder.decode(chunk)
+        if data:
+            yield data
+    tail = decoder.decode('', final=True)
+    if tail:
+        yield tail
+
+
+class EmojiStreamReader(io.RawIOBase):
+    """
+    Binary file object decoding a UTF-8 dense emoji text file on the fly
+
+    Lets byte-oriented consumers (e.g. the chunked stream decryptor) read an
+    emoji-encoded upload without decoding it all first.
+    """
+
+    def __init__(self, raw: BinaryIO, read_size: int = 256 * 1024):
+        super().__init__()
+        self._raw = raw
+        self._read_size = read_size
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._emoji = EmojiStreamDecoder()
+        self._buffer = bytearray()
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while len(self._buffer) < len(buffer) and not self._eof:
+            data = self._raw.read(self._read_size)
+            self._eof = not data
+            try:
+                text = self._text.decode(data, final=self._eof)
+            except UnicodeDecodeError:
+                raise ValueError("Invalid emoji file - not UTF-8 text")
+            self._buffer += self._emoji.decode(text, final=self._eof)
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        del self._buffer[:size]
+        return size
+
+
+def _build_header(encrypted_data: Dict[str, Any], lengths: List[int]) -> str:
+    """
+    v1 length header: "24:24:24:24:argon2[:2:65536:4][:c2][:z1]|"
+
+    This tells us where to split when decoding; KDF parameters follow the KDF
+    name in PARAM_ORDER when the payload records them, then the recorded
+    cipher as "c<code>" and a compression codec as "z<code>". The cipher is
+    kept even when it is the default: the ids are authenticated with the
+    content, so dropping one would make the payload undecryptable.
+    """
+    kdf = encrypted_data.get('kdf', 'argon2')
+    kdf_params = encrypted_data.get('kdf_params')
+    cipher = encrypted_data.get('cipher')
+    codec = encrypted_data.get('compression')
+
+    header = ':'.join(map(str, lengths)) + f":{kdf}"
+    if kdf_params and kdf in PARAM_ORDER:
+        header += ''.join(f":{kdf_params[name]}" for name in PARAM_ORDER[kdf])
+    if cipher:
+        header += f":c{CIPHER_CODES[cipher]}"
+    if codec:
+        header += f":z{CODEC_CODES[codec]}"
+    return header + "|"
+
+
+def _parse_header(header: str) -> Tuple[List[int], Dict[str, Any]]:
+    """
+    Undo _build_header (without the trailing "|")
+
+    Returns:
+        (component lengths, dict with kdf and any kdf_params, cipher, compression)
+    """
+    parts = header.split(':')
+    if len(parts) < 4:
+        raise ValueError(f"Invalid header format - expected lengths for 4 components, got {len(parts)}")
+
+    # Optional tagged parts after the KDF: "c<cipher code>", "z<codec code>"
+    tagged = {}
+    while len(parts) > 5 and parts[-1][:1] in ('c', 'z') and parts[-1][:1] not in tagged:
+        part = parts.pop()
+        names = CIPHER_NAMES if part[0] == 'c' else CODEC_NAMES
+        if not part[1:].isdigit() or int(part[1:]) not in names:
+            raise ValueError("Invalid header format - unknown cipher or compression codec")
+        tagged[part[0]] = names[int(part[1:])]
+
+    lengths = [int(part) for part in parts[:4]]
+    fields: Dict[str, Any] = {"kdf": parts[4] if len(parts) > 4 else "argon2"}
+    if len(parts) > 5:
+        names = PARAM_ORDER.get(fields["kdf"], ())
+        if len(parts) - 5 != len(names):
+            raise ValueError("Invalid header format - KDF parameters don't match the KDF")
+        fields["kdf_params"] = {name: int(value) for name, value in zip(names, parts[5:])}
+    if 'c' in tagged:
+        fields["cipher"] = tagged['c']
+    if 'z' in tagged:
+        fields["compression"] = tagged['z']
+    return lengths, fields
+
+
+def _split_components(data: str, lengths: List[int]) -> List[str]:
+    """Cut ciphertext, salt, nonce and tag out of the decoded text by length"""
+    components, pos = [], 0
+    for length in lengths:
+        components.append(data[pos:pos + length])
+        pos += length
+
+    # SECURITY: Check for extra data (tampering detection)
+    expected_total = sum(lengths)
+    if len(data) > expected_total:
+        extra_chars = len(data) - expected_total
+        raise ValueError(f"Extra data detected after encrypted message ({extra_chars} extra characters). The message may have been tampered with.")
+
+    logger.debug("Emoji decode: lengths=%s, data=%d", lengths, len(data))
+
+    # Validate we got all components
+    if not all(components):
+        raise ValueError("One or more encrypted components are empty or corrupted")
+
+    if [len(c) for c in components] != lengths:
+        actual_lens = "ct={}, salt={}, nonce={}, tag={}".format(*map(len, components))
+        expected_lens = "ct={}, salt={}, nonce={}, tag={}".format(*lengths)
+        raise ValueError(f"Component lengths don't match. Expected: {expected_lens}, Got: {actual_lens}. Total data available: {len(data)} chars")
+    return components
+
 
 class EmojiEncoder:
     """Encode/decode ciphertext as emoji sequences"""
     
     @staticmethod
-    def encode(encrypted_data: Dict[str, str]) -> str:
+    def encode(encrypted_data: Dict[str, Any], version: Optional[int] = None) -> str:
         """
         Convert encrypted data to emoji string (NO separators - continuous emoji string)
         
         Args:
             encrypted_data: Dict with ciphertext, salt, nonce, tag
+            version: 1 (base64 alphabet) or 2 (dense); defaults to EMOJI_VERSION
             
         Returns:
             Emoji-encoded string with length prefix
         """
+        version = version or settings.EMOJI_VERSION
+        if version not in (1, 2):
+            raise ValueError(f"Unsupported emoji format version: {version}")
+        
+        if version == 2:
+            return _dense_codec.encode(envelope.pack(encrypted_data))
+        if encrypted_data.get('mode') == envelope.ENVELOPE_MODE:
+            raise ValueError("Multi-recipient payloads need emoji format version 2")
+        
         # Ensure base64 strings have proper padding
         def pad_base64(s: str) -> str:
             """Add padding to base64 string if needed"""
@@ -60,46 +607,32 @@ class EmojiEncoder:
             return s
         
         # Pad all components
-        ciphertext = pad_base64(encrypted_data['ciphertext'])
-        salt = pad_base64(encrypted_data['salt'])
-        nonce = pad_base64(encrypted_data['nonce'])
-        tag = pad_base64(encrypted_data['tag'])
-        kdf = encrypted_data.get('kdf', 'argon2')
-        
-        # Debug: Log what we're encoding
-        print(f"DEBUG ENCODE - Original tag: '{encrypted_data['tag']}' (len={len(encrypted_data['tag'])})")
-        print(f"DEBUG ENCODE - Padded tag: '{tag}' (len={len(tag)})")
-        
-        # Get component lengths for decoding later
-        ct_len = len(ciphertext)
-        salt_len = len(salt)
-        nonce_len = len(nonce)
-        tag_len = len(tag)
-        
-        print(f"DEBUG ENCODE - Header will say: ct={ct_len}, salt={salt_len}, nonce={nonce_len}, tag={tag_len}")
+        components = [
+            pad_base64(encrypted_data[name]) for name in ('ciphertext', 'salt', 'nonce', 'tag')
+        ]
         
-        # Create length header (format: "CT:24,S:24,N:24,T:24,K:argon2|")
-        # This tells us where to split when decoding
-        header = f"{ct_len}:{salt_len}:{nonce_len}:{tag_len}:{kdf}|"
+        lengths = [len(c) for c in components]
+        logger.debug("Emoji encode: ct=%d, salt=%d, nonce=%d, tag=%d", *lengths)
         
         # Combine header + all components (NO separators between encrypted data)
-        combined = header + ciphertext + salt + nonce + tag
+        combined = _build_header(encrypted_data, lengths) + ''.join(components)
         
         # Convert to emojis
-        emoji_str = ''.join(EMOJI_MAP.get(char, char) for char in combined)
-        
-        return emoji_str
+        return _codec.encode(combined)
     
     @staticmethod
-    def decode(emoji_str: str) -> Dict[str, str]:
+    def decode(emoji_str: str) -> Dict[str, Any]:
         """
         Convert emoji string back to encrypted data (using length-prefix decoding)
         
+        Either format is accepted; v2 strings are recognised by DENSE_MARKER.
+        
         Args:
             emoji_str: Emoji-encoded ciphertext
             
         Returns:
-            Dict with ciphertext, salt, nonce, tag, kdf
+            Dict with ciphertext, salt, nonce, tag, kdf (and kdf_params, cipher
+            and compression if encoded)
             
         Raises:
             ValueError: If emoji format is invalid
@@ -108,23 +641,17 @@ class EmojiEncoder:
             raise ValueError("Empty emoji ciphertext")
         
         # Clean the input (remove whitespace, newlines)
-        emoji_str = emoji_str.strip()
+        emoji_str = ''.join(emoji_str.split())
         
-        # Convert emojis back to base64/text
-        decoded_str = ''
-        unknown_chars = []
-        for char in emoji_str:
-            if char in EMOJI_TO_B64:
-                decoded_str += EMOJI_TO_B64[char]
-            elif char in [' ', '\n', '\r', '\t']:
-                # Skip whitespace
-                continue
-            else:
-                # Keep track of unknown characters for debugging
-                unknown_chars.append(char)
+        if emoji_str.startswith(DENSE_MARKER):
+            return EmojiEncoder._decode_dense(emoji_str)
+        
+        # Convert emojis back to base64/text in one validated pass
+        decoded_str = _codec.decode(emoji_str)
         
         # SECURITY: Reject if unknown emojis were added
-        if unknown_chars:
+        if decoded_str is None:
+            unknown_chars = INVALID_CHARS.findall(emoji_str)
             # Show first few unknown chars for debugging
             sample = ''.join(unknown_chars[:5])
             raise ValueError(f"Invalid emoji characters detected: '{sample}...' ({len(unknown_chars)} total). The encrypted message may have been corrupted or tampered with.")
@@ -136,68 +663,25 @@ class EmojiEncoder:
                 raise ValueError("Invalid format - no header found. Ensure you copied the complete emoji string.")
             
             header, data = decoded_str.split('|', 1)
+            lengths, fields = _parse_header(header)
             
-            # Parse header: "24:24:24:24:argon2"
-            parts = header.split(':')
-            if len(parts) < 4:
-                raise ValueError(f"Invalid header format - expected lengths for 4 components, got {len(parts)}")
-            
-            ct_len = int(parts[0])
-            salt_len = int(parts[1])
-            nonce_len = int(parts[2])
-            tag_len = int(parts[3])
-            kdf = parts[4] if len(parts) > 4 else "argon2"
-            
-            # Extract components based on lengths
-            pos = 0
-            ciphertext = data[pos:pos + ct_len]
-            pos += ct_len
-            
-            salt = data[pos:pos + salt_len]
-            pos += salt_len
-            
-            nonce = data[pos:pos + nonce_len]
-            pos += nonce_len
-            
-            tag = data[pos:pos + tag_len]
-            pos += tag_len
-            
-            # SECURITY: Check for extra data (tampering detection)
-            expected_total = ct_len + salt_len + nonce_len + tag_len
-            if len(data) > expected_total:
-                extra_chars = len(data) - expected_total
-                raise ValueError(f"Extra data detected after encrypted message ({extra_chars} extra characters). The message may have been tampered with.")
-            
-            # Debug decode
-            print(f"DEBUG DECODE - Header said: ct={ct_len}, salt={salt_len}, nonce={nonce_len}, tag={tag_len}")
-            print(f"DEBUG DECODE - Extracted tag: '{tag}' (len={len(tag)})")
-            print(f"DEBUG DECODE - Total data length: {len(data)}, Expected: {expected_total}")
-            
-            # Validate we got all components
-            if not all([ciphertext, salt, nonce, tag]):
-                raise ValueError("One or more encrypted components are empty or corrupted")
-            
-            # Debug: show what we got vs what we expected
-            actual_lens = f"ct={len(ciphertext)}, salt={len(salt)}, nonce={len(nonce)}, tag={len(tag)}"
-            expected_lens = f"ct={ct_len}, salt={salt_len}, nonce={nonce_len}, tag={tag_len}"
-            
-            if len(ciphertext) != ct_len or len(salt) != salt_len or len(nonce) != nonce_len or len(tag) != tag_len:
-                raise ValueError(f"Component lengths don't match. Expected: {expected_lens}, Got: {actual_lens}. Total data available: {len(data)} chars")
-            
-            # Return the components (they already have correct padding)
-            return {
-                "ciphertext": ciphertext,
-                "salt": salt,
-                "nonce": nonce,
-                "tag": tag,
-                "kdf": kdf
-            }
+            # Extract components based on lengths (they already have correct padding)
+            ciphertext, salt, nonce, tag = _split_components(data, lengths)
+            return {"ciphertext": ciphertext, "salt": salt, "nonce": nonce, "tag": tag, **fields}
             
         except ValueError as e:
             raise e
         except Exception as e:
             raise ValueError(f"Failed to decode emoji ciphertext: {str(e)}")
     
+    @staticmethod
+    def _decode_dense(emoji_str: str) -> Dict[str, Any]:
+        """Decode a v2 string (whitespace already removed)"""
+        data = _dense_codec.decode(emoji_str)
+        if not envelope.is_packed(data):
+            raise ValueError("Invalid format - not a SecureCom+ payload. Ensure you copied the complete emoji string.")
+        return envelope.unpack(data)
+    
     @staticmethod
     def get_emoji_stats(emoji_str: str) -> Dict[str, int]:
         """
@@ -209,10 +693,16 @@ class EmojiEncoder:
         Returns:
             Dict with length, unique_emojis, emoji_count
         """
+        if emoji_str.startswith(DENSE_MARKER):
+            emoji_count = len(DENSE_CHARS.findall(emoji_str))
+        elif _codec.decode(emoji_str) is not None:
+            emoji_count = len(emoji_str)
+        else:
+            emoji_count = len(ALPHABET_CHARS.findall(emoji_str))
         return {
             "length": len(emoji_str),
             "unique_emojis": len(set(emoji_str)),
-            "emoji_count": sum(1 for char in emoji_str if char in EMOJI_TO_B64)
+            "emoji_count": emoji_count
         }
 
 
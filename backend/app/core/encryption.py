@@ -1,43 +1,110 @@
 """
-Core AES-256-GCM Encryption Engine with Argon2/PBKDF2 KDF
+Core AEAD Encryption Engine (AES-256-GCM / ChaCha20-Poly1305) with Argon2/PBKDF2 KDF
 """
 
 import os
+import asyncio
 import base64
-from typing import Dict
-from Crypto.Cipher import AES
+import hashlib
+import hmac
+from typing import BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 from Crypto.Protocol.KDF import PBKDF2
 from argon2 import PasswordHasher
 from argon2.low_level import hash_secret_raw, Type
 
 from app.core.config import settings
+from app.core.executor import crypto_executor
+from app.core.admission import AdmissionRejected, kdf_admission
+from app.core import streaming
+from app.core.key_cache import DerivedKeyCache
+from app.core.kdf import LEGACY_KDF_PARAMS, normalize_params
+from app.core.ciphers import DEFAULT_CIPHER, AuthenticationError, get_cipher
+from app.core.compression import compress, decompress
+from app.core.envelope import ENVELOPE_MODE
+
+PBKDF2_ITERATIONS = LEGACY_KDF_PARAMS["pbkdf2"]["iterations"]
+
+KEY_ID_CONTEXT = b"securecom key slot"
+# Associated data binding a payload's cipher and codec ids to its ciphertext
+CONTENT_AAD_CONTEXT = b"securecom content v1"
+
+Passwords = Union[str, Sequence[str]]
 
 
 class EncryptionEngine:
-    """AES-256-GCM encryption with password-based key derivation"""
+    """AEAD encryption with password-based key derivation"""
     
-    def __init__(self, kdf_algorithm: str = None):
+    def __init__(
+        self,
+        kdf_algorithm: str = None,
+        key_cache: Optional[DerivedKeyCache] = None,
+        cipher: Optional[str] = None,
+        parallelism: Optional[int] = None,
+        compression: Optional[str] = None
+    ):
         self.kdf_algorithm = kdf_algorithm or settings.KDF_ALGORITHM
         self.key_size = 32  # 256 bits
+        self.key_cache = key_cache  # opt-in cache for repeat decryptions
+        if cipher is None and settings.CIPHER != "auto":
+            cipher = settings.CIPHER
+        self.cipher_id = get_cipher(cipher or DEFAULT_CIPHER).cipher_id
+        # Chunks sealed/opened at once in streamed files (1 = sequential)
+        self.parallelism = streaming.resolve_workers(parallelism)
+        # Default compression policy (None = COMPRESSION setting); see app.core.compression
+        self.compression = compression
+    
+    def __getstate__(self):
+        # The key cache stays in this process (process-pool workers get none)
+        state = self.__dict__.copy()
+        state["key_cache"] = None
+        return state
         
-    def derive_key(self, password: str, salt: bytes) -> bytes:
+    def kdf_params(self, kdf: Optional[str] = None) -> Dict[str, int]:
+        """
+        Current cost parameters for a KDF
+        
+        Args:
+            kdf: KDF name (defaults to this engine's algorithm)
+            
+        Returns:
+            Argon2: time_cost, memory_cost, parallelism; PBKDF2: iterations
+        """
+        if (kdf or self.kdf_algorithm) == "argon2":
+            return {
+                "time_cost": settings.ARGON2_TIME_COST,
+                "memory_cost": settings.ARGON2_MEMORY_COST,
+                "parallelism": settings.ARGON2_PARALLELISM
+            }
+        return {"iterations": PBKDF2_ITERATIONS}
+    
+    def derive_key(
+        self,
+        password: str,
+        salt: bytes,
+        kdf: Optional[str] = None,
+        params: Optional[Dict[str, int]] = None
+    ) -> bytes:
         """
         Derive encryption key from password using Argon2id or PBKDF2
         
         Args:
             password: User password
             salt: Random salt (16 bytes)
+            kdf: KDF name (defaults to this engine's algorithm)
+            params: Cost parameters (defaults to kdf_params())
             
         Returns:
             Derived key (32 bytes)
         """
-        if self.kdf_algorithm == "argon2":
+        kdf = kdf or self.kdf_algorithm
+        params = params or self.kdf_params(kdf)
+        if kdf == "argon2":
             return hash_secret_raw(
                 secret=password.encode('utf-8'),
                 salt=salt,
-                time_cost=settings.ARGON2_TIME_COST,
-                memory_cost=settings.ARGON2_MEMORY_COST,
-                parallelism=settings.ARGON2_PARALLELISM,
+                time_cost=params["time_cost"],
+                memory_cost=params["memory_cost"],
+                parallelism=params["parallelism"],
                 hash_len=self.key_size,
                 type=Type.ID
             )
@@ -46,45 +113,49 @@ class EncryptionEngine:
                 password,
                 salt,
                 dkLen=self.key_size,
-                count=100000
+                count=params["iterations"]
             )
     
-    def encrypt(self, plaintext: str, password: str) -> Dict[str, str]:
+    def encrypt(
+        self,
+        plaintext: str,
+        password: Passwords,
+        compression: Optional[str] = None
+    ) -> Dict[str, str]:
         """
-        Encrypt plaintext with password using AES-256-GCM
+        Encrypt plaintext with password using the engine's AEAD cipher
         
         Args:
             plaintext: Text to encrypt
-            password: Encryption password
+            password: Encryption password, or a list of passwords (envelope
+                payload with one key slot per password)
+            compression: Compression policy for this call (off/auto/zlib/lzma,
+                defaults to the engine's policy)
             
         Returns:
-            Dictionary with base64-encoded ciphertext, salt, nonce, tag, kdf
+            Dictionary with base64-encoded ciphertext, salt, nonce, tag,
+            plus kdf, kdf_params and cipher
         """
-        # Generate random salt and nonce
-        salt = os.urandom(16)
-        nonce = os.urandom(16)
+        if not isinstance(password, str):
+            return self.encrypt_bytes(plaintext.encode('utf-8'), password, compression=compression)
         
-        # Derive key from password
-        key = self.derive_key(password, salt)
+        # Generate random salt
+        salt = os.urandom(16)
         
-        # Create cipher and encrypt
-        cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
-        ciphertext, tag = cipher.encrypt_and_digest(plaintext.encode('utf-8'))
+        # Derive key from password (parameters are recorded in the payload)
+        params = self.kdf_params()
+        key = self.derive_key(password, salt, params=params)
         
-        return {
-            "ciphertext": base64.b64encode(ciphertext).decode('utf-8'),
-            "salt": base64.b64encode(salt).decode('utf-8'),
-            "nonce": base64.b64encode(nonce).decode('utf-8'),
-            "tag": base64.b64encode(tag).decode('utf-8'),
-            "kdf": self.kdf_algorithm
-        }
+        # Encrypt under a fresh nonce
+        return self._seal(plaintext.encode('utf-8'), key, salt, params, compression)
     
     def decrypt(self, encrypted_data: Dict[str, str], password: str) -> str:
         """
         Decrypt ciphertext with password
         
         Args:
-            encrypted_data: Dict with ciphertext, salt, nonce, tag (base64)
+            encrypted_data: Dict with ciphertext, salt, nonce, tag (base64);
+                kdf/kdf_params/cipher are honoured when present
             password: Decryption password
             
         Returns:
@@ -93,64 +164,60 @@ class EncryptionEngine:
         Raises:
             ValueError: If decryption fails (wrong password or corrupted data)
         """
-        try:
-            # Decode base64 components
+        if self.is_envelope(encrypted_data):
             try:
-                ciphertext = base64.b64decode(encrypted_data["ciphertext"])
-                salt = base64.b64decode(encrypted_data["salt"])
-                nonce = base64.b64decode(encrypted_data["nonce"])
-                tag = base64.b64decode(encrypted_data["tag"])
+                plaintext = self._open_envelope(encrypted_data, password)
             except Exception as e:
-                raise ValueError(f"Invalid encrypted data format - data may be corrupted or incomplete. If using emoji format, ensure you copied the entire string including 🔥 separators. Error: {str(e)}")
-            
-            # Derive key from password
-            key = self.derive_key(password, salt)
+                raise self._decryption_error(e)
+            return self._decode_text(plaintext)
+        
+        ciphertext, salt, nonce, tag = self._decode_components(encrypted_data)
+        kdf, params = self._payload_kdf(encrypted_data)
+        try:
+            # Derive key from password with the payload's KDF parameters
+            key = self._derive_decryption_key(password, salt, kdf, params)
             
             # Create cipher and decrypt
-            cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
-            plaintext = cipher.decrypt_and_verify(ciphertext, tag)
-            
-            # Decode to UTF-8 (for text data only)
-            try:
-                return plaintext.decode('utf-8')
-            except UnicodeDecodeError:
-                raise ValueError("Decryption failed - this appears to be binary data (file). Use file decryption endpoint instead of text decryption.")
-            
-        except ValueError as e:
-            # Re-raise ValueError with original message
-            raise e
+            plaintext = self._open(
+                ciphertext, nonce, tag, key,
+                encrypted_data.get("cipher"), encrypted_data.get("compression")
+            )
         except Exception as e:
-            error_msg = str(e).lower()
-            if "mac check failed" in error_msg or "verify" in error_msg:
-                raise ValueError("Decryption failed - wrong password")
-            else:
-                raise ValueError(f"Decryption failed: {str(e)}")
+            raise self._decryption_error(e)
+        
+        return self._decode_text(plaintext)
     
-    def encrypt_bytes(self, data: bytes, password: str) -> Dict[str, str]:
+    def encrypt_bytes(
+        self,
+        data: bytes,
+        password: Passwords,
+        envelope: bool = False,
+        compression: Optional[str] = None
+    ) -> Dict[str, str]:
         """
         Encrypt binary data (for files)
         
         Args:
             data: Binary data to encrypt
-            password: Encryption password
+            password: Encryption password, or a list of passwords; the data is
+                encrypted once and any one of them can decrypt it
+            envelope: Seal the data under a random data key wrapped by the
+                password, so rewrap() can change the password without
+                re-encrypting the data (implied by a list of passwords)
+            compression: Compression policy for this call (off/auto/zlib/lzma,
+                defaults to the engine's policy)
             
         Returns:
             Dictionary with base64-encoded encrypted components
         """
         salt = os.urandom(16)
-        nonce = os.urandom(16)
-        key = self.derive_key(password, salt)
+        params = self.kdf_params()
+        if isinstance(password, str) and not envelope:
+            key = self.derive_key(password, salt, params=params)
+            return self._seal(data, key, salt, params, compression)
         
-        cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
-        ciphertext, tag = cipher.encrypt_and_digest(data)
-        
-        return {
-            "ciphertext": base64.b64encode(ciphertext).decode('utf-8'),
-            "salt": base64.b64encode(salt).decode('utf-8'),
-            "nonce": base64.b64encode(nonce).decode('utf-8'),
-            "tag": base64.b64encode(tag).decode('utf-8'),
-            "kdf": self.kdf_algorithm
-        }
+        keks = [self.derive_key(p, salt, params=params) for p in self._recipients(password)]
+        return self._seal_envelope(data, keks, salt, params, compression)
     
     def decrypt_bytes(self, encrypted_data: Dict[str, str], password: str) -> bytes:
         """
@@ -167,19 +234,711 @@ class EncryptionEngine:
             ValueError: If decryption fails
         """
         try:
-            ciphertext = base64.b64decode(encrypted_data["ciphertext"])
-            salt = base64.b64decode(encrypted_data["salt"])
-            nonce = base64.b64decode(encrypted_data["nonce"])
-            tag = base64.b64decode(encrypted_data["tag"])
+            if self.is_envelope(encrypted_data):
+                return self._open_envelope(encrypted_data, password)
             
-            key = self.derive_key(password, salt)
-            cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
+            ciphertext, salt, nonce, tag = self._decode_raw(encrypted_data)
+            kdf, params = self._payload_kdf(encrypted_data)
+            key = self._derive_decryption_key(password, salt, kdf, params)
             
-            return cipher.decrypt_and_verify(ciphertext, tag)
+            return self._open(
+                ciphertext, nonce, tag, key,
+                encrypted_data.get("cipher"), encrypted_data.get("compression")
+            )
             
         except Exception as e:
             raise ValueError(f"Decryption failed: {str(e)}")
+    
+    def rewrap(self, encrypted_data: Dict[str, str], password: str, new_password: str) -> Dict[str, str]:
+        """
+        Change the password of an envelope payload without touching its data
+        
+        Only the key slot unlocked by password is rewritten (current KDF
+        parameters), so the cost is one KDF run per password regardless of
+        payload size. Other recipients' slots are kept as they are.
+        
+        Args:
+            encrypted_data: Envelope payload (from encrypt_bytes(envelope=True))
+            password: Current password
+            new_password: Password for the new key slot
+            
+        Returns:
+            The payload with a new key slot; ciphertext, nonce and tag are unchanged
+            
+        Raises:
+            ValueError: If the payload is not an envelope or the password is wrong
+        """
+        slots = self._key_slots(encrypted_data)
+        try:
+            index, key = self._unlock(slots, password)
+        except Exception as e:
+            raise self._decryption_error(e)
+        
+        salt = self._rewrap_salt(slots, index)
+        params = self.kdf_params()
+        kek = self.derive_key(new_password, salt, params=params)
+        return self._replace_slot(encrypted_data, slots, index, self._wrap_key(key, kek, salt, params))
+    
+    @staticmethod
+    def is_envelope(encrypted_data: Dict[str, str]) -> bool:
+        """True for payloads sealed under a wrapped data key"""
+        return encrypted_data.get("mode") == ENVELOPE_MODE
+    
+    def encrypt_many(
+        self,
+        plaintexts: List[str],
+        password: str,
+        compression: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Encrypt many messages under one password with a single key derivation
+        
+        All items share one salt (so one KDF run) and each gets its own random
+        nonce. Every item is a regular payload that decrypt() accepts on its own.
+        
+        Args:
+            plaintexts: Texts to encrypt
+            password: Encryption password
+            
+        Returns:
+            List of encrypted payloads, in input order
+        """
+        salt = os.urandom(16)
+        params = self.kdf_params()
+        key = self.derive_key(password, salt, params=params)
+        return self._seal_many([p.encode('utf-8') for p in plaintexts], key, salt, params, compression)
+    
+    def decrypt_many(self, items: List[Dict[str, str]], password: str) -> List[str]:
+        """
+        Decrypt many payloads, deriving the key once per distinct salt/KDF
+        
+        Args:
+            items: Encrypted payloads (e.g. from encrypt_many)
+            password: Decryption password
+            
+        Returns:
+            Decrypted plaintexts, in input order
+            
+        Raises:
+            ValueError: If any item fails (message names the item index)
+        """
+        keys: Dict[tuple, bytes] = {}
+        results = []
+        for index, encrypted_data in enumerate(items):
+            try:
+                ciphertext, salt, nonce, tag = self._decode_components(encrypted_data)
+                kdf, params = self._payload_kdf(encrypted_data)
+                try:
+                    group = (salt, kdf, tuple(sorted(params.items())))
+                    if group not in keys:
+                        keys[group] = self._derive_decryption_key(password, salt, kdf, params)
+                    plaintext = self._open(
+                        ciphertext, nonce, tag, keys[group],
+                        encrypted_data.get("cipher"), encrypted_data.get("compression")
+                    )
+                except Exception as e:
+                    raise self._decryption_error(e)
+                results.append(self._decode_text(plaintext))
+            except ValueError as e:
+                raise ValueError(f"Item {index}: {str(e)}")
+        return results
+    
+    def iter_encrypt_stream(
+        self,
+        reader: BinaryIO,
+        password: str,
+        metadata: bytes = b"",
+        chunk_size: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """
+        Encrypt a readable stream into the chunked stream format
+        
+        The key is derived before this returns; the returned iterator then
+        reads and encrypts chunk by chunk in constant memory, sealing up to
+        self.parallelism chunks at once.
+        
+        Args:
+            reader: Binary stream with the plaintext
+            password: Encryption password
+            metadata: Authenticated (not encrypted) bytes stored in the header
+            chunk_size: Plaintext bytes per chunk (defaults to STREAM_CHUNK_SIZE)
+            
+        Returns:
+            Iterator over the encrypted stream's bytes
+        """
+        header = self._new_stream_header(metadata, chunk_size)
+        key = self.derive_key(password, header.salt, header.kdf, header.kdf_params)
+        return streaming.encrypt_chunks(reader, key, header, self.parallelism)
+    
+    def open_stream(
+        self,
+        reader: BinaryIO,
+        password: str
+    ) -> Tuple[streaming.StreamHeader, Iterator[bytes]]:
+        """
+        Read a stream header, derive its key and prepare chunk decryption
+        
+        Args:
+            reader: Binary stream positioned at the start of an encrypted stream
+            password: Decryption password
+            
+        Returns:
+            (header, iterator over authenticated plaintext chunks)
+            
+        Raises:
+            ValueError: If the header is invalid (chunk errors surface while iterating)
+        """
+        header = streaming.StreamHeader.read(reader)
+        key = self._derive_decryption_key(password, header.salt, header.kdf, header.kdf_params)
+        return header, streaming.decrypt_chunks(reader, key, header, self.parallelism)
+    
+    def encrypt_stream(
+        self,
+        reader: BinaryIO,
+        writer: BinaryIO,
+        password: str,
+        metadata: bytes = b"",
+        chunk_size: Optional[int] = None
+    ) -> int:
+        """
+        Encrypt reader into writer in constant memory
+        
+        Returns:
+            Number of bytes written
+        """
+        written = 0
+        for piece in self.iter_encrypt_stream(reader, password, metadata, chunk_size):
+            writer.write(piece)
+            written += len(piece)
+        return written
+    
+    def decrypt_stream(self, reader: BinaryIO, writer: BinaryIO, password: str) -> bytes:
+        """
+        Decrypt reader into writer in constant memory
+        
+        Plaintext is written chunk by chunk as each chunk authenticates; on
+        error the writer may hold a verified prefix and should be discarded.
+        
+        Returns:
+            The header metadata
+            
+        Raises:
+            ValueError: On wrong password, tampering, truncation or reordering
+        """
+        header, chunks = self.open_stream(reader, password)
+        for chunk in chunks:
+            writer.write(chunk)
+        return header.metadata
+    
+    # ------------------------------------------------------------------
+    # Async variants: KDF and cipher work run in the crypto worker pool
+    # ------------------------------------------------------------------
+    
+    async def derive_key_async(
+        self,
+        password: str,
+        salt: bytes,
+        kdf: Optional[str] = None,
+        params: Optional[Dict[str, int]] = None,
+        use_cache: bool = False
+    ) -> bytes:
+        """
+        Derive key in the crypto worker pool (see derive_key)
+        
+        Argon2 calls are admitted against the KDF memory budget first and
+        raise AdmissionRejected when the queue is full. With use_cache, a
+        key cache hit returns immediately without touching the pool.
+        """
+        kdf = kdf or self.kdf_algorithm
+        params = params or self.kdf_params(kdf)
+        cache = self.key_cache if use_cache else None
+        if cache is not None:
+            key = cache.get(password, salt, kdf, params)
+            if key is not None:
+                return key
+        
+        if kdf != "argon2":
+            key = await crypto_executor.run(self.derive_key, password, salt, kdf, params)
+        else:
+            # The reservation outlives a timeout: the hash keeps its memory until done
+            async with kdf_admission.admit(params["memory_cost"]) as reservation:
+                key = await crypto_executor.run_tracked(
+                    reservation.release_when, self.derive_key, password, salt, kdf, params
+                )
+        
+        if cache is not None:
+            cache.put(password, salt, kdf, params, key)
+        return key
+    
+    async def encrypt_async(
+        self,
+        plaintext: str,
+        password: Passwords,
+        compression: Optional[str] = None
+    ) -> Dict[str, str]:
+        """Non-blocking variant of encrypt"""
+        if not isinstance(password, str):
+            return await self.encrypt_bytes_async(
+                plaintext.encode('utf-8'), password, compression=compression
+            )
+        salt = os.urandom(16)
+        params = self.kdf_params()
+        key = await self.derive_key_async(password, salt, params=params)
+        return await crypto_executor.run(
+            self._seal, plaintext.encode('utf-8'), key, salt, params, compression
+        )
+    
+    async def decrypt_async(self, encrypted_data: Dict[str, str], password: str) -> str:
+        """Non-blocking variant of decrypt"""
+        if self.is_envelope(encrypted_data):
+            try:
+                plaintext = await self._open_envelope_async(encrypted_data, password)
+            except (TimeoutError, AdmissionRejected):
+                raise
+            except Exception as e:
+                raise self._decryption_error(e)
+            return self._decode_text(plaintext)
+        
+        ciphertext, salt, nonce, tag = self._decode_components(encrypted_data)
+        kdf, params = self._payload_kdf(encrypted_data)
+        try:
+            key = await self.derive_key_async(password, salt, kdf, params, use_cache=True)
+            plaintext = await crypto_executor.run(
+                self._open, ciphertext, nonce, tag, key,
+                encrypted_data.get("cipher"), encrypted_data.get("compression")
+            )
+        except (TimeoutError, AdmissionRejected):
+            raise
+        except Exception as e:
+            raise self._decryption_error(e)
+        
+        return self._decode_text(plaintext)
+    
+    async def encrypt_bytes_async(
+        self,
+        data: bytes,
+        password: Passwords,
+        envelope: bool = False,
+        compression: Optional[str] = None
+    ) -> Dict[str, str]:
+        """Non-blocking variant of encrypt_bytes (recipient keys derived concurrently)"""
+        salt = os.urandom(16)
+        params = self.kdf_params()
+        if isinstance(password, str) and not envelope:
+            key = await self.derive_key_async(password, salt, params=params)
+            return await crypto_executor.run(self._seal, data, key, salt, params, compression)
+        
+        keks = await asyncio.gather(*(
+            self.derive_key_async(p, salt, params=params) for p in self._recipients(password)
+        ))
+        return await crypto_executor.run(
+            self._seal_envelope, data, list(keks), salt, params, compression
+        )
+    
+    async def encrypt_many_async(
+        self,
+        plaintexts: List[str],
+        password: str,
+        compression: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """Non-blocking variant of encrypt_many (one KDF, one cipher task)"""
+        salt = os.urandom(16)
+        params = self.kdf_params()
+        key = await self.derive_key_async(password, salt, params=params)
+        data = [p.encode('utf-8') for p in plaintexts]
+        return await crypto_executor.run(self._seal_many, data, key, salt, params, compression)
+    
+    async def iter_encrypt_stream_async(
+        self,
+        reader: BinaryIO,
+        password: str,
+        metadata: bytes = b"",
+        chunk_size: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """Variant of iter_encrypt_stream deriving the key in the worker pool"""
+        header = self._new_stream_header(metadata, chunk_size)
+        key = await self.derive_key_async(password, header.salt, header.kdf, header.kdf_params)
+        return streaming.encrypt_chunks(reader, key, header, self.parallelism)
+    
+    async def open_stream_async(
+        self,
+        reader: BinaryIO,
+        password: str
+    ) -> Tuple[streaming.StreamHeader, Iterator[bytes]]:
+        """Variant of open_stream deriving the key in the worker pool"""
+        header = streaming.StreamHeader.read(reader)
+        key = await self.derive_key_async(
+            password, header.salt, header.kdf, header.kdf_params, use_cache=True
+        )
+        return header, streaming.decrypt_chunks(reader, key, header, self.parallelism)
+    
+    async def decrypt_bytes_async(self, encrypted_data: Dict[str, str], password: str) -> bytes:
+        """Non-blocking variant of decrypt_bytes"""
+        try:
+            if self.is_envelope(encrypted_data):
+                return await self._open_envelope_async(encrypted_data, password)
+            
+            ciphertext, salt, nonce, tag = self._decode_raw(encrypted_data)
+            kdf, params = self._payload_kdf(encrypted_data)
+            key = await self.derive_key_async(password, salt, kdf, params, use_cache=True)
+            return await crypto_executor.run(
+                self._open, ciphertext, nonce, tag, key,
+                encrypted_data.get("cipher"), encrypted_data.get("compression")
+            )
+        except (TimeoutError, AdmissionRejected):
+            raise
+        except Exception as e:
+            raise ValueError(f"Decryption failed: {str(e)}")
+    
+    async def _unlock_async(self, slots: List[Dict[str, str]], password: str) -> Tuple[int, bytes]:
+        """Non-blocking variant of _unlock"""
+        for (salt, kdf, params), group in self._slot_groups(slots).items():
+            kek = await self.derive_key_async(password, salt, kdf, dict(params), use_cache=True)
+            match = self._unwrap_matching(group, kek)
+            if match is not None:
+                return match
+        raise AuthenticationError()
+    
+    async def _open_envelope_async(self, encrypted_data: Dict[str, str], password: str) -> bytes:
+        """Non-blocking variant of _open_envelope"""
+        _, key = await self._unlock_async(self._key_slots(encrypted_data), password)
+        return await crypto_executor.run(self._open_content, encrypted_data, key)
+    
+    async def rewrap_async(
+        self,
+        encrypted_data: Dict[str, str],
+        password: str,
+        new_password: str
+    ) -> Dict[str, str]:
+        """Non-blocking variant of rewrap (only the KDF runs hit the pool)"""
+        slots = self._key_slots(encrypted_data)
+        try:
+            index, key = await self._unlock_async(slots, password)
+        except (TimeoutError, AdmissionRejected):
+            raise
+        except Exception as e:
+            raise self._decryption_error(e)
+        
+        salt = self._rewrap_salt(slots, index)
+        params = self.kdf_params()
+        kek = await self.derive_key_async(new_password, salt, params=params)
+        return self._replace_slot(encrypted_data, slots, index, self._wrap_key(key, kek, salt, params))
+    
+    # ------------------------------------------------------------------
+    # Helpers shared by the sync and async paths
+    # ------------------------------------------------------------------
+    
+    def _derive_decryption_key(
+        self,
+        password: str,
+        salt: bytes,
+        kdf: Optional[str] = None,
+        params: Optional[Dict[str, int]] = None
+    ) -> bytes:
+        """derive_key, served from the key cache when one is configured"""
+        if self.key_cache is None:
+            return self.derive_key(password, salt, kdf, params)
+        
+        kdf = kdf or self.kdf_algorithm
+        params = params or self.kdf_params(kdf)
+        key = self.key_cache.get(password, salt, kdf, params)
+        if key is None:
+            key = self.derive_key(password, salt, kdf, params)
+            self.key_cache.put(password, salt, kdf, params, key)
+        return key
+    
+    def _new_stream_header(self, metadata: bytes, chunk_size: Optional[int]) -> streaming.StreamHeader:
+        """Fresh stream header with random salt and base nonce"""
+        return streaming.StreamHeader(
+            kdf=self.kdf_algorithm,
+            kdf_params=self.kdf_params(),
+            salt=os.urandom(streaming.SALT_SIZE),
+            base_nonce=os.urandom(streaming.NONCE_PREFIX_SIZE),
+            chunk_size=chunk_size or settings.STREAM_CHUNK_SIZE,
+            metadata=metadata,
+            cipher=self.cipher_id if self.cipher_id in streaming.CIPHER_IDS else "chacha20-poly1305"
+        )
+    
+    def _seal(
+        self,
+        data: bytes,
+        key: bytes,
+        salt: bytes,
+        params: Dict[str, int],
+        compression: Optional[str] = None
+    ) -> Dict[str, str]:
+        """Compress per policy, encrypt under key with a fresh nonce and encode the components"""
+        data, codec = compress(data, compression or self.compression)
+        cipher = get_cipher(self.cipher_id)
+        nonce = os.urandom(cipher.nonce_size)
+        ciphertext, tag = cipher.encrypt(key, nonce, data, self._content_aad(self.cipher_id, codec))
+        
+        payload = {
+            "ciphertext": base64.b64encode(ciphertext).decode('utf-8'),
+            "salt": base64.b64encode(salt).decode('utf-8'),
+            "nonce": base64.b64encode(nonce).decode('utf-8'),
+            "tag": base64.b64encode(tag).decode('utf-8'),
+            "kdf": self.kdf_algorithm,
+            "kdf_params": params,
+            "cipher": self.cipher_id
+        }
+        if codec:
+            payload["compression"] = codec
+        return payload
+    
+    def _seal_envelope(
+        self,
+        data: bytes,
+        keks: List[bytes],
+        salt: bytes,
+        params: Dict[str, int],
+        compression: Optional[str] = None
+    ) -> Dict[str, str]:
+        """Seal data once under a fresh data key and wrap that key under each kek"""
+        data, codec = compress(data, compression or self.compression)
+        key = os.urandom(self.key_size)
+        cipher = get_cipher(self.cipher_id)
+        nonce = os.urandom(cipher.nonce_size)
+        ciphertext, tag = cipher.encrypt(key, nonce, data, self._content_aad(self.cipher_id, codec))
+        
+        payload = {
+            "mode": ENVELOPE_MODE,
+            "ciphertext": base64.b64encode(ciphertext).decode('utf-8'),
+            "nonce": base64.b64encode(nonce).decode('utf-8'),
+            "tag": base64.b64encode(tag).decode('utf-8'),
+            "cipher": self.cipher_id,
+            "key_slots": [self._wrap_key(key, kek, salt, params) for kek in keks]
+        }
+        if codec:
+            payload["compression"] = codec
+        return payload
+    
+    def _wrap_key(self, key: bytes, kek: bytes, salt: bytes, params: Dict[str, int]) -> Dict[str, str]:
+        """Key slot holding key encrypted under the password-derived kek"""
+        cipher = get_cipher(self.cipher_id)
+        nonce = os.urandom(cipher.nonce_size)
+        wrapped, tag = cipher.encrypt(kek, nonce, key)
+        
+        return {
+            "key_id": self._key_id(kek),
+            "salt": base64.b64encode(salt).decode('utf-8'),
+            "kdf": self.kdf_algorithm,
+            "kdf_params": params,
+            "cipher": self.cipher_id,
+            "nonce": base64.b64encode(nonce).decode('utf-8'),
+            "wrapped_key": base64.b64encode(wrapped).decode('utf-8'),
+            "tag": base64.b64encode(tag).decode('utf-8')
+        }
+    
+    def _unwrap_key(self, slot: Dict[str, str], kek: bytes) -> bytes:
+        """Recover the data key from a slot (raises on wrong password)"""
+        return get_cipher(slot.get("cipher")).decrypt(
+            kek,
+            base64.b64decode(slot["nonce"]),
+            base64.b64decode(slot["wrapped_key"]),
+            base64.b64decode(slot["tag"])
+        )
+    
+    @staticmethod
+    def _key_id(kek: bytes) -> str:
+        """Short tag identifying the slot a password-derived key unlocks"""
+        return base64.b64encode(hmac.new(kek, KEY_ID_CONTEXT, hashlib.sha256).digest()[:8]).decode('utf-8')
+    
+    @staticmethod
+    def _recipients(password: Passwords) -> List[str]:
+        """Password list for an envelope payload"""
+        passwords = [password] if isinstance(password, str) else list(password)
+        if not passwords:
+            raise ValueError("At least one password is required")
+        if len(passwords) > settings.MAX_RECIPIENTS:
+            raise ValueError(f"Too many passwords (max {settings.MAX_RECIPIENTS})")
+        return passwords
+    
+    def _slot_groups(self, slots: List[Dict[str, str]]) -> Dict[tuple, List[Tuple[int, Dict[str, str]]]]:
+        """
+        Group slots sharing salt and KDF parameters
+        
+        Slots created together share a salt, so one KDF run per group (usually
+        exactly one) tests a password against every recipient.
+        """
+        groups: Dict[tuple, List[Tuple[int, Dict[str, str]]]] = {}
+        for index, slot in enumerate(slots):
+            kdf, params = self._payload_kdf(slot)
+            group = (base64.b64decode(slot["salt"]), kdf, tuple(sorted(params.items())))
+            groups.setdefault(group, []).append((index, slot))
+        return groups
+    
+    def _unwrap_matching(
+        self,
+        group: List[Tuple[int, Dict[str, str]]],
+        kek: bytes
+    ) -> Optional[Tuple[int, bytes]]:
+        """
+        (slot index, data key) for the slot kek opens, or None
+        
+        The key id picks the slot directly; only slots without one (or a
+        colliding id) cost an extra unwrap attempt.
+        """
+        key_id = self._key_id(kek)
+        for index, slot in group:
+            if slot.get("key_id", key_id) != key_id:
+                continue
+            try:
+                return index, self._unwrap_key(slot, kek)
+            except ValueError:
+                continue
+        return None
+    
+    def _unlock(self, slots: List[Dict[str, str]], password: str) -> Tuple[int, bytes]:
+        """
+        Find the slot password opens and unwrap the data key
+        
+        Raises:
+            AuthenticationError: If no slot matches
+        """
+        for (salt, kdf, params), group in self._slot_groups(slots).items():
+            kek = self._derive_decryption_key(password, salt, kdf, dict(params))
+            match = self._unwrap_matching(group, kek)
+            if match is not None:
+                return match
+        raise AuthenticationError()
+    
+    def _open_envelope(self, encrypted_data: Dict[str, str], password: str) -> bytes:
+        """Unwrap the data key with password and decrypt the content"""
+        _, key = self._unlock(self._key_slots(encrypted_data), password)
+        return self._open_content(encrypted_data, key)
+    
+    def _key_slots(self, encrypted_data: Dict[str, str]) -> List[Dict[str, str]]:
+        """The key slots of an envelope payload"""
+        if not self.is_envelope(encrypted_data):
+            raise ValueError("Not an envelope-mode payload")
+        slots = encrypted_data.get("key_slots") or []
+        if not slots:
+            raise ValueError("Envelope payload has no key slots")
+        # Each distinct salt/KDF group costs a derivation, so bound untrusted input
+        if len(slots) > settings.MAX_RECIPIENTS:
+            raise ValueError(f"Too many key slots (max {settings.MAX_RECIPIENTS})")
+        return slots
+    
+    @staticmethod
+    def _rewrap_salt(slots: List[Dict[str, str]], index: int) -> bytes:
+        """
+        Salt for a replacement slot
+        
+        A sole slot gets a fresh salt; with other recipients the replaced
+        slot's salt is kept so decryption still needs one KDF run per group.
+        """
+        if len(slots) == 1:
+            return os.urandom(16)
+        return base64.b64decode(slots[index]["salt"])
+    
+    @staticmethod
+    def _replace_slot(
+        encrypted_data: Dict[str, str],
+        slots: List[Dict[str, str]],
+        index: int,
+        slot: Dict[str, str]
+    ) -> Dict[str, str]:
+        """Copy of the payload with slots[index] replaced"""
+        return {**encrypted_data, "key_slots": [*slots[:index], slot, *slots[index + 1:]]}
+    
+    def _open_content(self, encrypted_data: Dict[str, str], key: bytes) -> bytes:
+        """Decrypt an envelope payload's content under its data key"""
+        return self._open(
+            base64.b64decode(encrypted_data["ciphertext"]),
+            base64.b64decode(encrypted_data["nonce"]),
+            base64.b64decode(encrypted_data["tag"]),
+            key,
+            encrypted_data.get("cipher"),
+            encrypted_data.get("compression")
+        )
+    
+    def _seal_many(
+        self,
+        items: List[bytes],
+        key: bytes,
+        salt: bytes,
+        params: Dict[str, int],
+        compression: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """Seal each item under the same key with its own nonce"""
+        return [self._seal(data, key, salt, params, compression) for data in items]
+    
+    @staticmethod
+    def _open(
+        ciphertext: bytes,
+        nonce: bytes,
+        tag: bytes,
+        key: bytes,
+        cipher_id: Optional[str] = None,
+        codec: Optional[str] = None
+    ) -> bytes:
+        """
+        Decrypt and authenticate ciphertext under key, then decompress
+        
+        Payloads without a cipher id are AES-256-GCM (with 16-byte nonces).
+        The cipher and codec ids are authenticated as associated data. Only
+        the baseline format (no cipher id, no codec) predates that and is
+        opened without it; every payload recording an id must verify under
+        exactly those ids, so they cannot be stripped or swapped.
+        """
+        cipher = get_cipher(cipher_id)
+        if cipher_id is None and codec is None:
+            data = cipher.decrypt(key, nonce, ciphertext, tag)
+        else:
+            data = cipher.decrypt(key, nonce, ciphertext, tag, EncryptionEngine._content_aad(cipher_id, codec))
+        return decompress(data, codec)
+    
+    @staticmethod
+    def _content_aad(cipher_id: Optional[str], codec: Optional[str]) -> bytes:
+        """Associated data for content sealed with these cipher and codec ids"""
+        return b"|".join((CONTENT_AAD_CONTEXT, (cipher_id or "").encode('ascii'), (codec or "").encode('ascii')))
+    
+    @staticmethod
+    def _decode_raw(encrypted_data: Dict[str, str]) -> Tuple[bytes, bytes, bytes, bytes]:
+        """Base64-decode ciphertext, salt, nonce and tag"""
+        return (
+            base64.b64decode(encrypted_data["ciphertext"]),
+            base64.b64decode(encrypted_data["salt"]),
+            base64.b64decode(encrypted_data["nonce"]),
+            base64.b64decode(encrypted_data["tag"])
+        )
+    
+    def _payload_kdf(self, encrypted_data: Dict[str, str]) -> Tuple[str, Dict[str, int]]:
+        """
+        KDF name and parameters recorded in a payload
+        
+        Payloads from before parameters were recorded fall back to the
+        original defaults, not the current settings.
+        """
+        kdf = encrypted_data.get("kdf") or self.kdf_algorithm
+        return kdf, normalize_params(kdf, encrypted_data.get("kdf_params"))
+    
+    def _decode_components(self, encrypted_data: Dict[str, str]) -> Tuple[bytes, bytes, bytes, bytes]:
+        """Decode text-payload components with a user-facing error message"""
+        try:
+            return self._decode_raw(encrypted_data)
+        except Exception as e:
+            raise ValueError(f"Invalid encrypted data format - data may be corrupted or incomplete. If using emoji format, ensure you copied the entire string including 🔥 separators. Error: {str(e)}")
+    
+    @staticmethod
+    def _decode_text(plaintext: bytes) -> str:
+        """Decode to UTF-8 (for text data only)"""
+        try:
+            return plaintext.decode('utf-8')
+        except UnicodeDecodeError:
+            raise ValueError("Decryption failed - this appears to be binary data (file). Use file decryption endpoint instead of text decryption.")
+    
+    @staticmethod
+    def _decryption_error(e: Exception) -> ValueError:
+        """Map a low-level decryption failure to a user-facing ValueError"""
+        error_msg = str(e).lower()
+        if "mac check failed" in error_msg or "verify" in error_msg:
+            return ValueError("Decryption failed - wrong password")
+        return ValueError(f"Decryption failed: {str(e)}")
 
 
 # Singleton instance
-encryption_engine = EncryptionEngine()
+encryption_engine = EncryptionEngine(
+    key_cache=DerivedKeyCache() if settings.KEY_CACHE_ENABLED else None
+)
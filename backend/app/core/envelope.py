@@ -0,0 +1,265 @@
+"""
+Compact binary form of encrypted payloads
+
+The dict returned by EncryptionEngine (base64 fields, JSON-friendly) stays the
+API shape; this is its canonical binary serialization, used wherever size
+matters (dense emoji, stored QR messages):
+
+    magic "SC" | version | flags | cipher id | codec id
+    [kdf block | salt]                      password payloads
+    nonce | tag
+    [slot count | slots]                    envelope (multi-recipient) payloads
+    ciphertext
+
+    kdf block = kdf id (| 0x80 when params follow) [| params in PARAM_ORDER]
+    slot      = key id | kdf block | salt | cipher id | nonce | wrapped key | tag
+
+Byte strings are prefixed with their varint (LEB128) length, so cut-off or
+padded data is caught before any key derivation; ids are single bytes with 0
+meaning "not recorded" (legacy payloads).
+"""
+
+import base64
+from typing import Any, Dict, List, Optional
+
+from app.core.ciphers import CIPHER_CODES, CIPHER_NAMES
+from app.core.compression import CODEC_CODES, CODEC_NAMES
+from app.core.kdf import KDF_CODES, KDF_NAMES, PARAM_ORDER
+
+MAGIC = b"SC"
+VERSION = 1
+
+FLAG_ENVELOPE = 0x01
+KDF_PARAMS_FLAG = 0x80
+
+# Envelope payloads: content sealed under a random data key (DEK), which is
+# stored wrapped under each recipient's password-derived key in a key slot
+ENVELOPE_MODE = "envelope"
+MAX_SLOTS = 255
+MAX_VARINT_BYTES = 10
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    if value < 0:
+        raise ValueError("Varint values must be non-negative")
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _write_bytes(out: bytearray, value: bytes) -> None:
+    _write_varint(out, len(value))
+    out += value
+
+
+def _b64(value: str) -> bytes:
+    return base64.b64decode(value + "=" * (-len(value) % 4))
+
+
+def _text(value: bytes) -> str:
+    return base64.b64encode(value).decode('utf-8')
+
+
+class _Reader:
+    """Bounds-checked cursor over packed data"""
+
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def byte(self) -> int:
+        if self.pos >= len(self.data):
+            raise ValueError("Invalid envelope - truncated data")
+        self.pos += 1
+        return self.data[self.pos - 1]
+
+    def varint(self) -> int:
+        value = 0
+        for shift in range(0, 7 * MAX_VARINT_BYTES, 7):
+            byte = self.byte()
+            value |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return value
+        raise ValueError("Invalid envelope - varint too long")
+
+    def read_bytes(self) -> bytes:
+        size = self.varint()
+        if size > len(self.data) - self.pos:
+            raise ValueError("Invalid envelope - truncated data")
+        self.pos += size
+        return bytes(self.data[self.pos - size:self.pos])
+
+
+def _code(codes: Dict[str, int], name: Optional[str], what: str) -> int:
+    if not name:
+        return 0
+    try:
+        return codes[name]
+    except KeyError:
+        raise ValueError(f"Unsupported {what}: {name}")
+
+
+def _name(names: Dict[int, str], code: int, what: str) -> Optional[str]:
+    if not code:
+        return None
+    try:
+        return names[code]
+    except KeyError:
+        raise ValueError(f"Invalid envelope - unknown {what} id {code}")
+
+
+def _write_kdf(out: bytearray, fields: Dict[str, Any]) -> None:
+    kdf = fields.get("kdf")
+    params = fields.get("kdf_params")
+    code = _code(KDF_CODES, kdf, "KDF")
+    if params and kdf in PARAM_ORDER:
+        out.append(code | KDF_PARAMS_FLAG)
+        for name in PARAM_ORDER[kdf]:
+            _write_varint(out, int(params[name]))
+    else:
+        out.append(code)
+
+
+def _read_kdf(reader: _Reader, fields: Dict[str, Any]) -> None:
+    code = reader.byte()
+    kdf = _name(KDF_NAMES, code & ~KDF_PARAMS_FLAG, "KDF")
+    if kdf:
+        fields["kdf"] = kdf
+    if code & KDF_PARAMS_FLAG:
+        if not kdf:
+            raise ValueError("Invalid envelope - KDF parameters without a KDF")
+        fields["kdf_params"] = {name: reader.varint() for name in PARAM_ORDER[kdf]}
+
+
+def pack(encrypted_data: Dict[str, Any]) -> bytes:
+    """
+    Serialize an encrypted payload
+
+    Fields other than the cryptographic ones (e.g. file metadata) are not
+    stored.
+
+    Args:
+        encrypted_data: Payload dict as returned by EncryptionEngine
+
+    Returns:
+        Packed bytes
+
+    Raises:
+        ValueError: If required fields are missing or not valid base64
+    """
+    envelope = encrypted_data.get("mode") == ENVELOPE_MODE
+    slots: List[Dict[str, Any]] = encrypted_data.get("key_slots") or []
+    if envelope and not 0 < len(slots) <= MAX_SLOTS:
+        raise ValueError(f"Envelope payloads need 1 to {MAX_SLOTS} key slots")
+
+    out = bytearray(MAGIC)
+    out += bytes((
+        VERSION,
+        FLAG_ENVELOPE if envelope else 0,
+        _code(CIPHER_CODES, encrypted_data.get("cipher"), "cipher"),
+        _code(CODEC_CODES, encrypted_data.get("compression"), "compression codec"),
+    ))
+    try:
+        if not envelope:
+            _write_kdf(out, encrypted_data)
+            _write_bytes(out, _b64(encrypted_data["salt"]))
+        _write_bytes(out, _b64(encrypted_data["nonce"]))
+        _write_bytes(out, _b64(encrypted_data["tag"]))
+        if envelope:
+            _write_varint(out, len(slots))
+            for slot in slots:
+                _write_bytes(out, _b64(slot.get("key_id") or ""))
+                _write_kdf(out, slot)
+                _write_bytes(out, _b64(slot["salt"]))
+                out.append(_code(CIPHER_CODES, slot.get("cipher"), "cipher"))
+                _write_bytes(out, _b64(slot["nonce"]))
+                _write_bytes(out, _b64(slot["wrapped_key"]))
+                _write_bytes(out, _b64(slot["tag"]))
+        _write_bytes(out, _b64(encrypted_data["ciphertext"]))
+    except KeyError as e:
+        raise ValueError(f"Encrypted data is missing {e.args[0]}")
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid encrypted data format: {e}")
+    return bytes(out)
+
+
+def unpack(data: bytes) -> Dict[str, Any]:
+    """
+    Undo pack()
+
+    Raises:
+        ValueError: If the data is not a packed payload or is truncated
+    """
+    if not is_packed(data):
+        raise ValueError("Invalid envelope - not a SecureCom+ payload")
+    reader = _Reader(data)
+    reader.pos = len(MAGIC)
+    version = reader.byte()
+    if version != VERSION:
+        raise ValueError(f"Unsupported envelope version: {version}")
+    flags = reader.byte()
+    cipher = _name(CIPHER_NAMES, reader.byte(), "cipher")
+    codec = _name(CODEC_NAMES, reader.byte(), "compression codec")
+
+    payload: Dict[str, Any] = {}
+    envelope = bool(flags & FLAG_ENVELOPE)
+    if envelope:
+        payload["mode"] = ENVELOPE_MODE
+    else:
+        _read_kdf(reader, payload)
+        payload["salt"] = _text(reader.read_bytes())
+    payload["nonce"] = _text(reader.read_bytes())
+    payload["tag"] = _text(reader.read_bytes())
+    if envelope:
+        count = reader.varint()
+        if not 0 < count <= MAX_SLOTS:
+            raise ValueError("Invalid envelope - key slot count out of range")
+        slots = []
+        for _ in range(count):
+            slot: Dict[str, Any] = {}
+            key_id = reader.read_bytes()
+            if key_id:
+                slot["key_id"] = _text(key_id)
+            _read_kdf(reader, slot)
+            slot["salt"] = _text(reader.read_bytes())
+            slot_cipher = _name(CIPHER_NAMES, reader.byte(), "cipher")
+            if slot_cipher:
+                slot["cipher"] = slot_cipher
+            slot["nonce"] = _text(reader.read_bytes())
+            slot["wrapped_key"] = _text(reader.read_bytes())
+            slot["tag"] = _text(reader.read_bytes())
+            slots.append(slot)
+        payload["key_slots"] = slots
+    payload["ciphertext"] = _text(reader.read_bytes())
+    if reader.pos != len(data):
+        raise ValueError("Invalid envelope - extra data after the ciphertext")
+    if cipher:
+        payload["cipher"] = cipher
+    if codec:
+        payload["compression"] = codec
+    return payload
+
+
+def is_packed(data: bytes) -> bool:
+    """True if data starts like a packed payload"""
+    return data[:len(MAGIC)] == MAGIC
+
+
+def dumps(encrypted_data: Dict[str, Any]) -> str:
+    """Packed payload as unpadded URL-safe base64 text"""
+    return base64.urlsafe_b64encode(pack(encrypted_data)).rstrip(b"=").decode('ascii')
+
+
+def loads(text: str) -> Dict[str, Any]:
+    """
+    Undo dumps()
+
+    Raises:
+        ValueError: If text is not a packed payload
+    """
+    try:
+        data = base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid envelope - not valid base64")
+    return unpack(data)
@@ -0,0 +1,153 @@
+"""
+Bounded worker pool for CPU-heavy crypto work
+Keeps Argon2 key derivation and AES-GCM off the asyncio event loop
+"""
+
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+
+
+class CryptoTimeoutError(TimeoutError):
+    """Raised when a crypto task does not finish within the configured timeout"""
+
+
+def default_pool_size() -> int:
+    """Number of CPUs available to this process (respects container affinity)"""
+    try:
+        return len(os.sched_getaffinity(0)) or 1
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+
+class CryptoExecutor:
+    """
+    Thread or process pool dedicated to KDF and cipher work
+
+    Argon2 (argon2-cffi) and PyCryptodome release the GIL while hashing and
+    encrypting, so a thread pool gives real parallelism without pickling
+    overhead. A process pool can be selected for hosts where that is not true.
+    Submissions are bounded by the pool size so excess work waits on the event
+    loop (where it can time out) instead of piling up inside the pool queue.
+    """
+
+    def __init__(
+        self,
+        kind: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        timeout: Optional[float] = None
+    ):
+        self.kind = kind or settings.CRYPTO_EXECUTOR
+        if self.kind not in ("thread", "process"):
+            raise ValueError(f"Unknown crypto executor kind: {self.kind}")
+        self.max_workers = max_workers or settings.CRYPTO_POOL_SIZE or default_pool_size()
+        self.timeout = settings.CRYPTO_TASK_TIMEOUT if timeout is None else timeout
+        self._pool: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_pool(self) -> Executor:
+        """Create the underlying pool on first use"""
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="crypto"
+                )
+        return self._pool
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        """Per-event-loop semaphore bounding in-flight submissions"""
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_workers)
+            self._loop = loop
+        return self._slots
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run func(*args, **kwargs) in the pool and await its result
+
+        Args:
+            func: Callable to execute (must be picklable for the process pool)
+
+        Returns:
+            Whatever func returns
+
+        Raises:
+            CryptoTimeoutError: If waiting for a slot plus execution exceeds the timeout
+        """
+        return await self.run_tracked(None, func, *args, **kwargs)
+
+    async def run_tracked(
+        self,
+        on_submit: Optional[Callable[[asyncio.Future], None]],
+        func: Callable[..., Any],
+        *args,
+        **kwargs
+    ) -> Any:
+        """
+        Variant of run reporting the job's future once it is in the pool
+
+        A pool job cannot be interrupted, so a timeout only stops the caller
+        waiting: the job keeps its slot until it really finishes, and the
+        future passed to on_submit resolves only then. Callers holding other
+        resources for the job (e.g. KDF memory budget) release them from
+        that future.
+
+        Args:
+            on_submit: Called with the job's future right after submission
+            func: Callable to execute (must be picklable for the process pool)
+
+        Raises:
+            CryptoTimeoutError: If waiting for a slot plus execution exceeds the timeout
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout if self.timeout else None
+        slots = self._get_slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.timeout or None)
+        except asyncio.TimeoutError:
+            raise self._timeout_error()
+
+        try:
+            future = loop.run_in_executor(self._get_pool(), partial(func, *args, **kwargs))
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(partial(self._job_done, slots))
+        if on_submit is not None:
+            on_submit(future)
+
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(future),
+                timeout=max(deadline - loop.time(), 0) if deadline else None
+            )
+        except asyncio.TimeoutError:
+            raise self._timeout_error()
+
+    @staticmethod
+    def _job_done(slots: asyncio.Semaphore, future: asyncio.Future) -> None:
+        slots.release()
+        if not future.cancelled():
+            future.exception()  # retrieved, so abandoned failures are not logged as unhandled
+
+    def _timeout_error(self) -> CryptoTimeoutError:
+        return CryptoTimeoutError(f"Crypto task did not complete within {self.timeout} seconds")
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shut down the pool (a new one is created on next use)"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+
+
+# Singleton instance
+crypto_executor = CryptoExecutor()
@@ -0,0 +1,191 @@
+"""
+KDF parameter handling and host calibration
+
+Every payload records the KDF parameters it was encrypted with, so the
+Argon2 cost settings can be retuned per deployment without breaking
+existing ciphertexts. Run `python -m app.core.kdf --target-ms 250` to
+benchmark this host and print matching ARGON2_* settings.
+"""
+
+import argparse
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from argon2.low_level import hash_secret_raw, Type
+
+from app.core.admission import kdf_admission
+from app.core.config import settings
+from app.core.executor import default_pool_size
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_KDFS = ("argon2", "pbkdf2")
+
+# Parameters used before they were recorded in payloads
+LEGACY_KDF_PARAMS = {
+    "argon2": {"time_cost": 2, "memory_cost": 65536, "parallelism": 4},
+    "pbkdf2": {"iterations": 100000},
+}
+
+# Compact numeric ids for binary encodings
+KDF_CODES = {"argon2": 1, "pbkdf2": 2}
+KDF_NAMES = {v: k for k, v in KDF_CODES.items()}
+
+# Order of parameters in compact (emoji/binary) encodings
+PARAM_ORDER = {
+    "argon2": ("time_cost", "memory_cost", "parallelism"),
+    "pbkdf2": ("iterations",),
+}
+
+# OWASP minimum for Argon2id (19 MiB)
+MIN_ARGON2_MEMORY_COST = 19456
+
+
+def max_params(kdf: str) -> Dict[str, int]:
+    """
+    Largest KDF parameters accepted from untrusted payloads
+
+    Each cost may be up to KDF_MAX_COST_FACTOR times the configured value
+    (or the legacy default, if higher, so old payloads keep decrypting), and
+    Argon2 memory never exceeds the KDF admission budget. This bounds what a
+    single unauthenticated decrypt can make the server allocate and compute.
+    """
+    factor = settings.KDF_MAX_COST_FACTOR
+    legacy = LEGACY_KDF_PARAMS[kdf]
+    if kdf == "argon2":
+        return {
+            "time_cost": factor * max(settings.ARGON2_TIME_COST, legacy["time_cost"]),
+            "memory_cost": min(
+                factor * max(settings.ARGON2_MEMORY_COST, legacy["memory_cost"]),
+                kdf_admission.budget_kib
+            ),
+            "parallelism": factor * max(settings.ARGON2_PARALLELISM, legacy["parallelism"]),
+        }
+    return {"iterations": factor * legacy["iterations"]}
+
+
+def normalize_params(kdf: str, params: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Validate KDF parameters taken from a payload against max_params
+
+    Args:
+        kdf: KDF name from the payload
+        params: Parameters from the payload (None for legacy payloads)
+
+    Returns:
+        Integer parameters for derive_key
+
+    Raises:
+        ValueError: If the KDF is unknown or parameters are missing/out of range
+    """
+    if kdf not in SUPPORTED_KDFS:
+        raise ValueError(f"Unsupported KDF: {kdf}")
+    if not params:
+        return dict(LEGACY_KDF_PARAMS[kdf])
+
+    limits = max_params(kdf)
+    try:
+        if kdf == "argon2":
+            normalized = {
+                "time_cost": int(params["time_cost"]),
+                "memory_cost": int(params["memory_cost"]),
+                "parallelism": int(params["parallelism"]),
+            }
+            valid = (
+                0 < normalized["time_cost"] <= limits["time_cost"]
+                and 8 * normalized["parallelism"] <= normalized["memory_cost"] <= limits["memory_cost"]
+                and 0 < normalized["parallelism"] <= limits["parallelism"]
+            )
+        else:
+            normalized = {"iterations": int(params["iterations"])}
+            valid = 0 < normalized["iterations"] <= limits["iterations"]
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"Invalid {kdf} parameters in encrypted data")
+
+    if not valid:
+        raise ValueError(f"{kdf} parameters out of accepted range")
+    return normalized
+
+
+def _time_argon2(time_cost: int, memory_cost: int, parallelism: int) -> float:
+    """Seconds for one Argon2id derivation with these parameters"""
+    started = time.perf_counter()
+    hash_secret_raw(
+        secret=b"calibration-password",
+        salt=b"calibration-salt",
+        time_cost=time_cost,
+        memory_cost=memory_cost,
+        parallelism=parallelism,
+        hash_len=32,
+        type=Type.ID
+    )
+    return time.perf_counter() - started
+
+
+def calibrate_argon2(
+    target_ms: Optional[float] = None,
+    max_memory_kib: Optional[int] = None,
+    parallelism: Optional[int] = None,
+    max_time_cost: int = 10
+) -> Dict[str, Any]:
+    """
+    Pick Argon2id parameters that take about target_ms on this host
+
+    Memory is kept as high as possible (up to max_memory_kib, halving while a
+    single pass is already over target, never below the OWASP minimum), then
+    time_cost is raised to fill the remaining budget.
+
+    Args:
+        target_ms: Desired derivation latency (defaults to KDF_TARGET_MS)
+        max_memory_kib: Memory ceiling (defaults to ARGON2_MEMORY_COST)
+        parallelism: Lanes (defaults to min(ARGON2_PARALLELISM, CPUs))
+        max_time_cost: Upper bound for time_cost
+
+    Returns:
+        Dict with time_cost, memory_cost, parallelism and measured_ms
+    """
+    target = (target_ms or settings.KDF_TARGET_MS) / 1000.0
+    memory_cost = max_memory_kib or settings.ARGON2_MEMORY_COST
+    parallelism = parallelism or max(1, min(settings.ARGON2_PARALLELISM, default_pool_size()))
+
+    _time_argon2(1, MIN_ARGON2_MEMORY_COST, parallelism)  # warm up allocator
+    per_pass = _time_argon2(1, memory_cost, parallelism)
+    while per_pass > target and memory_cost // 2 >= MIN_ARGON2_MEMORY_COST:
+        memory_cost //= 2
+        per_pass = _time_argon2(1, memory_cost, parallelism)
+
+    time_cost = max(1, min(max_time_cost, int(target / per_pass) if per_pass else max_time_cost))
+    measured = _time_argon2(time_cost, memory_cost, parallelism)
+
+    return {
+        "time_cost": time_cost,
+        "memory_cost": memory_cost,
+        "parallelism": parallelism,
+        "measured_ms": round(measured * 1000, 1)
+    }
+
+
+def apply_calibration(result: Dict[str, Any]) -> None:
+    """Use calibrated parameters for all new encryptions in this process"""
+    settings.ARGON2_TIME_COST = result["time_cost"]
+    settings.ARGON2_MEMORY_COST = result["memory_cost"]
+    settings.ARGON2_PARALLELISM = result["parallelism"]
+    logger.info(
+        "Argon2 calibrated: time_cost=%s memory_cost=%s KiB parallelism=%s (%.1f ms)",
+        result["time_cost"], result["memory_cost"], result["parallelism"], result["measured_ms"]
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrate Argon2id parameters for this host")
+    parser.add_argument("--target-ms", type=float, default=settings.KDF_TARGET_MS)
+    parser.add_argument("--max-memory-kib", type=int, default=settings.ARGON2_MEMORY_COST)
+    parser.add_argument("--parallelism", type=int, default=None)
+    args = parser.parse_args()
+
+    result = calibrate_argon2(args.target_ms, args.max_memory_kib, args.parallelism)
+    print(f"# Measured {result['measured_ms']} ms per derivation (target {args.target_ms} ms)")
+    print(f"ARGON2_TIME_COST={result['time_cost']}")
+    print(f"ARGON2_MEMORY_COST={result['memory_cost']}")
+    print(f"ARGON2_PARALLELISM={result['parallelism']}")
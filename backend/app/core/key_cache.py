@@ -0,0 +1,105 @@
+"""
+Bounded, TTL'd cache of derived keys for repeated decryptions
+Opt-in: a hit skips Argon2 entirely, so keys live in memory for up to the TTL
+"""
+
+import hashlib
+import hmac
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+
+def _zeroize(buf: bytearray) -> None:
+    """Overwrite key material in place"""
+    for i in range(len(buf)):
+        buf[i] = 0
+
+
+class DerivedKeyCache:
+    """
+    LRU of derived keys keyed by HMAC(process secret, password | salt | KDF params)
+
+    Neither passwords nor their plain hashes are stored: the lookup key is a
+    keyed hash under a random per-process secret. Keys are held in bytearrays
+    and overwritten when evicted, expired or cleared. Thread-safe, since
+    derivations run in the crypto worker pool.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        self.max_entries = max_entries or settings.KEY_CACHE_SIZE
+        self.ttl = settings.KEY_CACHE_TTL if ttl is None else ttl
+        self._secret = os.urandom(32)
+        self._entries: "OrderedDict[bytes, Tuple[bytearray, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup_key(self, password: str, salt: bytes, kdf: str, params: Dict[str, int]) -> bytes:
+        mac = hmac.new(self._secret, digestmod=hashlib.sha256)
+        for part in (password.encode('utf-8'), salt, kdf.encode('utf-8')):
+            mac.update(struct.pack(">I", len(part)))
+            mac.update(part)
+        for name in sorted(params):
+            mac.update(f"{name}={params[name]};".encode('utf-8'))
+        return mac.digest()
+
+    def get(self, password: str, salt: bytes, kdf: str, params: Dict[str, int]) -> Optional[bytes]:
+        """Return the cached key, or None on miss/expiry"""
+        lookup = self._lookup_key(password, salt, kdf, params)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(lookup)
+            if entry is None:
+                self.misses += 1
+                return None
+            key, expires_at = entry
+            if expires_at <= now:
+                del self._entries[lookup]
+                _zeroize(key)
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(lookup)
+            self.hits += 1
+            return bytes(key)
+
+    def put(self, password: str, salt: bytes, kdf: str, params: Dict[str, int], key: bytes) -> None:
+        """Store a derived key, evicting the least recently used entries"""
+        lookup = self._lookup_key(password, salt, kdf, params)
+        with self._lock:
+            old = self._entries.pop(lookup, None)
+            if old is not None:
+                _zeroize(old[0])
+            self._entries[lookup] = (bytearray(key), time.monotonic() + self.ttl)
+            while len(self._entries) > self.max_entries:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                _zeroize(evicted)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop and zeroize every cached key"""
+        with self._lock:
+            for key, _ in self._entries.values():
+                _zeroize(key)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
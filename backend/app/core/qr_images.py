@@ -0,0 +1,146 @@
+"""
+QR code rendering with an LRU of rendered images
+
+A token's QR code only encodes its frontend URL, so an image is a pure
+function of (data, format, size, error correction) and can be cached here
+and by clients (strong ETag derived from the bytes).
+"""
+
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import qrcode
+import qrcode.image.svg
+
+from app.core.config import settings
+
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+ERROR_CORRECTION = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+DEFAULT_BOX_SIZE = 10
+MIN_BOX_SIZE = 1
+MAX_BOX_SIZE = 40
+
+
+class QRImage(NamedTuple):
+    """Rendered image with its media type and strong ETag"""
+    content: bytes
+    media_type: str
+    etag: str
+
+
+def render_qr(
+    data: str,
+    fmt: str = "png",
+    box_size: int = DEFAULT_BOX_SIZE,
+    error_correction: str = "L"
+) -> bytes:
+    """
+    Render data as a QR code
+
+    Args:
+        data: Text to encode
+        fmt: png or svg
+        box_size: Pixels (PNG) or units (SVG) per module
+        error_correction: L, M, Q or H
+
+    Raises:
+        ValueError: For unknown formats, error-correction levels or sizes
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported image format: {fmt}")
+    if error_correction not in ERROR_CORRECTION:
+        raise ValueError(f"Unsupported error correction level: {error_correction}")
+    if not MIN_BOX_SIZE <= box_size <= MAX_BOX_SIZE:
+        raise ValueError(f"Size must be between {MIN_BOX_SIZE} and {MAX_BOX_SIZE}")
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=ERROR_CORRECTION[error_correction],
+        box_size=box_size,
+        border=4,
+        image_factory=qrcode.image.svg.SvgPathImage if fmt == "svg" else None,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    img_io = io.BytesIO()
+    if fmt == "svg":
+        qr.make_image().save(img_io)
+    else:
+        qr.make_image(fill_color="black", back_color="white").save(img_io, 'PNG')
+    return img_io.getvalue()
+
+
+def render_qr_png(data: str) -> bytes:
+    """Render data as a QR code PNG (default size and error correction)"""
+    return render_qr(data)
+
+
+class QRImageCache:
+    """
+    Thread-safe LRU of rendered QR images
+
+    Rendering runs in the threadpool, so the cache is shared across threads;
+    two concurrent misses for the same key may both render (harmless).
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or settings.QR_IMAGE_CACHE_SIZE
+        self._entries: "OrderedDict[Tuple[str, str, int, str], QRImage]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self,
+        data: str,
+        fmt: str = "png",
+        box_size: int = DEFAULT_BOX_SIZE,
+        error_correction: str = "L"
+    ) -> QRImage:
+        """Cached image for these options, rendering it on a miss"""
+        key = (data, fmt, box_size, error_correction)
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return image
+            self.misses += 1
+
+        content = render_qr(data, fmt, box_size, error_correction)
+        image = QRImage(content, FORMATS[fmt], f'"{hashlib.sha256(content).hexdigest()[:32]}"')
+        with self._lock:
+            self._entries[key] = image
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return image
+
+    def clear(self) -> None:
+        """Drop every cached image"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+# Singleton instance
+qr_image_cache = QRImageCache()
@@ -0,0 +1,245 @@
+"""
+Read-through cache of QR token status for the polling frontend
+Entries hold the parsed payload of unviewed tokens; view and delete drop them
+
+Invalidation leaves a tombstone for one TTL that fills cannot overwrite, so a
+poll that read the row just before a view cannot re-cache it as valid.
+"""
+
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+try:  # optional, shared cache for multi-worker deployments
+    import redis.asyncio as redis_asyncio
+except ImportError:  # pragma: no cover - depends on environment
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+DATETIME_FIELDS = ("created_at", "expires_at")
+
+
+def entry_ttl(entry: Dict[str, Any], ttl: float) -> float:
+    """TTL for an entry, capped so it never outlives the token's expiry"""
+    remaining = (entry["expires_at"] - datetime.utcnow()).total_seconds()
+    return min(ttl, remaining)
+
+
+class MemoryStatusCache:
+    """
+    Per-process LRU with a TTL
+
+    Each worker has its own copy, so a view handled by another worker is only
+    seen here once the entry expires; keep the TTL short or use Redis when
+    running several workers. The single-use guarantee itself never depends
+    on the cache (view always goes through the database).
+    """
+
+    backend = "memory"
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        self.max_entries = max_entries or settings.QR_STATUS_CACHE_SIZE
+        self.ttl = settings.QR_STATUS_CACHE_TTL if ttl is None else ttl
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._tombstones: "OrderedDict[str, float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Cached status entry, or None on miss/expiry"""
+        item = self._entries.get(token)
+        if item is None or item[1] <= time.monotonic():
+            if item is not None:
+                del self._entries[token]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return item[0]
+
+    async def set(self, token: str, entry: Dict[str, Any]) -> None:
+        """Cache a valid token's status until the TTL or its expiry, unless invalidated meanwhile"""
+        ttl = entry_ttl(entry, self.ttl)
+        if ttl <= 0 or self._tombstoned(token):
+            return
+        self._entries[token] = (entry, time.monotonic() + ttl)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def invalidate(self, token: str) -> None:
+        """
+        Drop a token (viewed or deleted) and block re-filling it for one TTL
+
+        At most max_entries tombstones are kept; the oldest go first.
+        """
+        self._entries.pop(token, None)
+        self._prune_tombstones()
+        self._tombstones.pop(token, None)
+        self._tombstones[token] = time.monotonic() + self.ttl
+        while len(self._tombstones) > self.max_entries:
+            self._tombstones.popitem(last=False)
+
+    def _prune_tombstones(self) -> None:
+        # Tombstones share one TTL, so they expire in insertion order
+        now = time.monotonic()
+        while self._tombstones:
+            oldest, deadline = next(iter(self._tombstones.items()))
+            if deadline > now:
+                break
+            del self._tombstones[oldest]
+
+    def _tombstoned(self, token: str) -> bool:
+        self._prune_tombstones()
+        return token in self._tombstones
+
+    async def clear(self) -> None:
+        """Drop every entry and tombstone"""
+        self._entries.clear()
+        self._tombstones.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "backend": self.backend,
+            "size": len(self._entries),
+            "tombstones": len(self._tombstones),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+class RedisStatusCache:
+    """
+    Status cache shared by all workers through Redis
+
+    Invalidation is seen by every worker at once. Fills use SET NX, and
+    invalidation overwrites the key with a tombstone for one TTL, so a fill
+    racing a view cannot bring the entry back. Redis errors are logged and
+    treated as misses, so an outage falls back to the database.
+    """
+
+    backend = "redis"
+    PREFIX = "securecom:qr-status:"
+    TOMBSTONE = b"-"
+
+    def __init__(self, client, ttl: Optional[float] = None):
+        self.client = client
+        self.ttl = settings.QR_STATUS_CACHE_TTL if ttl is None else ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @classmethod
+    def from_url(cls, url: str, ttl: Optional[float] = None) -> "RedisStatusCache":
+        """
+        Connect lazily to a redis:// URL
+
+        Raises:
+            RuntimeError: If the redis package is not installed
+        """
+        if redis_asyncio is None:
+            raise RuntimeError("QR_STATUS_CACHE_URL requires the redis package")
+        return cls(redis_asyncio.from_url(url), ttl)
+
+    async def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Cached status entry, or None on miss/expiry/error"""
+        try:
+            raw = await self.client.get(self.PREFIX + token)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("QR status cache read failed: %s", e)
+            raw = None
+        if isinstance(raw, str):
+            raw = raw.encode()
+        if raw is None or raw == self.TOMBSTONE:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry = json.loads(raw)
+        for field in DATETIME_FIELDS:
+            entry[field] = datetime.fromisoformat(entry[field])
+        return entry
+
+    async def set(self, token: str, entry: Dict[str, Any]) -> None:
+        """Cache a valid token's status until the TTL or its expiry, unless invalidated meanwhile"""
+        ttl_ms = int(entry_ttl(entry, self.ttl) * 1000)
+        if ttl_ms <= 0:
+            return
+        raw = json.dumps(entry, default=datetime.isoformat, separators=(",", ":"))
+        try:
+            await self.client.set(self.PREFIX + token, raw, px=ttl_ms, nx=True)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("QR status cache write failed: %s", e)
+
+    async def invalidate(self, token: str) -> None:
+        """Drop a token (viewed or deleted) for every worker and block re-filling it for one TTL"""
+        try:
+            await self.client.set(self.PREFIX + token, self.TOMBSTONE, px=max(int(self.ttl * 1000), 1))
+        except Exception as e:
+            self.errors += 1
+            logger.warning("QR status cache invalidation failed: %s", e)
+
+    async def clear(self) -> None:
+        """Drop every entry and tombstone"""
+        async for key in self.client.scan_iter(match=self.PREFIX + "*"):
+            await self.client.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/error counters"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "backend": self.backend,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+class DisabledStatusCache:
+    """Stand-in when QR_STATUS_CACHE_TTL is 0"""
+
+    backend = "off"
+
+    async def get(self, token: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    async def set(self, token: str, entry: Dict[str, Any]) -> None:
+        pass
+
+    async def invalidate(self, token: str) -> None:
+        pass
+
+    async def clear(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": False}
+
+
+def create_status_cache():
+    """Status cache configured by QR_STATUS_CACHE_TTL and QR_STATUS_CACHE_URL"""
+    if settings.QR_STATUS_CACHE_TTL <= 0:
+        return DisabledStatusCache()
+    if settings.QR_STATUS_CACHE_URL:
+        return RedisStatusCache.from_url(settings.QR_STATUS_CACHE_URL)
+    return MemoryStatusCache()
+
+
+# Singleton instance
+status_cache = create_status_cache()
@@ -0,0 +1,292 @@
+"""
+Chunked streaming AEAD container for files larger than memory
+
+Layout (big-endian):
+    header  = magic "SCSF" | version | kdf id | cipher id | 3 x u32 KDF params
+              | u32 chunk size | 16-byte salt | 7-byte base nonce
+              | u32 metadata length | metadata
+    chunk_i = AEAD(plaintext_i) | 16-byte tag   (AES-256-GCM or ChaCha20-Poly1305)
+
+Every chunk is sealed with nonce = base nonce | u32 counter | final flag and
+the full header as associated data, so reordered, dropped, truncated or
+appended chunks (and any header edit) fail authentication.
+
+Chunks are independent once the header is fixed, so encrypt_chunks and
+decrypt_chunks can seal/open several at once on a thread pool (the cipher
+backends release the GIL). Output order, and therefore every output byte,
+is the same as the sequential path.
+"""
+
+import struct
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from app.core.ciphers import CIPHER_CODES, TAG_SIZE, get_cipher
+from app.core.config import settings
+from app.core.executor import default_pool_size
+from app.core.kdf import KDF_CODES, KDF_NAMES, normalize_params
+
+MAGIC = b"SCSF"
+VERSION = 1
+SALT_SIZE = 16
+NONCE_PREFIX_SIZE = 7
+DEFAULT_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+MAX_METADATA_SIZE = 64 * 1024
+MAX_CHUNKS = 2 ** 32
+
+KDF_IDS = KDF_CODES
+# Ciphers with 12-byte nonces; each stream has its own key (random salt), so
+# the 7-byte random prefix plus counter never repeats under a key and
+# XChaCha's longer nonce buys nothing here
+CIPHER_IDS = {name: CIPHER_CODES[name] for name in ("aes-256-gcm", "chacha20-poly1305")}
+CIPHER_NAMES = {v: k for k, v in CIPHER_IDS.items()}
+
+_FIXED = struct.Struct(">4sBBBIIII16s7sI")
+
+
+@dataclass
+class StreamHeader:
+    """Parameters needed to decrypt a stream, stored in clear at its start"""
+    kdf: str
+    kdf_params: Dict[str, int]
+    salt: bytes
+    base_nonce: bytes
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+    metadata: bytes = b""
+    cipher: str = "aes-256-gcm"
+    _packed: bytes = field(default=b"", repr=False, compare=False)
+
+    def pack(self) -> bytes:
+        """Serialize the header (also used as associated data for every chunk)"""
+        if not self._packed:
+            if self.kdf == "argon2":
+                p1 = self.kdf_params["time_cost"]
+                p2 = self.kdf_params["memory_cost"]
+                p3 = self.kdf_params["parallelism"]
+            else:
+                p1, p2, p3 = self.kdf_params["iterations"], 0, 0
+            self._packed = _FIXED.pack(
+                MAGIC, VERSION, KDF_IDS[self.kdf], CIPHER_IDS[self.cipher],
+                p1, p2, p3, self.chunk_size, self.salt, self.base_nonce,
+                len(self.metadata)
+            ) + self.metadata
+        return self._packed
+
+    @classmethod
+    def read(cls, reader: BinaryIO) -> "StreamHeader":
+        """
+        Parse and validate a header from the start of a stream
+
+        Raises:
+            ValueError: If the header is malformed or asks for unsafe parameters
+        """
+        fixed = read_exact(reader, _FIXED.size)
+        if len(fixed) < _FIXED.size or fixed[:4] != MAGIC:
+            raise ValueError("Invalid encrypted file - not a SecureCom+ stream")
+        (_, version, kdf_id, cipher_id, p1, p2, p3, chunk_size,
+         salt, base_nonce, metadata_len) = _FIXED.unpack(fixed)
+
+        if version != VERSION:
+            raise ValueError(f"Unsupported stream version: {version}")
+        if kdf_id not in KDF_NAMES or cipher_id not in CIPHER_NAMES:
+            raise ValueError("Unsupported KDF or cipher in stream header")
+        if not 0 < chunk_size <= MAX_CHUNK_SIZE or metadata_len > MAX_METADATA_SIZE:
+            raise ValueError("Invalid stream header - chunk or metadata size out of range")
+
+        kdf = KDF_NAMES[kdf_id]
+        if kdf == "argon2":
+            params = {"time_cost": p1, "memory_cost": p2, "parallelism": p3}
+        else:
+            params = {"iterations": p1}
+        params = normalize_params(kdf, params)
+
+        metadata = read_exact(reader, metadata_len)
+        if len(metadata) < metadata_len:
+            raise ValueError("Invalid encrypted file - truncated header")
+
+        return cls(
+            kdf=kdf,
+            kdf_params=params,
+            salt=salt,
+            base_nonce=base_nonce,
+            chunk_size=chunk_size,
+            metadata=metadata,
+            cipher=CIPHER_NAMES[cipher_id],
+            _packed=fixed + metadata
+        )
+
+
+def encrypted_size(plaintext_size: int, chunk_size: int, metadata_size: int = 0) -> int:
+    """Exact size of the stream produced for a plaintext of plaintext_size bytes"""
+    chunk_count = max(1, -(-plaintext_size // chunk_size))
+    return _FIXED.size + metadata_size + plaintext_size + chunk_count * TAG_SIZE
+
+
+def read_exact(reader: BinaryIO, size: int) -> bytes:
+    """Read up to size bytes, looping over short reads; fewer only at EOF"""
+    parts = []
+    remaining = size
+    while remaining > 0:
+        part = reader.read(remaining)
+        if not part:
+            break
+        parts.append(part)
+        remaining -= len(part)
+    return b"".join(parts)
+
+
+def chunk_nonce(base_nonce: bytes, counter: int, final: bool) -> bytes:
+    """12-byte nonce: base nonce prefix | u32 counter | final flag"""
+    if counter >= MAX_CHUNKS:
+        raise ValueError("Stream too long - chunk counter exhausted")
+    return base_nonce + struct.pack(">IB", counter, 1 if final else 0)
+
+
+def seal_chunk(key: bytes, header: StreamHeader, counter: int, data: bytes, final: bool) -> bytes:
+    """Encrypt one chunk, returning ciphertext | tag"""
+    nonce = chunk_nonce(header.base_nonce, counter, final)
+    ciphertext, tag = get_cipher(header.cipher).encrypt(key, nonce, data, header.pack())
+    return ciphertext + tag
+
+
+def open_chunk(key: bytes, header: StreamHeader, counter: int, block: bytes, final: bool) -> bytes:
+    """Authenticate and decrypt one ciphertext | tag block"""
+    if len(block) < TAG_SIZE:
+        raise ValueError("Decryption failed - encrypted file is truncated")
+    nonce = chunk_nonce(header.base_nonce, counter, final)
+    try:
+        return get_cipher(header.cipher).decrypt(
+            key, nonce, block[:-TAG_SIZE], block[-TAG_SIZE:], header.pack()
+        )
+    except ValueError:
+        if counter == 0:
+            raise ValueError("Decryption failed - wrong password or corrupted file")
+        raise ValueError(
+            f"Decryption failed - chunk {counter} failed authentication "
+            "(file corrupted, truncated or reordered)"
+        )
+
+
+_segment_pool: Optional[ThreadPoolExecutor] = None
+_segment_pool_lock = threading.Lock()
+
+
+def segment_pool() -> ThreadPoolExecutor:
+    """Shared pool for parallel chunk work, created on first use"""
+    global _segment_pool
+    with _segment_pool_lock:
+        if _segment_pool is None:
+            _segment_pool = ThreadPoolExecutor(
+                max_workers=settings.STREAM_PARALLELISM or default_pool_size(),
+                thread_name_prefix="stream-segment"
+            )
+        return _segment_pool
+
+
+def resolve_workers(workers: Optional[int]) -> int:
+    """Chunks processed at once per stream (0/None = STREAM_PARALLELISM or CPU count)"""
+    return max(1, workers or settings.STREAM_PARALLELISM or default_pool_size())
+
+
+def _read_blocks(reader: BinaryIO, size: int) -> Iterator[Tuple[int, bytes, bool]]:
+    """
+    Yield (counter, block, final) for consecutive blocks of size bytes
+
+    Looks ahead one block so the last one can carry the final flag; a short
+    block is always final. Empty input yields a single empty final block.
+    """
+    counter = 0
+    block = read_exact(reader, size)
+    while True:
+        next_block = read_exact(reader, size) if len(block) == size else b""
+        final = not next_block
+        yield counter, block, final
+        if final:
+            return
+        block = next_block
+        counter += 1
+
+
+def _map_ordered(func: Callable[..., bytes], jobs: Iterable[Tuple[Any, ...]], workers: int) -> Iterator[bytes]:
+    """
+    func(*job) for every job, results in submission order
+
+    Sequential for one worker. Otherwise at most 2 x workers jobs are in
+    flight, so memory stays bounded by that many chunks; the first failure
+    (in order) is raised and outstanding jobs are cancelled.
+    """
+    if workers <= 1:
+        for job in jobs:
+            yield func(*job)
+        return
+
+    pool = segment_pool()
+    window = 2 * workers
+    pending = deque()
+    try:
+        for job in jobs:
+            pending.append(pool.submit(func, *job))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def encrypt_chunks(
+    reader: BinaryIO,
+    key: bytes,
+    header: StreamHeader,
+    workers: int = 1
+) -> Iterator[bytes]:
+    """
+    Encrypt reader into the stream format, one chunk at a time
+
+    Yields the header first, then each sealed chunk. Memory use is bounded by
+    a few chunks per worker regardless of input size.
+
+    Args:
+        reader: Plaintext source
+        key: Stream key
+        header: Header for this stream
+        workers: Chunks sealed in parallel (1 = sequential)
+    """
+    yield header.pack()
+    jobs = (
+        (key, header, counter, chunk, final)
+        for counter, chunk, final in _read_blocks(reader, header.chunk_size)
+    )
+    yield from _map_ordered(seal_chunk, jobs, workers)
+
+
+def decrypt_chunks(
+    reader: BinaryIO,
+    key: bytes,
+    header: StreamHeader,
+    workers: int = 1
+) -> Iterator[bytes]:
+    """
+    Decrypt the chunks following an already-read header
+
+    Yields authenticated plaintext chunks in order.
+
+    Args:
+        reader: Source positioned after the header
+        key: Stream key
+        header: The stream's header
+        workers: Chunks opened in parallel (1 = sequential)
+
+    Raises:
+        ValueError: On authentication failure, truncation or trailing data
+    """
+    jobs = (
+        (key, header, counter, block, final)
+        for counter, block, final in _read_blocks(reader, header.chunk_size + TAG_SIZE)
+    )
+    yield from _map_ordered(open_chunk, jobs, workers)
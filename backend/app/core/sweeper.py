@@ -0,0 +1,120 @@
+"""
+Background purge of expired and consumed QR tokens
+Keeps qr_tokens (and the SQLite file) from growing without bound
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal
+from app.db.repositories import QRTokenRepository
+
+logger = logging.getLogger(__name__)
+
+
+class TokenSweeper:
+    """
+    Periodic task deleting tokens that expired or were viewed more than
+    QR_SWEEP_VIEWED_GRACE seconds ago
+
+    The grace keeps both kinds of dead token around long enough to report
+    "expired" or "already viewed" instead of "not found".
+
+    Rows are deleted in batches of QR_SWEEP_BATCH_SIZE, each in its own
+    transaction on the async engine, yielding between batches so the write
+    lock is never held for long and requests interleave with the sweep.
+    """
+
+    def __init__(
+        self,
+        interval: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        viewed_grace: Optional[float] = None,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal
+    ):
+        self.interval = settings.QR_SWEEP_INTERVAL if interval is None else interval
+        self.batch_size = batch_size or settings.QR_SWEEP_BATCH_SIZE
+        self.viewed_grace = settings.QR_SWEEP_VIEWED_GRACE if viewed_grace is None else viewed_grace
+        self.session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.purged_total = 0
+        self.last_purged = 0
+        self.last_duration = 0.0
+        self.last_run: Optional[datetime] = None
+
+    async def _purge_batch(self, before: datetime) -> int:
+        async with self.session_factory() as db:
+            return await QRTokenRepository(db).purge_batch(before, self.batch_size)
+
+    async def sweep(self) -> int:
+        """
+        Purge everything currently eligible
+
+        Returns:
+            Number of rows deleted
+        """
+        start = time.perf_counter()
+        now = datetime.utcnow()
+        before = now - timedelta(seconds=self.viewed_grace)
+        purged = 0
+        while True:
+            deleted = await self._purge_batch(before)
+            purged += deleted
+            if deleted < self.batch_size:
+                break
+            await asyncio.sleep(0)
+
+        self.runs += 1
+        self.last_run = now
+        self.last_purged = purged
+        self.purged_total += purged
+        self.last_duration = time.perf_counter() - start
+        if purged:
+            logger.info("🧹 Purged %d QR tokens in %.3fs", purged, self.last_duration)
+        return purged
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("QR token sweep failed")
+
+    def start(self) -> None:
+        """Start sweeping every interval seconds (no-op when interval is 0)"""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the background task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Rows purged and sweep timings"""
+        return {
+            "enabled": self.interval > 0,
+            "interval": self.interval,
+            "runs": self.runs,
+            "purged_total": self.purged_total,
+            "last_purged": self.last_purged,
+            "last_duration": self.last_duration,
+            "last_run": self.last_run.isoformat() if self.last_run else None
+        }
+
+
+# Singleton instance
+token_sweeper = TokenSweeper()
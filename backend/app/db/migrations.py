@@ -0,0 +1,160 @@
+"""
+In-place schema upgrades run at startup, after create_all()
+
+create_all() only creates missing tables, so changes to existing tables
+(new indexes, the binary payload column) are applied here. Each step checks
+the live schema first and is a no-op once applied. Several workers may start
+at once, so DDL that loses a race to another worker is tolerated.
+"""
+
+import json
+import logging
+from typing import Any, Callable, Dict, Set
+
+from sqlalchemy import LargeBinary, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+from app.core import envelope
+from app.db.models import QRToken
+
+logger = logging.getLogger(__name__)
+
+LEGACY_MESSAGE_COLUMN = "encrypted_message"
+MIGRATION_BATCH_SIZE = 500
+
+
+def legacy_message(stored: str) -> Dict[str, Any]:
+    """Parse a pre-binary encrypted_message value (JSON or envelope text)"""
+    if stored.startswith("{"):
+        return json.loads(stored)
+    return envelope.loads(stored)
+
+
+def index_names(engine: Engine, table: str) -> Set[str]:
+    """Index names of a table in the live schema"""
+    return {index["name"] for index in inspect(engine).get_indexes(table)}
+
+
+def ensure_indexes(engine: Engine) -> None:
+    """
+    Create the qr_tokens indexes on databases created before they existed
+
+    An index another worker created in the meantime is not an error.
+    """
+    table = QRToken.__tablename__
+    existing = index_names(engine, table)
+    for index in QRToken.__table__.indexes:
+        if index.name in existing:
+            continue
+        try:
+            index.create(bind=engine)
+        except DBAPIError:
+            if index.name not in index_names(engine, table):
+                raise
+            logger.info("Index %s already created by another worker", index.name)
+            continue
+        logger.info("✅ Created index %s", index.name)
+
+
+def table_columns(engine: Engine, table: str) -> Set[str]:
+    """Column names of a table in the live schema"""
+    return {column["name"] for column in inspect(engine).get_columns(table)}
+
+
+def alter_table(engine: Engine, statement: str, applied: Callable[[Set[str]], bool]) -> None:
+    """
+    Run an ALTER TABLE on qr_tokens, tolerating another worker having run it
+
+    Args:
+        engine: Sync engine
+        statement: DDL to execute
+        applied: Tells from the live columns whether the change is in place
+
+    Raises:
+        DBAPIError: If the statement failed and the change is not in place
+    """
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(statement))
+    except DBAPIError:
+        if not applied(table_columns(engine, QRToken.__tablename__)):
+            raise
+        logger.info("Schema change already applied by another worker: %s", statement)
+
+
+def migrate_payload_column(engine: Engine) -> int:
+    """
+    Move qr_tokens.encrypted_message (text) into the binary payload column
+
+    Rows are converted in batches, each in its own transaction, then the
+    text column is dropped (SQLite 3.35+ / PostgreSQL). The added column
+    stays nullable on migrated databases, since SQLite cannot add a NOT NULL
+    column to a populated table; the model always writes it.
+
+    Rows whose stored message cannot be parsed could never be viewed, so they
+    are logged and deleted instead of failing every startup. Workers racing
+    through the migration convert rows idempotently; once one of them has
+    dropped the text column the others stop.
+
+    Returns:
+        Number of rows converted
+    """
+    table = QRToken.__tablename__
+    columns = table_columns(engine, table)
+    if LEGACY_MESSAGE_COLUMN not in columns:
+        return 0
+
+    if "payload" not in columns:
+        blob = LargeBinary().compile(dialect=engine.dialect)
+        alter_table(engine, f"ALTER TABLE {table} ADD COLUMN payload {blob}",
+                    lambda live: "payload" in live)
+
+    converted = 0
+    discarded = 0
+    last_id = 0
+    while True:
+        try:
+            with engine.begin() as conn:
+                rows = conn.execute(
+                    text(f"SELECT id, token, {LEGACY_MESSAGE_COLUMN} FROM {table} "
+                         f"WHERE payload IS NULL AND id > :last_id ORDER BY id "
+                         f"LIMIT {MIGRATION_BATCH_SIZE}"),
+                    {"last_id": last_id}
+                ).all()
+                if not rows:
+                    break
+                updates, broken = [], []
+                for row in rows:
+                    try:
+                        payload = QRToken.encode_message(legacy_message(row[2]))
+                    except (ValueError, TypeError, KeyError) as e:
+                        logger.warning("Discarding QR token %s (id %d): unreadable message: %s",
+                                       row.token, row.id, e)
+                        broken.append({"id": row.id})
+                        continue
+                    updates.append({"id": row.id, "payload": payload})
+                if updates:
+                    conn.execute(text(f"UPDATE {table} SET payload = :payload WHERE id = :id"), updates)
+                if broken:
+                    conn.execute(text(f"DELETE FROM {table} WHERE id = :id"), broken)
+        except DBAPIError:
+            if LEGACY_MESSAGE_COLUMN in table_columns(engine, table):
+                raise
+            # Another worker finished the migration and dropped the column
+            return converted
+        last_id = rows[-1].id
+        converted += len(updates)
+        discarded += len(broken)
+
+    alter_table(engine, f"ALTER TABLE {table} DROP COLUMN {LEGACY_MESSAGE_COLUMN}",
+                lambda live: LEGACY_MESSAGE_COLUMN not in live)
+    logger.info("✅ Migrated %d QR tokens to binary payloads (%d unreadable discarded)",
+                converted, discarded)
+    return converted
+
+
+def run_migrations(engine: Engine) -> None:
+    """Apply every pending in-place upgrade"""
+    migrate_payload_column(engine)
+    ensure_indexes(engine)
@@ -2,12 +2,15 @@
 Database Models
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, LargeBinary
 from datetime import datetime, timedelta
+from typing import Any, Dict
+import json
 import secrets
 
 from app.db.database import Base
 from app.core.config import settings
+from app.core import envelope
 
 
 class QRToken(Base):
@@ -17,11 +20,11 @@ class QRToken(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     token = Column(String(64), unique=True, nullable=False, index=True)
-    encrypted_message = Column(Text, nullable=False)  # JSON string
+    payload = Column(LargeBinary, nullable=False)  # see encode_message()
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     viewed = Column(Boolean, default=False, nullable=False)
-    viewed_at = Column(DateTime, nullable=True)
-    expires_at = Column(DateTime, nullable=False)
+    viewed_at = Column(DateTime, nullable=True, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
     
     @staticmethod
     def generate_token() -> str:
@@ -34,6 +37,30 @@ class QRToken(Base):
         hours = hours or settings.QR_TOKEN_EXPIRY_HOURS
         return datetime.utcnow() + timedelta(hours=hours)
     
+    @staticmethod
+    def encode_message(message: Dict[str, Any]) -> bytes:
+        """
+        Stored form of an encrypted message
+        
+        Payloads the packed envelope can hold exactly are stored as its raw
+        bytes (about 0.7x the base64 JSON); anything else (extra or
+        non-canonical fields) is kept as UTF-8 JSON.
+        """
+        try:
+            packed = envelope.pack(message)
+            if envelope.unpack(packed) == message:
+                return packed
+        except ValueError:
+            pass
+        return json.dumps(message, separators=(",", ":")).encode('utf-8')
+    
+    @staticmethod
+    def decode_message(payload: bytes) -> Dict[str, Any]:
+        """Undo encode_message (JSON payloads always start with "{")"""
+        if payload[:1] == b"{":
+            return json.loads(payload)
+        return envelope.unpack(payload)
+    
     def mark_as_viewed(self) -> None:
         """Mark token as viewed (single-use)"""
         self.viewed = True
@@ -0,0 +1,186 @@
+"""
+Engine tuning and connection-pool instrumentation
+
+SQLite gets WAL journaling, synchronous=NORMAL and a busy timeout on every
+connection, so several workers can share one file: readers never block the
+writer, and a writer waits for the lock instead of failing immediately with
+"database is locked". Server databases get an explicitly sized pool with
+pre-ping and recycling.
+"""
+
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import settings
+
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def is_sqlite(url: str) -> bool:
+    """True for SQLite URLs (any driver)"""
+    return url.startswith("sqlite")
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """
+    create_engine()/create_async_engine() keyword arguments for a URL
+
+    In-memory SQLite uses a single shared connection, so it gets no pool
+    sizing.
+    """
+    options: Dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if is_sqlite(url):
+        options["connect_args"] = {"check_same_thread": False}
+        if ":memory:" in url or url.rstrip("/").endswith(":"):
+            return options
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Connect hook setting the SQLite pragmas from settings"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT)}")
+        cursor.execute(f"PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}")
+    finally:
+        cursor.close()
+
+
+class PoolMetrics:
+    """
+    Checkout, overflow and lock-wait counters for one engine
+
+    Hold time is how long a request keeps a connection checked out; write
+    time covers INSERT/UPDATE/DELETE statements and commit time the DBAPI
+    commit, which is where SQLite lock waits (busy_timeout) show up. Lock
+    errors count writes and commits that gave up.
+
+    Commits never pass through the cursor events and the engine's "commit"
+    event fires before the commit without a matching "after" event, so they
+    are timed by wrapping the engine's own dialect.do_commit.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.hold_total = 0.0
+        self.hold_max = 0.0
+        self.writes = 0
+        self.write_total = 0.0
+        self.write_max = 0.0
+        self.commits = 0
+        self.commit_total = 0.0
+        self.commit_max = 0.0
+        self.lock_errors = 0
+
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+        event.listen(engine, "handle_error", self._on_error)
+        engine.dialect.do_commit = self._timed_commit(engine.dialect.do_commit)
+
+    def _timed_commit(self, do_commit):
+        def timed(dbapi_connection) -> None:
+            started = time.perf_counter()
+            try:
+                do_commit(dbapi_connection)
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self.commits += 1
+                    self.commit_total += elapsed
+                    self.commit_max = max(self.commit_max, elapsed)
+        return timed
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        with self._lock:
+            self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        started = connection_record.info.pop("checked_out_at", None)
+        if started is None:
+            return
+        held = time.perf_counter() - started
+        with self._lock:
+            self.hold_total += held
+            self.hold_max = max(self.hold_max, held)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if statement.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+            conn.info["write_started_at"] = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        started = conn.info.pop("write_started_at", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.writes += 1
+            self.write_total += elapsed
+            self.write_max = max(self.write_max, elapsed)
+
+    def _on_error(self, context) -> None:
+        if context.connection is not None:
+            context.connection.info.pop("write_started_at", None)
+        error = context.original_exception
+        if isinstance(context.sqlalchemy_exception, OperationalError) and "locked" in str(error):
+            with self._lock:
+                self.lock_errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool occupancy plus checkout, write and commit timings"""
+        pool = self.engine.pool
+        return {
+            "pool": type(pool).__name__,
+            "size": pool.size() if hasattr(pool, "size") else None,
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+            # QueuePool reports unopened base slots as negative overflow
+            "overflow": max(pool.overflow(), 0) if hasattr(pool, "overflow") else None,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "hold_avg": self.hold_total / self.checkouts if self.checkouts else 0.0,
+            "hold_max": self.hold_max,
+            "writes": self.writes,
+            "write_avg": self.write_total / self.writes if self.writes else 0.0,
+            "write_max": self.write_max,
+            "commits": self.commits,
+            "commit_avg": self.commit_total / self.commits if self.commits else 0.0,
+            "commit_max": self.commit_max,
+            "lock_errors": self.lock_errors
+        }
+
+
+def configure_engine(engine: Engine) -> PoolMetrics:
+    """
+    Install SQLite pragmas (for SQLite engines) and pool instrumentation
+
+    Args:
+        engine: Sync engine, or an AsyncEngine's sync_engine
+
+    Returns:
+        The engine's metrics collector
+    """
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", apply_sqlite_pragmas)
+    return PoolMetrics(engine)
@@ -0,0 +1,154 @@
+"""
+Database access for QR tokens
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import QRToken
+
+
+class ConsumedToken(NamedTuple):
+    """Message released by a successful consume"""
+    payload: bytes
+    viewed_at: datetime
+
+
+class QRTokenRepository:
+    """QR token queries over an async session"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get(self, token: str) -> Optional[QRToken]:
+        """Token row, or None"""
+        return await self.db.scalar(select(QRToken).where(QRToken.token == token))
+
+    async def exists(self, token: str) -> bool:
+        """True if the token has a row (in any state)"""
+        row = await self.db.scalar(select(QRToken.id).where(QRToken.token == token))
+        return row is not None
+
+    async def add(self, qr_token: QRToken) -> None:
+        """Insert a token"""
+        self.db.add(qr_token)
+        await self.db.commit()
+
+    async def add_many(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Insert many tokens in one transaction
+
+        Uses a single executemany-style INSERT of plain column dicts (no ORM
+        objects, identity map or per-row refresh).
+
+        Args:
+            rows: Column values (token, payload, expires_at) per token
+        """
+        now = datetime.utcnow()
+        await self.db.execute(
+            insert(QRToken),
+            [{"created_at": now, "viewed": False, **row} for row in rows]
+        )
+        await self.db.commit()
+
+    async def delete(self, token: str) -> bool:
+        """
+        Delete a token
+
+        Returns:
+            False if there was no such token
+        """
+        result = await self.db.execute(
+            delete(QRToken)
+            .where(QRToken.token == token)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return result.rowcount > 0
+
+    async def consume(self, token: str) -> Optional[ConsumedToken]:
+        """
+        Mark a token viewed and release its message, atomically
+
+        A single conditional UPDATE claims the token only if it is unviewed
+        and unexpired, so concurrent viewers cannot both succeed. Dialects
+        with UPDATE ... RETURNING (SQLite 3.35+, PostgreSQL) get the message
+        back in the same statement; others fall back to reading it after the
+        claim, which is still single-use because only one UPDATE matches.
+
+        Args:
+            token: QR token string
+
+        Returns:
+            The released message, or None if the token is missing, viewed or
+            expired (use reason() to tell which)
+        """
+        now = datetime.utcnow()
+        claim = (
+            update(QRToken)
+            .where(QRToken.token == token, QRToken.viewed.is_(False), QRToken.expires_at > now)
+            .values(viewed=True, viewed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+
+        if self.db.get_bind().dialect.update_returning:
+            row = (await self.db.execute(claim.returning(QRToken.payload))).first()
+            await self.db.commit()
+            return ConsumedToken(row[0], now) if row else None
+
+        if (await self.db.execute(claim)).rowcount != 1:
+            await self.db.rollback()
+            return None
+        message = await self.db.scalar(
+            select(QRToken.payload).where(QRToken.token == token)
+        )
+        await self.db.commit()
+        return ConsumedToken(message, now)
+
+    async def reason(self, token: str) -> Optional[str]:
+        """
+        Why a token cannot be consumed
+
+        Returns:
+            "not found", "already viewed" or "expired"; None if it is valid
+        """
+        row = (await self.db.execute(
+            select(QRToken.viewed, QRToken.expires_at).where(QRToken.token == token)
+        )).first()
+        if row is None:
+            return "not found"
+        if row.viewed:
+            return "already viewed"
+        if datetime.utcnow() > row.expires_at:
+            return "expired"
+        return None
+
+    async def purge_batch(self, before: datetime, limit: int) -> int:
+        """
+        Delete up to limit expired or consumed tokens in one short transaction
+
+        Both conditions are served by the expires_at/viewed_at indexes, and
+        the LIMIT keeps each write lock brief.
+
+        Args:
+            before: Tokens that expired or were viewed before this are purged
+            limit: Maximum rows to delete
+
+        Returns:
+            Number of rows deleted
+        """
+        doomed = (
+            select(QRToken.id)
+            .where(or_(QRToken.expires_at < before, QRToken.viewed_at < before))
+            .limit(limit)
+        )
+        result = await self.db.execute(
+            delete(QRToken)
+            .where(QRToken.id.in_(doomed))
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return result.rowcount
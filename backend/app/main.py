@@ -7,11 +7,18 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 
 from app.core.config import settings
 from app.api.routes import encryption, qr_token, health, ai_assistant
+from app.core.ciphers import select_fastest
+from app.core.encryption import encryption_engine
+from app.core.executor import crypto_executor
+from app.core.kdf import calibrate_argon2, apply_calibration
+from app.core.sweeper import token_sweeper
 from app.db.database import engine, Base
+from app.db.migrations import run_migrations
 
 # Configure logging
 logging.basicConfig(
@@ -27,10 +34,20 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Starting SecureCom+ application...")
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
     logger.info("✅ Database tables created")
+    if settings.KDF_AUTO_CALIBRATE:
+        apply_calibration(await asyncio.to_thread(calibrate_argon2))
+    if settings.CIPHER == "auto":
+        throughput = await asyncio.to_thread(select_fastest)
+        encryption_engine.cipher_id = next(iter(throughput))
+        logger.info("✅ Cipher selected: %s", encryption_engine.cipher_id)
+    token_sweeper.start()
     yield
     # Shutdown
     logger.info("👋 Shutting down SecureCom+ application...")
+    await token_sweeper.stop()
+    crypto_executor.shutdown(wait=False)
 
 
 # Initialize FastAPI app
@@ -3,7 +3,7 @@ Pydantic schemas for encryption endpoints
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 
 
 class EncryptTextRequest(BaseModel):
@@ -11,15 +11,41 @@ class EncryptTextRequest(BaseModel):
     plaintext: str = Field(..., min_length=1, description="Text to encrypt")
     password: str = Field(..., min_length=1, description="Encryption password")
     use_emoji: bool = Field(default=False, description="Convert to emoji format")
+    additional_passwords: List[str] = Field(
+        default_factory=list,
+        description="Further recipient passwords; any one of them can decrypt"
+    )
+    compress: Optional[bool] = Field(
+        None,
+        description="Compress before encrypting (default: server setting). Disable when "
+                    "the text mixes secrets with attacker-controlled input"
+    )
+
+
+class KeySlot(BaseModel):
+    """Data key wrapped under one password-derived key (envelope mode)"""
+    key_id: Optional[str] = None
+    salt: str
+    kdf: str
+    kdf_params: Optional[Dict[str, int]] = None
+    cipher: Optional[str] = None
+    nonce: str
+    wrapped_key: str
+    tag: str
 
 
 class EncryptedData(BaseModel):
-    """Encrypted data schema"""
+    """Encrypted data schema (salt/kdf live in key_slots for envelope mode)"""
     ciphertext: str
-    salt: str
+    salt: Optional[str] = None
     nonce: str
     tag: str
-    kdf: str
+    kdf: Optional[str] = None
+    kdf_params: Optional[Dict[str, int]] = None
+    cipher: Optional[str] = None
+    compression: Optional[str] = None
+    mode: Optional[str] = None
+    key_slots: Optional[List[KeySlot]] = None
     filename: Optional[str] = None
     mimetype: Optional[str] = None
     size: Optional[int] = None
@@ -33,6 +59,27 @@ class EncryptTextResponse(BaseModel):
     emoji_stats: Optional[Dict[str, int]] = None
 
 
+class EncryptBatchRequest(BaseModel):
+    """Request schema for batch text encryption"""
+    plaintexts: List[str] = Field(..., min_length=1, description="Texts to encrypt")
+    password: str = Field(..., min_length=1, description="Encryption password")
+    use_emoji: bool = Field(default=False, description="Convert each item to emoji format")
+    compress: Optional[bool] = Field(None, description="Compress before encrypting (default: server setting)")
+
+
+class EncryptedItem(BaseModel):
+    """One encrypted message in a batch response"""
+    encrypted_data: EncryptedData
+    emoji: Optional[str] = None
+
+
+class EncryptBatchResponse(BaseModel):
+    """Response schema for batch text encryption"""
+    success: bool = True
+    count: int
+    items: List[EncryptedItem]
+
+
 class DecryptTextRequest(BaseModel):
     """Request schema for text decryption"""
     password: str = Field(..., min_length=1, description="Decryption password")
@@ -42,6 +89,11 @@ class DecryptTextRequest(BaseModel):
     nonce: Optional[str] = None
     tag: Optional[str] = None
     kdf: Optional[str] = "argon2"
+    kdf_params: Optional[Dict[str, int]] = None
+    cipher: Optional[str] = Field(None, description="AEAD cipher id (omit for legacy AES-GCM payloads)")
+    compression: Optional[str] = Field(None, description="Codec recorded at encryption (zlib/lzma)")
+    mode: Optional[str] = Field(None, description="\"envelope\" for multi-recipient payloads")
+    key_slots: Optional[List[KeySlot]] = None
 
 
 class DecryptTextResponse(BaseModel):
@@ -70,6 +122,19 @@ class DecryptFileRequest(BaseModel):
     encrypted_data: EncryptedData
 
 
+class RewrapRequest(BaseModel):
+    """Request schema for changing an envelope payload's password"""
+    password: str = Field(..., min_length=1, description="Current password")
+    new_password: str = Field(..., min_length=1, description="New password")
+    encrypted_data: EncryptedData
+
+
+class RewrapResponse(BaseModel):
+    """Response schema for a rewrapped payload"""
+    success: bool = True
+    encrypted_data: EncryptedData
+
+
 class DecryptFileResponse(BaseModel):
     """Response schema for file decryption"""
     success: bool = True
@@ -4,13 +4,39 @@ Pydantic schemas for QR token endpoints
 
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+
+from app.core.config import settings
 
 
 class CreateQRTokenRequest(BaseModel):
     """Request schema for creating QR token"""
     encrypted_message: Dict[str, Any] = Field(..., description="Encrypted message data")
     expiry_hours: int = Field(default=24, ge=1, le=168, description="Token expiry in hours (1-168)")
+    include_image: bool = Field(
+        default=True,
+        description="Inline a base64 PNG in the response; otherwise fetch image_url when needed"
+    )
+
+
+class CreateQRTokenBatchRequest(BaseModel):
+    """Request schema for creating many QR tokens at once"""
+    encrypted_messages: Optional[List[Dict[str, Any]]] = Field(
+        default=None, min_length=1, max_length=settings.QR_BATCH_MAX_SIZE,
+        description="One encrypted message per token"
+    )
+    encrypted_message: Optional[Dict[str, Any]] = Field(
+        default=None, description="Message shared by count tokens (instead of encrypted_messages)"
+    )
+    count: Optional[int] = Field(
+        default=None, ge=1, le=settings.QR_BATCH_MAX_SIZE,
+        description="Tokens to create for encrypted_message"
+    )
+    expiry_hours: int = Field(default=24, ge=1, le=168, description="Token expiry in hours (1-168)")
+    include_image: bool = Field(
+        default=False,
+        description="Inline a base64 PNG per token (slow for large batches); otherwise use image_url"
+    )
 
 
 class CreateQRTokenResponse(BaseModel):
@@ -18,7 +44,8 @@ class CreateQRTokenResponse(BaseModel):
     success: bool = True
     token: str
     url: str
-    qr_image: str  # base64 encoded PNG
+    qr_image: Optional[str] = None  # base64 encoded PNG (when include_image)
+    image_url: str  # GET for PNG/SVG rendered on demand
     expires_at: datetime
 
 
@@ -0,0 +1,17 @@
+"""
+Performance benchmarks for SecureCom+ hot paths
+
+The API cases run the real app lifespan (create_all, migrations, sweeper),
+so DATABASE_URL is pointed at a throwaway SQLite file before any app module
+reads the settings; benchmark runs never touch the developer's database.
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix="securecom-bench-")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/bench.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
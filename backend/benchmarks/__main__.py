@@ -0,0 +1,67 @@
+"""
+Run the benchmark suite
+
+Usage (from backend/):
+    python -m benchmarks                         # run all, write benchmarks/results.json
+    python -m benchmarks -k crypto --quick       # subset, fewer iterations
+    python -m benchmarks --save-baseline         # store results as the baseline
+    python -m benchmarks --threshold 0.1         # flag >10% regressions vs baseline
+
+Exits with status 1 when any case regresses against the baseline.
+"""
+
+import argparse
+import os
+import sys
+
+from benchmarks import cases  # noqa: F401 - registers cases
+from benchmarks.harness import CASES, compare, load_results, run_case, write_results
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(HERE, "results.json")
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="SecureCom+ benchmark suite")
+    parser.add_argument("-k", "--filter", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="Run a fraction of the iterations")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write JSON results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results to the baseline file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown fraction")
+    args = parser.parse_args()
+
+    selected = [case for name, case in CASES.items() if args.filter in name]
+    results = []
+    for case in selected:
+        result = run_case(case, scale=0.2 if args.quick else 1.0)
+        results.append(result)
+        print(
+            f"{result['name']:<32} {result['ops_per_sec']:>10.1f} ops/s  "
+            f"p50 {result['p50_ms']:>9.3f} ms  p99 {result['p99_ms']:>9.3f} ms  "
+            f"peak {result['peak_memory_bytes'] / 1024:>10.1f} KiB"
+        )
+
+    write_results(args.output, results)
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        write_results(args.baseline, results)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found - run with --save-baseline to create one")
+        return 0
+
+    report = compare(results, load_results(args.baseline), args.threshold)
+    regressions = [entry for entry in report if entry["regression"]]
+    for entry in report:
+        flag = "REGRESSION" if entry["regression"] else "ok"
+        print(f"{entry['name']:<32} p50 x{entry['p50_ratio']:.2f}  memory x{entry['memory_ratio']:.2f}  {flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Benchmark cases for the crypto, codec, QR and API hot paths
+"""
+
+import atexit
+import os
+from functools import lru_cache
+
+from benchmarks.harness import benchmark
+
+from app.core.encryption import EncryptionEngine
+from app.core.emoji_encoder import EmojiEncoder
+
+SIZES = {"1kb": 1024, "1mb": 1024 * 1024, "10mb": 10 * 1024 * 1024}
+PASSWORD = "BenchmarkPassword123!"
+
+engine = EncryptionEngine()
+emoji = EmojiEncoder()
+
+
+# ---------------------------------------------------------------------------
+# Key derivation and AEAD
+# ---------------------------------------------------------------------------
+
+@benchmark("crypto.derive_key.argon2", iterations=10, tags=["crypto"])
+def derive_key_argon2(_):
+    engine.derive_key(PASSWORD, b"0123456789abcdef")
+
+
+def _encrypt_case(size_name: str, size: int):
+    iterations = 10 if size <= SIZES["1mb"] else 3
+
+    @benchmark(f"crypto.encrypt.{size_name}", iterations=iterations, tags=["crypto"],
+               setup=lambda: "x" * size)
+    def encrypt(text):
+        engine.encrypt(text, PASSWORD)
+
+    @benchmark(f"crypto.encrypt_bytes.{size_name}", iterations=iterations, tags=["crypto"],
+               setup=lambda: os.urandom(size))
+    def encrypt_bytes(data):
+        engine.encrypt_bytes(data, PASSWORD)
+
+    @benchmark(f"crypto.decrypt_bytes.{size_name}", iterations=iterations, tags=["crypto"],
+               setup=lambda: engine.encrypt_bytes(os.urandom(size), PASSWORD))
+    def decrypt_bytes(encrypted):
+        engine.decrypt_bytes(encrypted, PASSWORD)
+
+
+for _name, _size in SIZES.items():
+    _encrypt_case(_name, _size)
+
+
+def _cipher_case(cipher_id: str):
+    from app.core.ciphers import get_cipher
+    key, data = os.urandom(32), os.urandom(SIZES["1mb"])
+
+    @benchmark(f"crypto.cipher.{cipher_id}.1mb", iterations=20, tags=["crypto", "cipher"])
+    def seal(_):
+        backend = get_cipher(cipher_id)
+        backend.encrypt(key, os.urandom(backend.nonce_size), data)
+
+
+for _cipher_id in ("aes-256-gcm", "chacha20-poly1305", "xchacha20-poly1305"):
+    _cipher_case(_cipher_id)
+
+
+def _stream_case(mode: str, parallelism: int):
+    import io
+    from app.core import streaming
+    stream_engine = EncryptionEngine(parallelism=parallelism)
+    key = os.urandom(32)
+    header = stream_engine._new_stream_header(b"", None)
+
+    @benchmark(f"crypto.stream_encrypt.{mode}.10mb", iterations=5, tags=["crypto", "stream"],
+               setup=lambda: os.urandom(SIZES["10mb"]))
+    def stream_encrypt(data):
+        for _ in streaming.encrypt_chunks(io.BytesIO(data), key, header, stream_engine.parallelism):
+            pass
+
+
+_stream_case("sequential", 1)
+_stream_case("parallel", 0)
+
+
+# ---------------------------------------------------------------------------
+# Emoji codec (payload built with a fast KDF so setup stays cheap)
+# ---------------------------------------------------------------------------
+
+def _emoji_payload(size: int):
+    return EncryptionEngine(kdf_algorithm="pbkdf2").encrypt_bytes(os.urandom(size), PASSWORD)
+
+
+for _name, _size in (("1kb", SIZES["1kb"]), ("1mb", SIZES["1mb"])):
+    _iterations = 50 if _size <= SIZES["1kb"] else 3
+
+    benchmark(f"emoji.encode.{_name}", iterations=_iterations, tags=["emoji"],
+              setup=lambda size=_size: _emoji_payload(size))(emoji.encode)
+    benchmark(f"emoji.decode.{_name}", iterations=_iterations, tags=["emoji"],
+              setup=lambda size=_size: emoji.encode(_emoji_payload(size)))(emoji.decode)
+
+
+# ---------------------------------------------------------------------------
+# QR rendering
+# ---------------------------------------------------------------------------
+
+@benchmark("qr.render_png", iterations=20, tags=["qr"])
+def qr_render_png(_):
+    from app.core.qr_images import render_qr_png
+    render_qr_png("https://securecom.netlify.app/qr/" + "A" * 43)
+
+
+# ---------------------------------------------------------------------------
+# End-to-end routes (in-process ASGI client against the throwaway SQLite file
+# set up in benchmarks/__init__.py)
+# ---------------------------------------------------------------------------
+
+@lru_cache(maxsize=1)
+def api_client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    client = TestClient(app)
+    client.__enter__()
+    atexit.register(client.__exit__, None, None, None)
+    return client
+
+
+@benchmark("api.ping", iterations=200, tags=["api"])
+def api_ping(_):
+    api_client().get("/api/ping")
+
+
+@benchmark("api.text_encrypt", iterations=10, tags=["api"])
+def api_text_encrypt(_):
+    response = api_client().post(
+        "/api/encryption/text/encrypt",
+        json={"plaintext": "x" * 1024, "password": PASSWORD, "use_emoji": True}
+    )
+    response.raise_for_status()
+
+
+@benchmark("api.qr_create_view", iterations=20, tags=["api"],
+           setup=lambda: _emoji_payload(256))
+def api_qr_create_view(encrypted_message):
+    client = api_client()
+    response = client.post(
+        "/api/qr/create",
+        json={"encrypted_message": encrypted_message, "expiry_hours": 1}
+    )
+    response.raise_for_status()
+    client.get(f"/api/qr/view/{response.json()['token']}").raise_for_status()
+
+
+@benchmark("api.qr_create_batch_1000", iterations=5, tags=["api"],
+           setup=lambda: _emoji_payload(256))
+def api_qr_create_batch(encrypted_message):
+    response = api_client().post(
+        "/api/qr/create-batch",
+        json={"encrypted_message": encrypted_message, "count": 1000, "expiry_hours": 1}
+    )
+    response.raise_for_status()
@@ -0,0 +1,145 @@
+"""
+Benchmark harness: timing, memory measurement, registry and baseline comparison
+"""
+
+import json
+import math
+import platform
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+# Registry of benchmark cases, filled by @benchmark in cases.py
+CASES: Dict[str, "BenchmarkCase"] = {}
+
+
+@dataclass
+class BenchmarkCase:
+    """A named operation to measure"""
+    name: str
+    func: Callable[[Any], Any]
+    setup: Optional[Callable[[], Any]] = None
+    iterations: int = 20
+    warmup: int = 2
+    tags: List[str] = field(default_factory=list)
+
+
+def benchmark(name: str, iterations: int = 20, warmup: int = 2,
+              setup: Optional[Callable[[], Any]] = None, tags: Optional[List[str]] = None):
+    """
+    Register a benchmark case
+
+    The decorated function receives whatever setup() returns (or None), and
+    only the function call itself is timed.
+    """
+    def decorator(func: Callable[[Any], Any]) -> Callable[[Any], Any]:
+        CASES[name] = BenchmarkCase(name, func, setup, iterations, warmup, tags or [])
+        return func
+    return decorator
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of samples"""
+    ordered = sorted(samples)
+    rank = math.ceil(pct / 100 * len(ordered))
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+
+def run_case(case: BenchmarkCase, scale: float = 1.0) -> Dict[str, Any]:
+    """
+    Measure one case
+
+    Timing runs without tracemalloc (which slows allocation-heavy code); a
+    separate single call measures peak traced Python memory. Memory allocated
+    inside C extensions (e.g. Argon2's work area) is not traced.
+
+    Args:
+        case: Case to run
+        scale: Multiplier for the iteration count (e.g. 0.2 for quick runs)
+    """
+    state = case.setup() if case.setup else None
+    iterations = max(3, int(case.iterations * scale))
+
+    for _ in range(case.warmup):
+        case.func(state)
+
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        case.func(state)
+        samples.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        case.func(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    total = sum(samples)
+    return {
+        "name": case.name,
+        "iterations": iterations,
+        "ops_per_sec": iterations / total if total else float("inf"),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "peak_memory_bytes": peak
+    }
+
+
+def environment() -> Dict[str, Any]:
+    """Host description stored alongside results"""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "processor": platform.processor(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    }
+
+
+def write_results(path: str, results: List[Dict[str, Any]]) -> None:
+    """Write results plus environment info as JSON"""
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+
+def load_results(path: str) -> Dict[str, Dict[str, Any]]:
+    """Load a results file as {case name: result}"""
+    with open(path) as f:
+        data = json.load(f)
+    return {result["name"]: result for result in data["results"]}
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            threshold: float = 0.2) -> List[Dict[str, Any]]:
+    """
+    Compare results against a baseline
+
+    A case regresses when its p50 latency or peak memory grows by more than
+    threshold (fraction) over the baseline.
+
+    Returns:
+        One entry per case present in both, with ratios and a regression flag
+    """
+    report = []
+    for result in results:
+        base = baseline.get(result["name"])
+        if not base:
+            continue
+        latency_ratio = result["p50_ms"] / base["p50_ms"] if base["p50_ms"] else 1.0
+        memory_ratio = (
+            result["peak_memory_bytes"] / base["peak_memory_bytes"]
+            if base["peak_memory_bytes"] else 1.0
+        )
+        report.append({
+            "name": result["name"],
+            "p50_ratio": latency_ratio,
+            "memory_ratio": memory_ratio,
+            "regression": latency_ratio > 1 + threshold or memory_ratio > 1 + threshold
+        })
+    return report
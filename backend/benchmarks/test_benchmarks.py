@@ -0,0 +1,49 @@
+"""
+Benchmark suite under pytest
+
+Skipped unless SECURECOM_BENCH=1, so the regular test run stays fast:
+    SECURECOM_BENCH=1 pytest benchmarks -q
+Results are written to benchmarks/results.json and each case fails if it
+regresses more than SECURECOM_BENCH_THRESHOLD (default 0.2) vs baseline.json.
+"""
+
+import os
+
+import pytest
+
+from benchmarks import cases  # noqa: F401 - registers cases
+from benchmarks.harness import CASES, compare, load_results, run_case, write_results
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(HERE, "baseline.json")
+
+pytestmark = pytest.mark.skipif(
+    os.environ.get("SECURECOM_BENCH") != "1",
+    reason="set SECURECOM_BENCH=1 to run benchmarks"
+)
+
+
+@pytest.fixture(scope="module")
+def collected():
+    results = []
+    yield results
+    if results:
+        write_results(os.path.join(HERE, "results.json"), results)
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    return load_results(BASELINE) if os.path.exists(BASELINE) else {}
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_benchmark(name, collected, baseline):
+    """Run one case and check it against the stored baseline"""
+    result = run_case(CASES[name])
+    collected.append(result)
+
+    threshold = float(os.environ.get("SECURECOM_BENCH_THRESHOLD", "0.2"))
+    for entry in compare([result], baseline, threshold):
+        assert not entry["regression"], (
+            f"{name} regressed: p50 x{entry['p50_ratio']:.2f}, memory x{entry['memory_ratio']:.2f}"
+        )
@@ -0,0 +1,114 @@
+"""
+Tests for KDF admission control
+"""
+
+import asyncio
+
+import pytest
+from app.core.admission import AdmissionRejected, KDFCostExceeded, MemoryAdmissionController
+
+
+class TestMemoryAdmissionController:
+    """Test memory-budgeted KDF admission"""
+
+    def test_admits_within_budget(self):
+        """Test requests that fit the budget run concurrently"""
+        controller = MemoryAdmissionController(budget_kib=200, max_queue=4, max_wait=1)
+
+        async def scenario():
+            async with controller.admit(100):
+                async with controller.admit(100):
+                    assert controller.in_flight_kib == 200
+            assert controller.in_flight_kib == 0
+
+        asyncio.run(scenario())
+        assert controller.stats()["admitted"] == 2
+
+    def test_queues_until_budget_released(self):
+        """Test a request over budget waits for a release"""
+        controller = MemoryAdmissionController(budget_kib=100, max_queue=4, max_wait=1)
+        order = []
+
+        async def job(name, hold):
+            async with controller.admit(100):
+                order.append(name)
+                await asyncio.sleep(hold)
+
+        async def scenario():
+            first = asyncio.create_task(job("first", 0.05))
+            await asyncio.sleep(0)
+            second = asyncio.create_task(job("second", 0))
+            await asyncio.sleep(0)
+            assert controller.queue_depth == 1
+            await asyncio.gather(first, second)
+
+        asyncio.run(scenario())
+        assert order == ["first", "second"]
+        assert controller.stats()["max_queue_depth"] == 1
+
+    def test_rejects_when_queue_full(self):
+        """Test requests beyond the queue limit are rejected with retry_after"""
+        controller = MemoryAdmissionController(budget_kib=100, max_queue=0, max_wait=1)
+
+        async def scenario():
+            async with controller.admit(100):
+                with pytest.raises(AdmissionRejected) as exc_info:
+                    async with controller.admit(100):
+                        pass
+                assert exc_info.value.retry_after >= 1
+
+        asyncio.run(scenario())
+        assert controller.stats()["rejected"] == 1
+
+    def test_rejects_cost_over_budget(self):
+        """Test a single request larger than the whole budget is refused, not under-booked"""
+        controller = MemoryAdmissionController(budget_kib=100, max_queue=4, max_wait=1)
+
+        async def scenario():
+            with pytest.raises(KDFCostExceeded):
+                async with controller.admit(101):
+                    pass
+
+        asyncio.run(scenario())
+        assert controller.in_flight_kib == 0
+        assert controller.stats()["rejected"] == 1
+
+    def test_rejects_after_wait_timeout(self):
+        """Test queued requests give up after max_wait"""
+        controller = MemoryAdmissionController(budget_kib=100, max_queue=4, max_wait=0.01)
+
+        async def scenario():
+            async with controller.admit(100):
+                with pytest.raises(AdmissionRejected):
+                    async with controller.admit(100):
+                        pass
+                assert controller.queue_depth == 0
+
+        asyncio.run(scenario())
+        assert controller.stats()["timed_out"] == 1
+
+    def test_timed_out_kdf_keeps_budget(self):
+        """Test a KDF abandoned on timeout holds its budget until the job finishes"""
+        import time
+        from app.core.executor import CryptoExecutor, CryptoTimeoutError
+
+        controller = MemoryAdmissionController(budget_kib=100, max_queue=4, max_wait=1)
+        executor = CryptoExecutor(max_workers=2, timeout=0.05)
+        jobs = []
+
+        async def scenario():
+            with pytest.raises(CryptoTimeoutError):
+                async with controller.admit(100) as reservation:
+                    def on_submit(job):
+                        jobs.append(job)
+                        reservation.release_when(job)
+                    await executor.run_tracked(on_submit, time.sleep, 0.3)
+            assert controller.in_flight_kib == 100
+            await jobs[0]
+            await asyncio.sleep(0)
+            assert controller.in_flight_kib == 0
+
+        try:
+            asyncio.run(scenario())
+        finally:
+            executor.shutdown()
@@ -2,6 +2,8 @@
 Tests for API endpoints
 """
 
+import base64
+
 import pytest
 
 
@@ -22,6 +24,14 @@ class TestHealthEndpoint:
         assert response.status_code == 200
         assert response.json()["message"] == "pong"
 
+    def test_metrics(self, client):
+        """Test metrics endpoint exposes KDF admission stats"""
+        response = client.get("/api/metrics")
+        assert response.status_code == 200
+        data = response.json()
+        assert "queue_depth" in data["kdf_admission"]
+        assert "avg_wait_seconds" in data["kdf_admission"]
+
 
 class TestEncryptionEndpoints:
     """Test encryption API endpoints"""
@@ -106,6 +116,39 @@ class TestEncryptionEndpoints:
         )
         assert decrypt_response.status_code == 400
 
+    def test_decrypt_rejects_hostile_kdf_params(self, client):
+        """Test KDF costs far above the server's settings get 400 without deriving"""
+        encrypted_data = client.post(
+            "/api/encryption/text/encrypt",
+            json={"plaintext": "Secret", "password": "pw", "use_emoji": False}
+        ).json()["encrypted_data"]
+        encrypted_data["kdf_params"] = {"time_cost": 64, "memory_cost": 1024 * 1024, "parallelism": 255}
+
+        response = client.post("/api/encryption/text/decrypt", json={"password": "pw", **encrypted_data})
+        assert response.status_code == 400
+        assert "out of accepted range" in response.json()["detail"]
+
+    def test_encrypt_batch(self, client):
+        """Test batch encryption returns individually decryptable items"""
+        response = client.post(
+            "/api/encryption/text/encrypt-batch",
+            json={
+                "plaintexts": ["one", "two"],
+                "password": "BatchPassword",
+                "use_emoji": True
+            }
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == 2
+        assert data["items"][1]["emoji"]
+
+        decrypt_response = client.post(
+            "/api/encryption/text/decrypt",
+            json={"password": "BatchPassword", **data["items"][1]["encrypted_data"]}
+        )
+        assert decrypt_response.json()["plaintext"] == "two"
+
 
 class TestQRTokenEndpoints:
     """Test QR token endpoints"""
@@ -165,7 +208,393 @@ class TestQRTokenEndpoints:
         second_view = client.get(f"/api/qr/view/{token}")
         assert second_view.status_code == 403
 
+    def test_message_stored_packed(self, client, db_session):
+        """Test engine payloads are stored as packed envelopes and returned unchanged"""
+        from app.core.encryption import EncryptionEngine
+        from app.db.models import QRToken
+        encrypted_message = EncryptionEngine(kdf_algorithm="pbkdf2").encrypt("hello", "pw")
+
+        token = client.post(
+            "/api/qr/create",
+            json={"encrypted_message": encrypted_message, "expiry_hours": 1}
+        ).json()["token"]
+
+        stored = db_session.query(QRToken).filter(QRToken.token == token).one().payload
+        assert isinstance(stored, bytes) and not stored.startswith(b"{")
+        assert client.get(f"/api/qr/view/{token}").json()["encrypted_message"] == encrypted_message
+
+    def test_status_served_from_cache(self, client, db_session):
+        """Test status polling skips the database until the token is viewed"""
+        from app.db.models import QRToken
+        token = client.post(
+            "/api/qr/create",
+            json={"encrypted_message": {"ciphertext": "x"}, "include_image": False}
+        ).json()["token"]
+
+        first = client.get(f"/api/qr/status/{token}").json()
+        # Change the row behind the cache's back: polling still sees the cached entry
+        db_session.query(QRToken).filter(QRToken.token == token).update({"payload": b"{}"})
+        db_session.commit()
+        assert client.get(f"/api/qr/status/{token}").json() == first
+
+        # Viewing invalidates the cached status at once
+        client.get(f"/api/qr/view/{token}")
+        assert client.get(f"/api/qr/status/{token}").status_code == 403
+
+    def test_status_miss_interleaved_with_view(self, client, db_session, monkeypatch):
+        """Test a status poll that read the row before a view does not cache it as valid"""
+        from app.api.routes import qr_token
+        from app.db.models import QRToken
+        token = client.post(
+            "/api/qr/create",
+            json={"encrypted_message": {"ciphertext": "x"}, "include_image": False}
+        ).json()["token"]
+        cache = qr_token.status_cache
+        fill = cache.set
+
+        async def view_then_fill(key, entry):
+            # The view lands between the poll's database read and its cache fill
+            db_session.query(QRToken).filter(QRToken.token == key).update({"viewed": True})
+            db_session.commit()
+            await cache.invalidate(key)
+            await fill(key, entry)
+
+        monkeypatch.setattr(cache, "set", view_then_fill)
+        assert client.get(f"/api/qr/status/{token}").status_code == 200
+        monkeypatch.undo()
+        assert client.get(f"/api/qr/status/{token}").status_code == 403
+
+    def test_failed_view_leaves_no_tombstone(self, client):
+        """Test probing unknown tokens does not grow the status cache"""
+        from app.api.routes import qr_token
+        before = qr_token.status_cache.stats().get("tombstones")
+        for i in range(3):
+            assert client.get(f"/api/qr/view/{'B' * 40}{i}").status_code == 404
+        assert qr_token.status_cache.stats().get("tombstones") == before
+
+    def test_create_batch(self, client):
+        """Test bulk creation streams one NDJSON line per usable token"""
+        import json
+        messages = [{"ciphertext": str(i)} for i in range(3)]
+        response = client.post("/api/qr/create-batch", json={"encrypted_messages": messages})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        items = [json.loads(line) for line in response.text.splitlines()]
+        assert len(items) == 3
+        assert "qr_image" not in items[0]
+        assert items[0]["image_url"].endswith(f"/api/qr/image/{items[0]['token']}")
+        for item, message in zip(items, messages):
+            view = client.get(f"/api/qr/view/{item['token']}").json()
+            assert view["encrypted_message"] == message
+
+    def test_create_batch_unencodable_message(self, client, monkeypatch):
+        """Test a message that cannot be stored gets an error line, the rest still get tokens"""
+        import json
+        from app.db.models import QRToken
+        encode = QRToken.encode_message
+
+        def encode_or_fail(message):
+            if message.get("ciphertext") == "bad":
+                raise ValueError("unsupported message")
+            return encode(message)
+
+        monkeypatch.setattr(QRToken, "encode_message", staticmethod(encode_or_fail))
+        messages = [{"ciphertext": "a"}, {"ciphertext": "bad"}, {"ciphertext": "c"}]
+        response = client.post("/api/qr/create-batch", json={"encrypted_messages": messages})
+        assert response.status_code == 200
+        items = [json.loads(line) for line in response.text.splitlines()]
+        assert [item["index"] for item in items] == [0, 1, 2]
+        assert "token" not in items[1] and "unsupported message" in items[1]["error"]
+        assert client.get(f"/api/qr/view/{items[2]['token']}").json()["encrypted_message"] == messages[2]
+
+    def test_create_batch_shared_message(self, client):
+        """Test count tokens for one message, with inline images"""
+        import json
+        response = client.post(
+            "/api/qr/create-batch",
+            json={"encrypted_message": {"ciphertext": "x"}, "count": 2, "include_image": True}
+        )
+        items = [json.loads(line) for line in response.text.splitlines()]
+        assert len({item["token"] for item in items}) == 2
+        assert all(item["qr_image"] for item in items)
+
+    def test_create_batch_rejects_bad_requests(self, client):
+        """Test missing, mixed, empty and oversized batches"""
+        from app.core.config import settings
+        message = {"ciphertext": "x"}
+        for body in (
+            {},
+            {"encrypted_message": message},
+            {"encrypted_messages": [message], "count": 1},
+        ):
+            assert client.post("/api/qr/create-batch", json=body).status_code == 400
+        # Size bounds are enforced by validation, before any payload is built
+        for body in (
+            {"encrypted_messages": []},
+            {"encrypted_messages": [message] * (settings.QR_BATCH_MAX_SIZE + 1)},
+            {"encrypted_message": message, "count": settings.QR_BATCH_MAX_SIZE + 1},
+            {"encrypted_message": message, "count": 10 ** 12},
+        ):
+            assert client.post("/api/qr/create-batch", json=body).status_code == 422
+
     def test_view_nonexistent_token(self, client):
         """Test viewing non-existent token"""
         response = client.get("/api/qr/view/nonexistent_token_12345")
         assert response.status_code == 404
+
+    def test_create_without_image(self, client):
+        """Test include_image=false skips the inline PNG but still links the image"""
+        response = client.post(
+            "/api/qr/create",
+            json={"encrypted_message": {"ciphertext": "x"}, "include_image": False}
+        )
+        data = response.json()
+        assert data["qr_image"] is None
+        assert data["image_url"].endswith(f"/api/qr/image/{data['token']}")
+
+    def test_image_endpoint(self, client):
+        """Test on-demand PNG/SVG rendering with ETag revalidation"""
+        token = client.post(
+            "/api/qr/create",
+            json={"encrypted_message": {"ciphertext": "x"}, "include_image": False}
+        ).json()["token"]
+
+        png = client.get(f"/api/qr/image/{token}")
+        assert png.status_code == 200
+        assert png.headers["content-type"] == "image/png"
+        assert png.content.startswith(b"\x89PNG")
+        assert "max-age" in png.headers["cache-control"]
+
+        svg = client.get(f"/api/qr/image/{token}", params={"format": "svg", "size": 4, "ec": "h"})
+        assert svg.headers["content-type"].startswith("image/svg+xml")
+        assert svg.headers["etag"] != png.headers["etag"]
+
+        cached = client.get(f"/api/qr/image/{token}", headers={"If-None-Match": png.headers["etag"]})
+        assert cached.status_code == 304
+        listed = f'"other", W/{png.headers["etag"]}'
+        assert client.get(f"/api/qr/image/{token}", headers={"If-None-Match": listed}).status_code == 304
+        # A tag that merely contains the current one is not a match
+        padded = '"x' + png.headers["etag"].strip('"') + 'x"'
+        assert client.get(f"/api/qr/image/{token}", headers={"If-None-Match": padded}).status_code == 200
+
+        # Rendering never consumes the token
+        assert client.get(f"/api/qr/view/{token}").status_code == 200
+
+    def test_image_rejects_bad_options(self, client):
+        """Test invalid formats, levels and tokens"""
+        token = client.post(
+            "/api/qr/create",
+            json={"encrypted_message": {"ciphertext": "x"}, "include_image": False}
+        ).json()["token"]
+        assert client.get(f"/api/qr/image/{token}", params={"format": "gif"}).status_code == 400
+        assert client.get(f"/api/qr/image/{token}", params={"ec": "X"}).status_code == 400
+        assert client.get(f"/api/qr/image/{token}", params={"size": 0}).status_code == 422
+        assert client.get("/api/qr/image/bad!token").status_code == 404
+
+    def test_image_unknown_token_not_rendered(self, client):
+        """Test well-formed but unknown tokens get 404 and never reach the image cache"""
+        from app.core.qr_images import qr_image_cache
+        misses = qr_image_cache.stats()["misses"]
+        response = client.get(f"/api/qr/image/{'A' * 43}", params={"size": 40, "ec": "H"})
+        assert response.status_code == 404
+        assert qr_image_cache.stats()["misses"] == misses
+
+
+class TestBinaryFileEndpoints:
+    """Test raw binary file encryption endpoints"""
+
+    def test_encrypt_decrypt_binary(self, client):
+        """Test binary upload/download round-trip preserves name and content"""
+        content = b"line one\nline two\n" * 5000
+        encrypt_response = client.post(
+            "/api/encryption/file/encrypt/binary",
+            files={"file": ("notes.txt", content, "text/plain")},
+            data={"password": "FilePassword1"}
+        )
+        assert encrypt_response.status_code == 200
+        assert encrypt_response.headers["content-type"] == "application/octet-stream"
+        assert int(encrypt_response.headers["content-length"]) == len(encrypt_response.content)
+        assert content not in encrypt_response.content
+
+        decrypt_response = client.post(
+            "/api/encryption/file/decrypt/binary",
+            files={"file": ("notes.txt.enc", encrypt_response.content, "application/octet-stream")},
+            data={"password": "FilePassword1"}
+        )
+        assert decrypt_response.status_code == 200
+        assert decrypt_response.content == content
+        assert decrypt_response.headers["content-type"].startswith("text/plain")
+        assert "notes.txt" in decrypt_response.headers["content-disposition"]
+
+    def test_decrypt_binary_wrong_password(self, client):
+        """Test wrong password is rejected before streaming starts"""
+        encrypt_response = client.post(
+            "/api/encryption/file/encrypt/binary",
+            files={"file": ("a.txt", b"secret", "text/plain")},
+            data={"password": "Right"}
+        )
+        decrypt_response = client.post(
+            "/api/encryption/file/decrypt/binary",
+            files={"file": ("a.txt.enc", encrypt_response.content, "application/octet-stream")},
+            data={"password": "Wrong"}
+        )
+        assert decrypt_response.status_code == 400
+
+    def test_encrypt_binary_rejects_extension(self, client):
+        """Test disallowed file types are rejected"""
+        response = client.post(
+            "/api/encryption/file/encrypt/binary",
+            files={"file": ("run.exe", b"MZ", "application/octet-stream")},
+            data={"password": "pw"}
+        )
+        assert response.status_code == 400
+
+
+class TestEmojiFileEndpoints:
+    """Test streamed emoji file encryption endpoints"""
+
+    def test_encrypt_decrypt_emoji(self, client):
+        """Test emoji upload/download round-trip with an exact Content-Length"""
+        content = b"line one\nline two\n" * 5000
+        encrypt_response = client.post(
+            "/api/encryption/file/encrypt/emoji",
+            files={"file": ("notes.txt", content, "text/plain")},
+            data={"password": "FilePassword1"}
+        )
+        assert encrypt_response.status_code == 200
+        assert int(encrypt_response.headers["content-length"]) == len(encrypt_response.content)
+        assert encrypt_response.text.startswith("🧬")
+
+        decrypt_response = client.post(
+            "/api/encryption/file/decrypt/emoji",
+            files={"file": ("notes.txt.emoji.txt", encrypt_response.content, "text/plain")},
+            data={"password": "FilePassword1"}
+        )
+        assert decrypt_response.status_code == 200
+        assert decrypt_response.content == content
+        assert "notes.txt" in decrypt_response.headers["content-disposition"]
+
+    def test_decrypt_emoji_rejects_other_text(self, client):
+        """Test a file that is not dense emoji is a 400"""
+        response = client.post(
+            "/api/encryption/file/decrypt/emoji",
+            files={"file": ("a.txt", "hello".encode(), "text/plain")},
+            data={"password": "pw"}
+        )
+        assert response.status_code == 400
+
+
+class TestEnvelopeFileEndpoints:
+    """Test envelope-mode file encryption and password rewrap"""
+
+    def test_encrypt_rewrap_decrypt(self, client):
+        """Test a rewrapped file keeps its ciphertext and opens with the new password"""
+        encrypt_response = client.post(
+            "/api/encryption/file/encrypt",
+            files={"file": ("report.txt", b"quarterly numbers", "text/plain")},
+            data={"password": "OldPassword1", "envelope": "true"}
+        )
+        assert encrypt_response.status_code == 200
+        encrypted_data = encrypt_response.json()["encrypted_data"]
+        assert encrypted_data["mode"] == "envelope"
+
+        rewrap_response = client.post(
+            "/api/encryption/file/rewrap",
+            json={
+                "password": "OldPassword1",
+                "new_password": "NewPassword2",
+                "encrypted_data": encrypted_data
+            }
+        )
+        assert rewrap_response.status_code == 200
+        rewrapped = rewrap_response.json()["encrypted_data"]
+        assert rewrapped["ciphertext"] == encrypted_data["ciphertext"]
+        assert rewrapped["filename"] == "report.txt"
+
+        decrypt_response = client.post(
+            "/api/encryption/file/decrypt",
+            json={"password": "NewPassword2", "encrypted_data": rewrapped}
+        )
+        assert decrypt_response.status_code == 200
+        assert base64.b64decode(decrypt_response.json()["file_data"]) == b"quarterly numbers"
+
+    def test_rewrap_wrong_password(self, client):
+        """Test rewrap with the wrong current password is a 400"""
+        encrypted_data = client.post(
+            "/api/encryption/file/encrypt",
+            files={"file": ("a.txt", b"x", "text/plain")},
+            data={"password": "Right", "envelope": "true"}
+        ).json()["encrypted_data"]
+        response = client.post(
+            "/api/encryption/file/rewrap",
+            json={"password": "Wrong", "new_password": "New", "encrypted_data": encrypted_data}
+        )
+        assert response.status_code == 400
+
+    def test_multi_recipient_file(self, client):
+        """Test one upload produces a file every listed password can open"""
+        encrypted_data = client.post(
+            "/api/encryption/file/encrypt",
+            files={"file": ("plan.txt", b"launch plan", "text/plain")},
+            data={"password": "TeamA", "additional_passwords": ["TeamB", "TeamC"]}
+        ).json()["encrypted_data"]
+        assert len(encrypted_data["key_slots"]) == 3
+
+        for password in ("TeamA", "TeamC"):
+            response = client.post(
+                "/api/encryption/file/decrypt",
+                json={"password": password, "encrypted_data": encrypted_data}
+            )
+            assert base64.b64decode(response.json()["file_data"]) == b"launch plan"
+
+    def test_multi_recipient_text(self, client):
+        """Test text encrypted for several passwords decrypts via /text/decrypt"""
+        encrypted_data = client.post(
+            "/api/encryption/text/encrypt",
+            json={"plaintext": "standup at 10", "password": "one", "additional_passwords": ["two"]}
+        ).json()["encrypted_data"]
+
+        response = client.post(
+            "/api/encryption/text/decrypt",
+            json={"password": "two", **encrypted_data}
+        )
+        assert response.status_code == 200
+        assert response.json()["plaintext"] == "standup at 10"
+
+    def test_multi_recipient_emoji(self, client):
+        """Test multi-recipient text survives the dense emoji format"""
+        emoji = client.post(
+            "/api/encryption/text/encrypt",
+            json={
+                "plaintext": "standup at 10", "password": "one",
+                "additional_passwords": ["two"], "use_emoji": True
+            }
+        ).json()["emoji"]
+
+        response = client.post(
+            "/api/encryption/text/decrypt",
+            json={"password": "two", "emoji": emoji}
+        )
+        assert response.status_code == 200
+        assert response.json()["plaintext"] == "standup at 10"
+
+
+class TestCompressionFlag:
+    """Test per-request compression opt-in"""
+
+    def test_compress_text_roundtrip(self, client):
+        """Test compress=true shrinks the payload and decrypts through emoji"""
+        plaintext = "status: all systems nominal\n" * 100
+        response = client.post(
+            "/api/encryption/text/encrypt",
+            json={"plaintext": plaintext, "password": "pw", "use_emoji": True, "compress": True}
+        )
+        assert response.status_code == 200
+        body = response.json()
+        assert body["encrypted_data"]["compression"] == "lzma"
+
+        decrypt_response = client.post(
+            "/api/encryption/text/decrypt",
+            json={"password": "pw", "emoji": body["emoji"]}
+        )
+        assert decrypt_response.json()["plaintext"] == plaintext
@@ -0,0 +1,129 @@
+"""
+Tests for pluggable AEAD cipher backends
+"""
+
+import base64
+import io
+import os
+
+import pytest
+
+from app.core import ciphers
+from app.core.ciphers import BACKENDS, AuthenticationError, get_cipher, select_fastest
+from app.core.emoji_encoder import EmojiEncoder
+from app.core.encryption import EncryptionEngine
+from app.core.streaming import CIPHER_IDS
+
+
+ALL_BACKENDS = [backend for impls in BACKENDS.values() for backend in impls]
+
+
+class TestBackends:
+    """Test individual cipher implementations"""
+
+    @pytest.mark.parametrize("backend", ALL_BACKENDS, ids=repr)
+    def test_round_trip(self, backend):
+        """Test encrypt/decrypt with associated data"""
+        key, nonce = os.urandom(32), os.urandom(backend.nonce_size)
+        ciphertext, tag = backend.encrypt(key, nonce, b"payload", b"aad")
+        assert backend.decrypt(key, nonce, ciphertext, tag, b"aad") == b"payload"
+
+    @pytest.mark.parametrize("backend", ALL_BACKENDS, ids=repr)
+    def test_detects_tampering(self, backend):
+        """Test modified associated data or ciphertext fails authentication"""
+        key, nonce = os.urandom(32), os.urandom(backend.nonce_size)
+        ciphertext, tag = backend.encrypt(key, nonce, b"payload", b"aad")
+        with pytest.raises(AuthenticationError):
+            backend.decrypt(key, nonce, ciphertext, tag, b"other")
+        with pytest.raises(AuthenticationError):
+            backend.decrypt(key, nonce, bytes([ciphertext[0] ^ 1]) + ciphertext[1:], tag, b"aad")
+
+    @pytest.mark.skipif(ciphers.AESGCM is None, reason="cryptography not installed")
+    @pytest.mark.parametrize("cipher_id", ["aes-256-gcm", "chacha20-poly1305"])
+    def test_implementations_interoperate(self, cipher_id):
+        """Test the fast and reference implementations produce identical output"""
+        fast, reference = BACKENDS[cipher_id]
+        key, nonce = os.urandom(32), os.urandom(12)
+        ciphertext, tag = fast.encrypt(key, nonce, b"interop", b"aad")
+        assert reference.encrypt(key, nonce, b"interop", b"aad") == (ciphertext, tag)
+        assert reference.decrypt(key, nonce, ciphertext, tag, b"aad") == b"interop"
+
+
+class TestSelection:
+    """Test cipher lookup and benchmarking"""
+
+    def test_unknown_cipher_rejected(self):
+        """Test unknown cipher ids raise ValueError"""
+        with pytest.raises(ValueError):
+            get_cipher("rot13")
+
+    def test_select_fastest_covers_every_cipher(self):
+        """Test the startup benchmark ranks every cipher"""
+        throughput = select_fastest(sample_size=4096, rounds=1)
+        assert set(throughput) == set(BACKENDS)
+        assert all(get_cipher(cipher_id).cipher_id == cipher_id for cipher_id in throughput)
+
+
+class TestEngineCiphers:
+    """Test the encryption engine with each cipher"""
+
+    @pytest.mark.parametrize("cipher_id", sorted(BACKENDS))
+    def test_round_trip(self, cipher_id):
+        """Test text and emoji round trips record and honour the cipher id"""
+        engine = EncryptionEngine(kdf_algorithm="pbkdf2", cipher=cipher_id)
+        encrypted = engine.encrypt("hello", "pw")
+        assert encrypted["cipher"] == cipher_id
+        assert len(base64.b64decode(encrypted["nonce"])) == get_cipher(cipher_id).nonce_size
+        assert engine.decrypt(encrypted, "pw") == "hello"
+
+        for version in (1, 2):
+            emoji = EmojiEncoder.decode(EmojiEncoder.encode(encrypted, version=version))
+            assert emoji["cipher"] == cipher_id
+            assert engine.decrypt(emoji, "pw") == "hello"
+
+    def test_decrypts_other_cipher_payloads(self):
+        """Test decryption follows the payload's cipher, not the engine's"""
+        encrypted = EncryptionEngine(kdf_algorithm="pbkdf2", cipher="xchacha20-poly1305").encrypt("x", "pw")
+        assert EncryptionEngine(kdf_algorithm="pbkdf2", cipher="aes-256-gcm").decrypt(encrypted, "pw") == "x"
+
+    def test_legacy_payload_without_cipher_id(self):
+        """Test payloads from before cipher ids (AES-GCM, 16-byte nonce) decrypt"""
+        engine = EncryptionEngine(kdf_algorithm="pbkdf2")
+        salt, nonce = os.urandom(16), os.urandom(16)
+        key = engine.derive_key("pw", salt, "pbkdf2")
+        ciphertext, tag = ciphers.PyCryptodomeAESGCM().encrypt(key, nonce, b"legacy")
+        payload = {
+            "ciphertext": base64.b64encode(ciphertext).decode(),
+            "salt": base64.b64encode(salt).decode(),
+            "nonce": base64.b64encode(nonce).decode(),
+            "tag": base64.b64encode(tag).decode(),
+            "kdf": "pbkdf2"
+        }
+        assert engine.decrypt(payload, "pw") == "legacy"
+
+    def test_recorded_ids_require_associated_data(self):
+        """Test a payload naming a cipher is never opened without authenticating the id"""
+        engine = EncryptionEngine(kdf_algorithm="pbkdf2")
+        salt, nonce = os.urandom(16), os.urandom(16)
+        key = engine.derive_key("pw", salt, "pbkdf2")
+        ciphertext, tag = ciphers.PyCryptodomeAESGCM().encrypt(key, nonce, b"no aad")
+        payload = {
+            "ciphertext": base64.b64encode(ciphertext).decode(),
+            "salt": base64.b64encode(salt).decode(),
+            "nonce": base64.b64encode(nonce).decode(),
+            "tag": base64.b64encode(tag).decode(),
+            "kdf": "pbkdf2",
+            "cipher": "aes-256-gcm"
+        }
+        with pytest.raises(ValueError):
+            engine.decrypt(payload, "pw")
+
+    @pytest.mark.parametrize("cipher_id", sorted(BACKENDS))
+    def test_stream_round_trip(self, cipher_id):
+        """Test streamed files round trip with each cipher"""
+        engine = EncryptionEngine(kdf_algorithm="pbkdf2", cipher=cipher_id)
+        data = os.urandom(5000)
+        encrypted = b"".join(engine.iter_encrypt_stream(io.BytesIO(data), "pw", chunk_size=1024))
+        header, chunks = engine.open_stream(io.BytesIO(encrypted), "pw")
+        assert header.cipher in CIPHER_IDS
+        assert b"".join(chunks) == data
@@ -0,0 +1,114 @@
+"""
+Tests for the optional pre-encryption compression stage
+"""
+
+import os
+import zlib
+
+import pytest
+
+from app.core import compression
+from app.core.config import settings
+from app.core.emoji_encoder import EmojiEncoder
+from app.core.encryption import EncryptionEngine
+
+TEXT = ("The quick brown fox jumps over the lazy dog. " * 200).encode("utf-8")
+
+
+class TestCodecSelection:
+    """Test size- and content-aware codec choice"""
+
+    def test_off_by_default(self):
+        """Test nothing is compressed unless enabled"""
+        assert settings.COMPRESSION == "off"
+        assert compression.compress(TEXT) == (TEXT, None)
+
+    def test_auto_picks_by_size(self):
+        """Test auto uses lzma for small inputs and zlib for large ones"""
+        assert compression.choose_codec(TEXT, "auto") == "lzma"
+        assert compression.choose_codec(TEXT * 20, "auto") == "zlib"
+
+    def test_skips_incompressible(self):
+        """Test tiny, random and already-compressed inputs are left alone"""
+        assert compression.choose_codec(b"short text", "auto") is None
+        assert compression.choose_codec(os.urandom(10000), "zlib") is None
+        assert compression.choose_codec(b"\x89PNG\r\n\x1a\n" + TEXT, "auto") is None
+        assert compression.choose_codec(b"\xff\xd8\xff\xe0" + TEXT, "lzma") is None
+
+    def test_unknown_policy(self):
+        """Test invalid policies are rejected"""
+        with pytest.raises(ValueError):
+            compression.choose_codec(TEXT, "brotli")
+
+    @pytest.mark.parametrize("codec", compression.CODECS)
+    def test_roundtrip(self, codec):
+        """Test each codec round-trips and shrinks text"""
+        packed, used = compression.compress(TEXT, codec)
+        assert used == codec and len(packed) < len(TEXT)
+        assert compression.decompress(packed, codec) == TEXT
+
+    def test_decompression_bomb_rejected(self):
+        """Test output beyond the limit is refused"""
+        bomb = zlib.compress(b"\x00" * 1_000_000)
+        with pytest.raises(ValueError, match="exceeds"):
+            compression.decompress(bomb, "zlib", max_size=1000)
+
+    def test_corrupt_and_truncated(self):
+        """Test damaged compressed data raises ValueError"""
+        packed, _ = compression.compress(TEXT, "zlib")
+        with pytest.raises(ValueError):
+            compression.decompress(packed[:len(packed) // 2], "zlib")
+        with pytest.raises(ValueError):
+            compression.decompress(b"not compressed", "lzma")
+
+
+class TestEngineCompression:
+    """Test compression inside encrypt/decrypt"""
+
+    @pytest.fixture
+    def engine(self):
+        return EncryptionEngine(kdf_algorithm="pbkdf2", compression="auto")
+
+    def test_text_roundtrip_smaller(self, engine):
+        """Test compressed payloads decrypt and are smaller on the wire"""
+        plain = TEXT.decode("utf-8")
+        encrypted = engine.encrypt(plain, "pw")
+        uncompressed = engine.encrypt(plain, "pw", compression="off")
+
+        assert encrypted["compression"] == "lzma"
+        assert "compression" not in uncompressed
+        assert len(encrypted["ciphertext"]) < len(uncompressed["ciphertext"]) // 10
+        assert engine.decrypt(encrypted, "pw") == plain
+
+    def test_emoji_carries_codec(self, engine):
+        """Test the emoji header records the codec"""
+        encrypted = engine.encrypt(TEXT.decode("utf-8"), "pw")
+        decoded = EmojiEncoder.decode(EmojiEncoder.encode(encrypted))
+        assert decoded["compression"] == "lzma"
+        assert engine.decrypt(decoded, "pw") == TEXT.decode("utf-8")
+
+    def test_envelope_and_bytes(self, engine):
+        """Test compression applies to binary and multi-recipient payloads"""
+        encrypted = engine.encrypt_bytes(TEXT * 20, ["a", "b"])
+        assert encrypted["compression"] == "zlib"
+        assert engine.decrypt_bytes(encrypted, "b") == TEXT * 20
+
+    def test_incompressible_file_stored_raw(self, engine):
+        """Test random data is not flagged as compressed"""
+        data = os.urandom(5000)
+        encrypted = engine.encrypt_bytes(data, "pw")
+        assert "compression" not in encrypted
+        assert engine.decrypt_bytes(encrypted, "pw") == data
+
+    def test_codec_id_is_authenticated(self, engine):
+        """Test stripping or swapping the codec id fails instead of returning compressed bytes"""
+        encrypted = engine.encrypt_bytes(TEXT, "pw")
+        stripped = {k: v for k, v in encrypted.items() if k != "compression"}
+        with pytest.raises(ValueError):
+            engine.decrypt_bytes(stripped, "pw")
+        with pytest.raises(ValueError):
+            engine.decrypt_bytes({**encrypted, "compression": "zlib"}, "pw")
+
+        envelope = engine.encrypt_bytes(TEXT, ["a", "b"])
+        with pytest.raises(ValueError):
+            engine.decrypt_bytes({k: v for k, v in envelope.items() if k != "compression"}, "a")
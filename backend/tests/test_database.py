@@ -0,0 +1,172 @@
+"""
+Tests for engine configuration and pool metrics
+"""
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
+
+from app.db.database import async_database_url
+from app.db.pool import configure_engine, engine_options
+
+
+class TestEngineOptions:
+    """Test settings-driven engine configuration"""
+
+    def test_pool_sizing(self):
+        """Test file and server databases get a sized, pre-pinged pool"""
+        for url in ("sqlite:///./x.db", "postgresql+asyncpg://u@h/db"):
+            options = engine_options(url)
+            assert options["pool_pre_ping"] is True
+            assert options["pool_size"] > 0
+
+    def test_in_memory_sqlite(self):
+        """Test in-memory SQLite skips pool sizing (single shared connection)"""
+        assert "pool_size" not in engine_options("sqlite://")
+        assert "pool_size" not in engine_options("sqlite:///:memory:")
+
+    def test_async_url(self):
+        """Test sync URLs map to their async drivers"""
+        assert async_database_url("sqlite:///./x.db") == "sqlite+aiosqlite:///./x.db"
+        assert async_database_url("postgresql://u@h/db") == "postgresql+asyncpg://u@h/db"
+
+
+class TestConfigureEngine:
+    """Test SQLite pragmas and pool instrumentation"""
+
+    def test_pragmas_and_metrics(self, tmp_path):
+        """Test WAL, synchronous and busy timeout are set and writes and commits are counted"""
+        url = f"sqlite:///{tmp_path}/pool.db"
+        engine = create_engine(url, **engine_options(url))
+        metrics = configure_engine(engine)
+
+        with engine.begin() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+            conn.execute(text("CREATE TABLE t (x INTEGER)"))
+            conn.execute(text("INSERT INTO t VALUES (1)"))
+
+        stats = metrics.stats()
+        assert stats["checkouts"] == 1
+        assert stats["checked_out"] == 0
+        assert stats["writes"] == 1
+        assert stats["commits"] == 1
+        assert stats["commit_max"] > 0
+        assert stats["hold_max"] > 0
+        assert stats["lock_errors"] == 0
+        engine.dispose()
+
+
+class TestPayloadMigration:
+    """Test the text -> binary payload migration"""
+
+    @staticmethod
+    def legacy_engine(path, stored_messages):
+        from datetime import datetime, timedelta
+
+        engine = create_engine(f"sqlite:///{path}")
+        expires = datetime.utcnow() + timedelta(hours=1)
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE qr_tokens (id INTEGER PRIMARY KEY, token VARCHAR(64) NOT NULL, "
+                "encrypted_message TEXT NOT NULL, created_at DATETIME NOT NULL, "
+                "viewed BOOLEAN NOT NULL, viewed_at DATETIME, expires_at DATETIME NOT NULL)"
+            ))
+            for token, stored in stored_messages:
+                conn.execute(
+                    text("INSERT INTO qr_tokens (token, encrypted_message, created_at, viewed, expires_at) "
+                         "VALUES (:token, :stored, :now, 0, :expires)"),
+                    {"token": token, "stored": stored, "now": datetime.utcnow(), "expires": expires}
+                )
+        return engine
+
+    def test_migrates_legacy_rows(self, tmp_path):
+        """Test JSON and envelope-text rows become binary payloads with the same content"""
+        from app.core import envelope
+        from app.core.encryption import EncryptionEngine
+        from app.db.migrations import migrate_payload_column
+        from app.db.models import QRToken
+
+        message = EncryptionEngine(kdf_algorithm="pbkdf2").encrypt("hello", "pw")
+        engine = self.legacy_engine(
+            tmp_path / "legacy.db",
+            (("json", '{"ciphertext": "x"}'), ("packed", envelope.dumps(message)))
+        )
+
+        assert migrate_payload_column(engine) == 2
+        assert migrate_payload_column(engine) == 0
+
+        with engine.connect() as conn:
+            rows = dict(conn.execute(text("SELECT token, payload FROM qr_tokens")).all())
+            columns = [row[1] for row in conn.execute(text("PRAGMA table_info(qr_tokens)"))]
+        assert "encrypted_message" not in columns
+        assert QRToken.decode_message(rows["json"]) == {"ciphertext": "x"}
+        assert QRToken.decode_message(rows["packed"]) == message
+        assert envelope.is_packed(rows["packed"])
+        engine.dispose()
+
+    def test_unreadable_rows_discarded(self, tmp_path):
+        """Test a corrupt legacy row is dropped instead of failing the migration"""
+        from app.db.migrations import migrate_payload_column
+
+        engine = self.legacy_engine(
+            tmp_path / "legacy.db",
+            (("before", '{"ciphertext": "x"}'), ("corrupt", "not an envelope!"), ("after", '{"ciphertext": "y"}'))
+        )
+
+        assert migrate_payload_column(engine) == 2
+        with engine.connect() as conn:
+            remaining = {row[0] for row in conn.execute(text("SELECT token FROM qr_tokens"))}
+        assert remaining == {"before", "after"}
+        engine.dispose()
+
+    def test_tolerates_concurrent_worker(self, tmp_path, monkeypatch):
+        """Test a worker that inspected the schema before another migrated it does not crash"""
+        from app.db import migrations
+
+        engine = self.legacy_engine(tmp_path / "legacy.db", (("json", '{"ciphertext": "x"}'),))
+        stale = migrations.table_columns(engine, "qr_tokens")
+        assert migrations.migrate_payload_column(engine) == 1
+
+        # The late worker still sees the text column and no payload column
+        live = migrations.table_columns
+        inspections = []
+
+        def first_inspection_stale(engine, table):
+            inspections.append(table)
+            return stale if len(inspections) == 1 else live(engine, table)
+
+        monkeypatch.setattr(migrations, "table_columns", first_inspection_stale)
+        assert migrations.migrate_payload_column(engine) == 0
+
+        migrations.alter_table(engine, "ALTER TABLE qr_tokens DROP COLUMN encrypted_message",
+                               lambda columns: "encrypted_message" not in columns)
+        with pytest.raises(DBAPIError):
+            migrations.alter_table(engine, "ALTER TABLE qr_tokens DROP COLUMN encrypted_message",
+                                   lambda columns: False)
+        engine.dispose()
+
+
+class TestEnsureIndexes:
+    """Test index creation on existing databases"""
+
+    def test_tolerates_concurrent_worker(self, tmp_path, monkeypatch):
+        """Test an index created by another worker after our inspection is not an error"""
+        from app.db import migrations
+        from app.db.database import Base
+
+        engine = create_engine(f"sqlite:///{tmp_path}/indexes.db")
+        Base.metadata.create_all(bind=engine)  # the other worker already made every index
+
+        live = migrations.index_names
+        inspections = []
+
+        def first_inspection_stale(engine, table):
+            inspections.append(table)
+            return set() if len(inspections) == 1 else live(engine, table)
+
+        monkeypatch.setattr(migrations, "index_names", first_inspection_stale)
+        migrations.ensure_indexes(engine)
+        assert len(inspections) > 1
+        engine.dispose()
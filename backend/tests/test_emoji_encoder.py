@@ -33,6 +33,21 @@ class TestEmojiEncoder:
         assert decoded["tag"] == encrypted_data["tag"]
         assert decoded["kdf"] == encrypted_data["kdf"]
 
+    def test_encode_decode_kdf_params(self):
+        """Test KDF parameters survive the emoji round-trip"""
+        encoder = EmojiEncoder()
+        encrypted_data = {
+            "ciphertext": "ABCD1234",
+            "salt": "efgh5678",
+            "nonce": "ijkl9012",
+            "tag": "mnop3456",
+            "kdf": "argon2",
+            "kdf_params": {"time_cost": 3, "memory_cost": 32768, "parallelism": 2}
+        }
+
+        decoded = encoder.decode(encoder.encode(encrypted_data))
+        assert decoded["kdf_params"] == encrypted_data["kdf_params"]
+
     def test_invalid_emoji_format(self):
         """Test decoding invalid emoji format"""
         encoder = EmojiEncoder()
@@ -59,3 +74,156 @@ class TestEmojiEncoder:
         assert "unique_emojis" in stats
         assert "emoji_count" in stats
         assert stats["length"] > 0
+
+
+class TestBulkCodec:
+    """Test the table-driven codec against the character mapping"""
+
+    PAYLOAD = {
+        "ciphertext": "QUJDREVGR0hJSktMTU5PUFFSU1RVVldYWVo0NTY3ODkrLw==",
+        "salt": "c2FsdHNhbHRzYWx0c2FsdA==",
+        "nonce": "bm9uY2Vub25jZQ==",
+        "tag": "dGFndGFndGFndGFndGFn",
+        "kdf": "pbkdf2"
+    }
+
+    def test_matches_character_mapping(self):
+        """Test every alphabet character encodes to its mapped emoji and back"""
+        from app.core.emoji_encoder import EMOJI_MAP, _codec
+        alphabet = "".join(EMOJI_MAP)
+        assert _codec.encode(alphabet) == "".join(EMOJI_MAP.values())
+        assert _codec.decode("".join(EMOJI_MAP.values())) == alphabet
+
+    def test_whitespace_ignored(self):
+        """Test line breaks and spaces from chat apps are dropped"""
+        emoji_str = EmojiEncoder.encode(self.PAYLOAD)
+        wrapped = "\n".join(emoji_str[i:i + 20] for i in range(0, len(emoji_str), 20))
+        assert EmojiEncoder.decode(f"  {wrapped}\r\n") == EmojiEncoder.decode(emoji_str)
+
+    @pytest.mark.parametrize("intruder", ["A", "😎", "🍏", "⭑", "️"])
+    def test_foreign_characters_rejected(self, intruder):
+        """Test raw ASCII, look-alike and neighbouring codepoints are refused"""
+        emoji_str = EmojiEncoder.encode(self.PAYLOAD, version=1)
+        tampered = emoji_str[:10] + intruder + emoji_str[10:]
+        with pytest.raises(ValueError, match="Invalid emoji characters"):
+            EmojiEncoder.decode(tampered)
+
+    def test_large_payload_roundtrip(self):
+        """Test a file-sized payload round-trips"""
+        import base64
+        import os
+        payload = dict(self.PAYLOAD, ciphertext=base64.b64encode(os.urandom(300_000)).decode())
+        assert EmojiEncoder.decode(EmojiEncoder.encode(payload, version=1))["ciphertext"] == payload["ciphertext"]
+
+    def test_no_stdout_output(self, capsys):
+        """Test encode/decode no longer print debug output"""
+        EmojiEncoder.decode(EmojiEncoder.encode(self.PAYLOAD))
+        assert capsys.readouterr().out == ""
+
+
+class TestDenseFormat:
+    """Test the v2 (10 bits per emoji) format"""
+
+    PAYLOAD = TestBulkCodec.PAYLOAD
+
+    def test_alphabet(self):
+        """Test the alphabet is 1024 distinct assigned codepoints without the markers"""
+        import unicodedata
+        from app.core.emoji_encoder import DENSE_ALPHABET, DENSE_MARKER, DENSE_TRIM
+        assert len(set(DENSE_ALPHABET)) == 1024
+        assert DENSE_MARKER not in DENSE_ALPHABET and DENSE_TRIM not in DENSE_ALPHABET
+        assert all(unicodedata.name(char, None) for char in DENSE_ALPHABET)
+        assert not any(0x1F3FB <= ord(char) <= 0x1F3FF for char in DENSE_ALPHABET)
+
+    @pytest.mark.parametrize("size", range(12))
+    def test_bytes_roundtrip(self, size):
+        """Test every final block length, including the 4-byte trimmed case"""
+        import os
+        from app.core.emoji_encoder import _dense_codec
+        data = os.urandom(size)
+        assert _dense_codec.decode(_dense_codec.encode(data)) == data
+
+    def test_default_is_dense_and_shorter(self):
+        """Test v2 is the default, carries all fields and is ~40% shorter than v1"""
+        payload = dict(
+            self.PAYLOAD,
+            kdf_params={"iterations": 600000},
+            cipher="chacha20-poly1305",
+            compression="zlib"
+        )
+        dense = EmojiEncoder.encode(payload)
+        assert dense.startswith("🧬")
+        assert EmojiEncoder.decode(dense) == payload
+        assert len(dense) < 0.7 * len(EmojiEncoder.encode(payload, version=1))
+
+    def test_v1_still_decodes(self):
+        """Test decode auto-detects the older format"""
+        assert EmojiEncoder.decode(EmojiEncoder.encode(self.PAYLOAD, version=1)) == self.PAYLOAD
+
+    def test_variation_selectors_ignored(self):
+        """Test U+FE0F added by keyboards and chat apps is dropped"""
+        emoji_str = EmojiEncoder.encode(self.PAYLOAD)
+        decorated = "\ufe0f".join(emoji_str)
+        assert EmojiEncoder.decode(decorated) == self.PAYLOAD
+
+    @pytest.mark.parametrize("intruder", ["A", "🏻", "🧬", "\ud800"])
+    def test_foreign_characters_rejected(self, intruder):
+        """Test characters outside the alphabet are refused"""
+        emoji_str = EmojiEncoder.encode(self.PAYLOAD)
+        with pytest.raises(ValueError, match="Invalid emoji characters"):
+            EmojiEncoder.decode(emoji_str[:10] + intruder + emoji_str[10:])
+
+    def test_truncation_detected(self):
+        """Test a cut-off message fails to decode"""
+        emoji_str = EmojiEncoder.encode(self.PAYLOAD)
+        with pytest.raises(ValueError):
+            EmojiEncoder.decode(emoji_str[:-3])
+
+    def test_stats_count_every_emoji(self):
+        """Test stats count the marker and alphabet emoji"""
+        emoji_str = EmojiEncoder.encode(self.PAYLOAD)
+        assert EmojiEncoder.get_emoji_stats(emoji_str)["emoji_count"] == len(emoji_str)
+
+    def test_v1_refuses_multi_recipient(self):
+        """Test key-slot payloads need the dense format"""
+        payload = {"mode": "envelope", "ciphertext": "AAAA", "nonce": "AAAA", "tag": "AAAA", "key_slots": []}
+        with pytest.raises(ValueError, match="version 2"):
+            EmojiEncoder.encode(payload, version=1)
+
+
+class TestStreamingCodec:
+    """Test incremental dense encoding/decoding"""
+
+    @pytest.mark.parametrize("size", [0, 4, 9, 1000, 65537])
+    def test_chunked_matches_one_shot(self, size):
+        """Test encode_chunks/decode_chunks agree with the one-shot codec for any split"""
+        import os
+        from app.core.emoji_encoder import _dense_codec, decode_chunks, dense_length, encode_chunks
+        data = os.urandom(size)
+        pieces = [data[i:i + 333] for i in range(0, size, 333)]
+        text = "".join(encode_chunks(pieces))
+        assert text == _dense_codec.encode(data)
+        assert len(text) == dense_length(size)
+
+        text_pieces = [text[i:i + 7] for i in range(0, len(text), 7)]
+        assert b"".join(decode_chunks(text_pieces)) == data
+
+    def test_reader(self):
+        """Test EmojiStreamReader exposes decoded bytes as a binary file"""
+        import io
+        import os
+        from app.core.emoji_encoder import EmojiStreamReader, _dense_codec
+        data = os.urandom(10_000)
+        text = _dense_codec.encode(data)
+        wrapped = "\n".join(text[i:i + 50] for i in range(0, len(text), 50))
+        reader = EmojiStreamReader(io.BytesIO(wrapped.encode("utf-8")), read_size=101)
+        assert reader.read(3) + reader.read() == data
+
+    def test_data_after_end_marker_rejected(self):
+        """Test emoji appended after the trim marker are refused"""
+        from app.core.emoji_encoder import EmojiStreamDecoder, _dense_codec
+        text = _dense_codec.encode(b"abcd")  # ends with the trim marker
+        decoder = EmojiStreamDecoder()
+        decoder.decode(text)
+        with pytest.raises(ValueError):
+            decoder.decode("🎁")
@@ -2,8 +2,14 @@
 Tests for encryption engine
 """
 
+import asyncio
+import time
+
 import pytest
 from app.core.encryption import EncryptionEngine
+from app.core.config import settings
+from app.core.executor import CryptoExecutor, CryptoTimeoutError
+from app.core.kdf import calibrate_argon2, normalize_params
 
 
 class TestEncryptionEngine:
@@ -79,3 +85,297 @@ class TestEncryptionEngine:
         
         decrypted = engine.decrypt(encrypted, password)
         assert decrypted == plaintext
+
+    def test_async_encrypt_decrypt(self):
+        """Test async variants round-trip through the crypto worker pool"""
+        engine = EncryptionEngine()
+        plaintext = "Async message"
+        password = "TestPassword123"
+
+        async def roundtrip():
+            encrypted = await engine.encrypt_async(plaintext, password)
+            return await engine.decrypt_async(encrypted, password)
+
+        assert asyncio.run(roundtrip()) == plaintext
+
+    def test_async_bytes_compatible_with_sync(self):
+        """Test async file encryption output decrypts with the sync API"""
+        engine = EncryptionEngine()
+        data = b"\x00\x01binary\xff"
+
+        encrypted = asyncio.run(engine.encrypt_bytes_async(data, "pw"))
+        assert engine.decrypt_bytes(encrypted, "pw") == data
+
+        with pytest.raises(ValueError):
+            asyncio.run(engine.decrypt_bytes_async(encrypted, "wrong"))
+
+
+class TestCryptoExecutor:
+    """Test the bounded crypto worker pool"""
+
+    def test_run_returns_result(self):
+        """Test work is executed in the pool"""
+        executor = CryptoExecutor(max_workers=2)
+        try:
+            assert asyncio.run(executor.run(sum, [1, 2, 3])) == 6
+        finally:
+            executor.shutdown()
+
+    def test_timeout(self):
+        """Test tasks exceeding the timeout raise CryptoTimeoutError"""
+        executor = CryptoExecutor(max_workers=1, timeout=0.05)
+        try:
+            with pytest.raises(CryptoTimeoutError):
+                asyncio.run(executor.run(time.sleep, 0.5))
+        finally:
+            executor.shutdown()
+
+    def test_timed_out_task_keeps_slot(self):
+        """Test a timed-out job holds its slot (and reports its future) until it finishes"""
+        executor = CryptoExecutor(max_workers=1, timeout=0.05)
+        jobs = []
+
+        async def scenario():
+            with pytest.raises(CryptoTimeoutError):
+                await executor.run_tracked(jobs.append, time.sleep, 0.3)
+            assert not jobs[0].done()
+            # The only slot is still taken, so the next job times out waiting for it
+            with pytest.raises(CryptoTimeoutError):
+                await executor.run(sum, [1])
+            await jobs[0]
+            assert await executor.run(sum, [1]) == 1
+
+        try:
+            asyncio.run(scenario())
+        finally:
+            executor.shutdown()
+
+
+class TestBatchEncryption:
+    """Test batch encryption with a single key derivation"""
+
+    def test_encrypt_many_items_decrypt_individually(self):
+        """Test each batch item decrypts with the regular API"""
+        engine = EncryptionEngine()
+        messages = ["first", "second", "ünïcödé"]
+
+        items = engine.encrypt_many(messages, "BatchPassword")
+
+        assert len(items) == 3
+        assert len({item["nonce"] for item in items}) == 3
+        assert [engine.decrypt(item, "BatchPassword") for item in items] == messages
+
+    def test_decrypt_many_derives_once_per_salt(self, monkeypatch):
+        """Test decrypt_many runs the KDF once for a batch"""
+        engine = EncryptionEngine(kdf_algorithm="pbkdf2")
+        items = engine.encrypt_many(["a", "b", "c"], "pw")
+
+        calls = []
+        original = engine.derive_key
+        monkeypatch.setattr(engine, "derive_key", lambda *args: calls.append(1) or original(*args))
+
+        assert engine.decrypt_many(items, "pw") == ["a", "b", "c"]
+        assert len(calls) == 1
+
+    def test_decrypt_many_reports_failing_item(self):
+        """Test a tampered item is reported by index"""
+        engine = EncryptionEngine(kdf_algorithm="pbkdf2")
+        items = engine.encrypt_many(["a", "b"], "pw")
+        items[1]["tag"] = items[0]["tag"]
+
+        with pytest.raises(ValueError, match="Item 1"):
+            engine.decrypt_many(items, "pw")
+
+
+class TestKDFParameters:
+    """Test self-describing KDF parameters"""
+
+    def test_payload_records_params(self):
+        """Test payloads embed the KDF parameters used"""
+        engine = EncryptionEngine()
+        encrypted = engine.encrypt("hello", "pw")
+        assert encrypted["kdf_params"] == engine.kdf_params()
+
+    def test_decrypt_honours_payload_params(self, monkeypatch):
+        """Test retuning settings does not break existing ciphertexts"""
+        engine = EncryptionEngine()
+        encrypted = engine.encrypt("tuned", "pw")
+
+        monkeypatch.setattr(settings, "ARGON2_TIME_COST", 1)
+        monkeypatch.setattr(settings, "ARGON2_MEMORY_COST", 32768)
+        # The budget must still cover the old cost (the default scales with the setting)
+        monkeypatch.setattr(settings, "KDF_MEMORY_BUDGET", 65536)
+        assert engine.decrypt(encrypted, "pw") == "tuned"
+
+    def test_legacy_payload_uses_original_defaults(self, monkeypatch):
+        """Test payloads without kdf_params decrypt with the original parameters"""
+        engine = EncryptionEngine()
+        encrypted = engine.encrypt("legacy", "pw")
+        del encrypted["kdf_params"]
+
+        monkeypatch.setattr(settings, "ARGON2_TIME_COST", 3)
+        assert engine.decrypt(encrypted, "pw") == "legacy"
+
+    def test_rejects_out_of_range_params(self):
+        """Test hostile KDF parameters are refused before deriving"""
+        engine = EncryptionEngine()
+        encrypted = engine.encrypt("x", "pw")
+        encrypted["kdf_params"] = {"time_cost": 2, "memory_cost": 2 ** 31, "parallelism": 4}
+
+        with pytest.raises(ValueError, match="out of accepted range"):
+            engine.decrypt(encrypted, "pw")
+
+    @pytest.mark.parametrize("kdf, params", [
+        ("argon2", {"time_cost": 64, "memory_cost": 65536, "parallelism": 4}),
+        ("argon2", {"time_cost": 2, "memory_cost": 1024 * 1024, "parallelism": 4}),
+        ("argon2", {"time_cost": 2, "memory_cost": 65536, "parallelism": 255}),
+        ("pbkdf2", {"iterations": 10_000_000}),
+    ])
+    def test_rejects_costs_beyond_settings(self, kdf, params):
+        """Test payload costs far above the configured ones are refused"""
+        with pytest.raises(ValueError, match="out of accepted range"):
+            normalize_params(kdf, params)
+
+    def test_memory_bounded_by_admission_budget(self, monkeypatch):
+        """Test Argon2 memory above the KDF budget is refused even within the cost factor"""
+        params = {"time_cost": 2, "memory_cost": 131072, "parallelism": 4}
+        monkeypatch.setattr(settings, "KDF_MEMORY_BUDGET", 262144)
+        assert normalize_params("argon2", params) == params
+        monkeypatch.setattr(settings, "KDF_MEMORY_BUDGET", 65536)
+        with pytest.raises(ValueError, match="out of accepted range"):
+            normalize_params("argon2", params)
+
+    def test_calibrate_argon2(self):
+        """Test calibration returns usable parameters"""
+        result = calibrate_argon2(target_ms=5, max_memory_kib=19456, parallelism=1)
+        assert result["time_cost"] >= 1
+        assert result["memory_cost"] == 19456
+        assert normalize_params("argon2", result) == {
+            "time_cost": result["time_cost"],
+            "memory_cost": 19456,
+            "parallelism": 1
+        }
+
+
+class TestEnvelopeEncryption:
+    """Test envelope mode (wrapped data key) and rewrap"""
+
+    @pytest.fixture
+    def engine(self):
+        return EncryptionEngine(kdf_algorithm="pbkdf2")
+
+    def test_envelope_roundtrip(self, engine):
+        """Test envelope payloads decrypt through the regular entry points"""
+        encrypted = engine.encrypt_bytes(b"\x00binary\xff", "pw", envelope=True)
+        assert encrypted["mode"] == "envelope"
+        assert "salt" not in encrypted and len(encrypted["key_slots"]) == 1
+        assert engine.decrypt_bytes(encrypted, "pw") == b"\x00binary\xff"
+
+        text = engine.encrypt_bytes("héllo".encode("utf-8"), "pw", envelope=True)
+        assert engine.decrypt(text, "pw") == "héllo"
+
+    def test_envelope_wrong_password(self, engine):
+        """Test a wrong password fails on the key slot"""
+        encrypted = engine.encrypt_bytes(b"data", "pw", envelope=True)
+        with pytest.raises(ValueError):
+            engine.decrypt_bytes(encrypted, "other")
+        with pytest.raises(ValueError, match="wrong password"):
+            engine.decrypt(encrypted, "other")
+
+    def test_rewrap_keeps_content(self, engine):
+        """Test rewrap changes only the key slot"""
+        encrypted = engine.encrypt_bytes(b"large file" * 1000, "old", envelope=True)
+        rewrapped = engine.rewrap(encrypted, "old", "new")
+
+        for field in ("ciphertext", "nonce", "tag", "cipher", "mode"):
+            assert rewrapped[field] == encrypted[field]
+        assert rewrapped["key_slots"][0]["salt"] != encrypted["key_slots"][0]["salt"]
+        assert engine.decrypt_bytes(rewrapped, "new") == b"large file" * 1000
+        with pytest.raises(ValueError):
+            engine.decrypt_bytes(rewrapped, "old")
+
+    def test_rewrap_upgrades_kdf(self, engine):
+        """Test rewrap records the current KDF settings in the new slot"""
+        encrypted = engine.encrypt_bytes(b"data", "pw", envelope=True)
+        upgraded = EncryptionEngine().rewrap(encrypted, "pw", "pw")
+        assert upgraded["key_slots"][0]["kdf"] == "argon2"
+        assert engine.decrypt_bytes(upgraded, "pw") == b"data"
+
+    def test_rewrap_rejects_bad_input(self, engine):
+        """Test rewrap refuses wrong passwords and non-envelope payloads"""
+        encrypted = engine.encrypt_bytes(b"data", "pw", envelope=True)
+        with pytest.raises(ValueError, match="wrong password"):
+            engine.rewrap(encrypted, "nope", "new")
+        with pytest.raises(ValueError, match="envelope"):
+            engine.rewrap(engine.encrypt_bytes(b"data", "pw"), "pw", "new")
+
+    def test_async_envelope_and_rewrap(self, engine):
+        """Test async paths interoperate with the sync ones"""
+        async def scenario():
+            encrypted = await engine.encrypt_bytes_async(b"async", "pw", envelope=True)
+            rewrapped = await engine.rewrap_async(encrypted, "pw", "new")
+            return await engine.decrypt_bytes_async(rewrapped, "new"), rewrapped
+
+        plaintext, rewrapped = asyncio.run(scenario())
+        assert plaintext == b"async"
+        assert engine.decrypt_bytes(rewrapped, "new") == b"async"
+
+
+class TestMultiRecipient:
+    """Test payloads with one key slot per password"""
+
+    @pytest.fixture
+    def engine(self):
+        return EncryptionEngine(kdf_algorithm="pbkdf2")
+
+    def test_any_password_decrypts(self, engine):
+        """Test each recipient's password opens the single ciphertext"""
+        encrypted = engine.encrypt_bytes(b"shared file", ["alpha", "beta", "gamma"])
+        assert len(encrypted["key_slots"]) == 3
+        for password in ("alpha", "beta", "gamma"):
+            assert engine.decrypt_bytes(encrypted, password) == b"shared file"
+        with pytest.raises(ValueError):
+            engine.decrypt_bytes(encrypted, "delta")
+
+    def test_text_recipients(self, engine):
+        """Test encrypt() with a password list round-trips text"""
+        encrypted = engine.encrypt("hi team", ["a", "b"])
+        assert engine.decrypt(encrypted, "b") == "hi team"
+
+    def test_decrypt_derives_once(self, engine, monkeypatch):
+        """Test the right slot is found with one KDF run and one unwrap"""
+        encrypted = engine.encrypt_bytes(b"x", [f"pw{i}" for i in range(8)])
+        derivations, unwraps = [], []
+        derive, unwrap = engine.derive_key, engine._unwrap_key
+        monkeypatch.setattr(engine, "derive_key", lambda *a, **k: derivations.append(1) or derive(*a, **k))
+        monkeypatch.setattr(engine, "_unwrap_key", lambda *a: unwraps.append(1) or unwrap(*a))
+
+        assert engine.decrypt_bytes(encrypted, "pw6") == b"x"
+        assert len(derivations) == 1
+        assert len(unwraps) == 1
+
+    def test_rewrap_one_recipient(self, engine):
+        """Test rewrap replaces only the caller's slot"""
+        encrypted = engine.encrypt_bytes(b"x", ["alpha", "beta"])
+        rewrapped = engine.rewrap(encrypted, "beta", "beta2")
+        assert rewrapped["key_slots"][0] == encrypted["key_slots"][0]
+        assert engine.decrypt_bytes(rewrapped, "alpha") == b"x"
+        assert engine.decrypt_bytes(rewrapped, "beta2") == b"x"
+        with pytest.raises(ValueError):
+            engine.decrypt_bytes(rewrapped, "beta")
+
+    def test_recipient_limit(self, engine, monkeypatch):
+        """Test password lists and slot lists are bounded"""
+        monkeypatch.setattr(settings, "MAX_RECIPIENTS", 2)
+        with pytest.raises(ValueError, match="Too many passwords"):
+            engine.encrypt_bytes(b"x", ["a", "b", "c"])
+
+        encrypted = engine.encrypt_bytes(b"x", ["a", "b"])
+        encrypted["key_slots"].append(encrypted["key_slots"][0])
+        with pytest.raises(ValueError, match="Too many key slots"):
+            engine.decrypt_bytes(encrypted, "a")
+
+    def test_async_recipients(self, engine):
+        """Test async encryption derives every recipient key"""
+        encrypted = asyncio.run(engine.encrypt_bytes_async(b"async", ["a", "b"]))
+        assert asyncio.run(engine.decrypt_bytes_async(encrypted, "b")) == b"async"
@@ -0,0 +1,69 @@
+"""
+Tests for the packed binary payload format
+"""
+
+import json
+
+import pytest
+
+from app.core import envelope
+from app.core.encryption import EncryptionEngine
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return EncryptionEngine(kdf_algorithm="pbkdf2")
+
+
+class TestEnvelope:
+    """Test pack/unpack round-trips and validation"""
+
+    def test_roundtrip_and_decrypt(self, engine):
+        """Test a packed payload unpacks to the same dict and still decrypts"""
+        encrypted = engine.encrypt("attack at dawn", "pw")
+        unpacked = envelope.unpack(envelope.pack(encrypted))
+        assert unpacked == encrypted
+        assert engine.decrypt(unpacked, "pw") == "attack at dawn"
+
+    def test_multi_recipient_roundtrip(self, engine):
+        """Test key slots survive packing"""
+        encrypted = engine.encrypt("standup at 10", ["one", "two"])
+        unpacked = envelope.loads(envelope.dumps(encrypted))
+        assert unpacked == encrypted
+        assert engine.decrypt(unpacked, "two") == "standup at 10"
+
+    def test_legacy_payload_fields_stay_absent(self):
+        """Test payloads without kdf params or cipher do not gain them"""
+        legacy = {"ciphertext": "AAAA", "salt": "AAAA", "nonce": "AAAA", "tag": "AAAA", "kdf": "argon2"}
+        assert envelope.unpack(envelope.pack(legacy)) == legacy
+
+    def test_smaller_than_json(self, engine):
+        """Test the packed text form is much smaller than the JSON dict"""
+        encrypted = engine.encrypt("x" * 64, "pw")
+        assert len(envelope.dumps(encrypted)) < 0.6 * len(json.dumps(encrypted))
+
+    @pytest.mark.parametrize("cut", [1, 5, 12])
+    def test_truncated_rejected(self, engine, cut):
+        """Test cut-off headers are refused"""
+        packed = envelope.pack(engine.encrypt("hello", "pw"))
+        with pytest.raises(ValueError):
+            envelope.unpack(packed[:cut])
+
+    def test_bad_magic_and_version(self, engine):
+        """Test foreign data and unknown versions are refused"""
+        packed = envelope.pack(engine.encrypt("hello", "pw"))
+        with pytest.raises(ValueError, match="not a SecureCom"):
+            envelope.unpack(b"XX" + packed[2:])
+        with pytest.raises(ValueError, match="version"):
+            envelope.unpack(packed[:2] + b"\x09" + packed[3:])
+
+    def test_missing_field(self):
+        """Test incomplete payloads raise ValueError"""
+        with pytest.raises(ValueError, match="missing"):
+            envelope.pack({"ciphertext": "AAAA", "nonce": "AAAA", "tag": "AAAA"})
+
+    def test_trailing_data_rejected(self, engine):
+        """Test bytes appended after the ciphertext are refused"""
+        packed = envelope.pack(engine.encrypt("hello", "pw"))
+        with pytest.raises(ValueError, match="extra data"):
+            envelope.unpack(packed + b"\x00")
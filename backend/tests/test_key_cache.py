@@ -0,0 +1,57 @@
+"""
+Tests for the derived-key cache
+"""
+
+import asyncio
+import time
+
+from app.core.encryption import EncryptionEngine
+from app.core.key_cache import DerivedKeyCache
+
+PARAMS = {"iterations": 1000}
+
+
+class TestDerivedKeyCache:
+    """Test LRU/TTL behaviour of the derived-key cache"""
+
+    def test_hit_and_miss(self):
+        """Test lookups are keyed by password, salt and params"""
+        cache = DerivedKeyCache(max_entries=4, ttl=60)
+        cache.put("pw", b"salt", "pbkdf2", PARAMS, b"k" * 32)
+
+        assert cache.get("pw", b"salt", "pbkdf2", PARAMS) == b"k" * 32
+        assert cache.get("other", b"salt", "pbkdf2", PARAMS) is None
+        assert cache.get("pw", b"salt", "pbkdf2", {"iterations": 2000}) is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 2
+
+    def test_lru_eviction_zeroizes(self):
+        """Test the least recently used key is evicted and wiped"""
+        cache = DerivedKeyCache(max_entries=2, ttl=60)
+        cache.put("a", b"s", "pbkdf2", PARAMS, b"a" * 32)
+        stored = next(iter(cache._entries.values()))[0]
+        cache.put("b", b"s", "pbkdf2", PARAMS, b"b" * 32)
+        cache.get("a", b"s", "pbkdf2", PARAMS)
+        cache.put("c", b"s", "pbkdf2", PARAMS, b"c" * 32)
+
+        assert cache.get("b", b"s", "pbkdf2", PARAMS) is None
+        assert cache.get("a", b"s", "pbkdf2", PARAMS) == b"a" * 32
+        cache.clear()
+        assert stored == bytearray(32)
+
+    def test_ttl_expiry(self):
+        """Test entries expire after the TTL"""
+        cache = DerivedKeyCache(max_entries=2, ttl=0.01)
+        cache.put("pw", b"s", "pbkdf2", PARAMS, b"k" * 32)
+        time.sleep(0.02)
+        assert cache.get("pw", b"s", "pbkdf2", PARAMS) is None
+
+    def test_engine_repeat_decrypt_hits_cache(self):
+        """Test repeat decryptions reuse the derived key"""
+        engine = EncryptionEngine(key_cache=DerivedKeyCache(max_entries=8, ttl=60))
+        encrypted = engine.encrypt("cached", "pw")
+
+        assert engine.decrypt(encrypted, "pw") == "cached"
+        assert asyncio.run(engine.decrypt_async(encrypted, "pw")) == "cached"
+        assert engine.key_cache.stats()["hits"] == 1
+        assert engine.key_cache.stats()["misses"] == 1
@@ -0,0 +1,50 @@
+"""
+Tests for QR image rendering and caching
+"""
+
+import pytest
+
+from app.core.qr_images import QRImageCache, render_qr
+
+
+class TestRenderQR:
+    """Test on-demand rendering"""
+
+    def test_formats(self):
+        """Test PNG and SVG output"""
+        assert render_qr("https://example.com/qr/abc").startswith(b"\x89PNG")
+        assert b"<svg" in render_qr("https://example.com/qr/abc", "svg")
+
+    def test_invalid_options(self):
+        """Test unknown formats, levels and sizes are rejected"""
+        with pytest.raises(ValueError):
+            render_qr("x", "gif")
+        with pytest.raises(ValueError):
+            render_qr("x", error_correction="Z")
+        with pytest.raises(ValueError):
+            render_qr("x", box_size=0)
+
+
+class TestQRImageCache:
+    """Test the rendered image LRU"""
+
+    def test_hits_and_etag(self):
+        """Test repeated lookups are served from the cache with a stable ETag"""
+        cache = QRImageCache(max_entries=4)
+        first = cache.get("https://example.com/qr/abc")
+        second = cache.get("https://example.com/qr/abc")
+        assert first is second
+        assert first.etag.startswith('"') and first.etag.endswith('"')
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_eviction(self):
+        """Test the least recently used image is evicted"""
+        cache = QRImageCache(max_entries=2)
+        cache.get("a")
+        cache.get("b")
+        cache.get("a")
+        cache.get("c")
+        assert cache.stats()["size"] == 2
+        cache.get("b")
+        assert cache.stats()["misses"] == 4
@@ -0,0 +1,102 @@
+"""
+Tests for QR token repository queries
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.sweeper import TokenSweeper
+from app.db.models import QRToken
+from app.db.repositories import QRTokenRepository
+from tests.conftest import TestingAsyncSessionLocal, async_engine
+
+
+def add_token(db, token="t" * 43, hours=1, viewed_at=None):
+    db.add(QRToken(
+        token=token,
+        payload=b"{}",
+        expires_at=datetime.utcnow() + timedelta(hours=hours),
+        viewed=viewed_at is not None,
+        viewed_at=viewed_at
+    ))
+    db.commit()
+    return token
+
+
+def run(scenario):
+    """Run a coroutine taking a repository over a fresh async session"""
+    async def main():
+        async with TestingAsyncSessionLocal() as db:
+            return await scenario(QRTokenRepository(db))
+    return asyncio.run(main())
+
+
+class TestConsume:
+    """Test atomic single-use consumption"""
+
+    @pytest.mark.parametrize("returning", [True, False])
+    def test_single_use(self, db_session, monkeypatch, returning):
+        """Test only the first consume releases the message (with and without RETURNING)"""
+        monkeypatch.setattr(async_engine.dialect, "update_returning", returning)
+        token = add_token(db_session)
+
+        async def scenario(tokens):
+            first = await tokens.consume(token)
+            second = await tokens.consume(token)
+            return first, second, await tokens.reason(token), await tokens.get(token)
+
+        first, second, reason, row = run(scenario)
+        assert first.payload == b"{}"
+        assert second is None
+        assert reason == "already viewed"
+        assert row.viewed_at is not None
+
+    def test_concurrent_viewers(self, db_session):
+        """Test exactly one of several concurrent consumes succeeds"""
+        token = add_token(db_session)
+
+        async def consume():
+            async with TestingAsyncSessionLocal() as db:
+                return await QRTokenRepository(db).consume(token)
+
+        async def main():
+            return await asyncio.gather(*(consume() for _ in range(5)))
+
+        results = asyncio.run(main())
+        assert sum(result is not None for result in results) == 1
+
+    def test_expired_and_missing(self, db_session):
+        """Test expired and unknown tokens are not consumed"""
+        token = add_token(db_session, hours=-1)
+
+        async def scenario(tokens):
+            return (
+                await tokens.consume(token), await tokens.reason(token),
+                (await tokens.get(token)).viewed,
+                await tokens.consume("missing"), await tokens.reason("missing")
+            )
+
+        assert run(scenario) == (None, "expired", False, None, "not found")
+
+
+class TestSweeper:
+    """Test batched purging of expired and consumed tokens"""
+
+    def test_sweep(self, db_session):
+        """Test long-expired and long-viewed tokens are purged in batches, recent ones kept"""
+        for i in range(5):
+            add_token(db_session, token=f"expired{i}", hours=-2)
+        add_token(db_session, token="just-expired", hours=-0.5)
+        add_token(db_session, token="valid")
+        add_token(db_session, token="viewed", viewed_at=datetime.utcnow() - timedelta(hours=2))
+        add_token(db_session, token="just-viewed", viewed_at=datetime.utcnow())
+
+        sweeper = TokenSweeper(interval=0, batch_size=2, viewed_grace=3600,
+                               session_factory=TestingAsyncSessionLocal)
+        assert asyncio.run(sweeper.sweep()) == 6
+
+        remaining = {t.token for t in db_session.query(QRToken).all()}
+        assert remaining == {"valid", "just-expired", "just-viewed"}
+        assert sweeper.stats()["purged_total"] == 6
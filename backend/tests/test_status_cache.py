@@ -0,0 +1,142 @@
+"""
+Tests for the QR token status cache
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.status_cache import MemoryStatusCache, RedisStatusCache
+
+
+def make_entry(expires_in=3600):
+    now = datetime.utcnow()
+    return {
+        "encrypted_message": {"ciphertext": "x"},
+        "created_at": now,
+        "expires_at": now + timedelta(seconds=expires_in)
+    }
+
+
+async def roundtrip(cache):
+    entry = make_entry()
+    await cache.set("tok", entry)
+    first = await cache.get("tok")
+    await cache.invalidate("tok")
+    return entry, first, await cache.get("tok")
+
+
+async def fill_after_view(cache):
+    """A poll misses and reads the row, a view invalidates, then the poll fills"""
+    assert await cache.get("tok") is None
+    entry = make_entry()
+    await cache.invalidate("tok")
+    await cache.set("tok", entry)
+    return await cache.get("tok")
+
+
+class TestMemoryStatusCache:
+    """Test the in-process backend"""
+
+    def test_roundtrip_and_invalidate(self):
+        """Test entries are served until invalidated"""
+        cache = MemoryStatusCache(max_entries=8, ttl=60)
+        entry, first, after = asyncio.run(roundtrip(cache))
+        assert first == entry
+        assert after is None
+        assert cache.stats()["hits"] == 1
+
+    def test_fill_after_invalidate_ignored(self):
+        """Test a stale fill racing a view does not re-cache the token"""
+        cache = MemoryStatusCache(max_entries=8, ttl=60)
+        assert asyncio.run(fill_after_view(cache)) is None
+        assert cache.stats()["tombstones"] == 1
+
+    def test_tombstones_expire(self):
+        """Test tombstones are dropped after one TTL"""
+        async def scenario():
+            cache = MemoryStatusCache(max_entries=8, ttl=0.05)
+            await cache.invalidate("tok")
+            await asyncio.sleep(0.1)
+            await cache.set("tok", make_entry())
+            return cache, await cache.get("tok")
+
+        cache, entry = asyncio.run(scenario())
+        assert entry is not None
+        assert cache.stats()["tombstones"] == 0
+
+    def test_tombstones_bounded(self):
+        """Test invalidations alone prune expired tombstones and never exceed max_entries"""
+        async def scenario():
+            cache = MemoryStatusCache(max_entries=4, ttl=0.05)
+            for i in range(3):
+                await cache.invalidate(f"old{i}")
+            await asyncio.sleep(0.1)
+            await cache.invalidate("fresh")
+            pruned = cache.stats()["tombstones"]
+            for i in range(10):
+                await cache.invalidate(f"burst{i}")
+            return pruned, cache.stats()["tombstones"]
+
+        assert asyncio.run(scenario()) == (1, 4)
+
+    def test_ttl_and_expiry_cap(self):
+        """Test entries expire after the TTL and never outlive the token"""
+        async def scenario():
+            cache = MemoryStatusCache(max_entries=8, ttl=0.05)
+            await cache.set("short", make_entry())
+            await cache.set("expired", make_entry(expires_in=-1))
+            await asyncio.sleep(0.1)
+            return await cache.get("short"), await cache.get("expired")
+
+        assert asyncio.run(scenario()) == (None, None)
+
+    def test_eviction(self):
+        """Test the least recently used entry is evicted"""
+        async def scenario():
+            cache = MemoryStatusCache(max_entries=2, ttl=60)
+            for token in ("a", "b", "c"):
+                await cache.set(token, make_entry())
+            return [await cache.get(token) is not None for token in ("a", "b", "c")]
+
+        assert asyncio.run(scenario()) == [False, True, True]
+
+
+class TestRedisStatusCache:
+    """Test the shared backend against a Redis-protocol stand-in"""
+
+    def test_roundtrip_and_invalidate(self):
+        """Test entries survive serialization and invalidation is shared"""
+        fakeredis = pytest.importorskip("fakeredis")
+        server = fakeredis.FakeServer()
+        worker_a = RedisStatusCache(fakeredis.FakeAsyncRedis(server=server), ttl=60)
+        worker_b = RedisStatusCache(fakeredis.FakeAsyncRedis(server=server), ttl=60)
+
+        async def scenario():
+            entry = make_entry()
+            await worker_a.set("tok", entry)
+            seen_by_b = await worker_b.get("tok")
+            await worker_b.invalidate("tok")
+            return entry, seen_by_b, await worker_a.get("tok")
+
+        entry, seen_by_b, after = asyncio.run(scenario())
+        assert seen_by_b == entry
+        assert after is None
+
+    def test_fill_after_invalidate_ignored(self):
+        """Test a stale fill on one worker racing a view on another does not re-cache the token"""
+        fakeredis = pytest.importorskip("fakeredis")
+        cache = RedisStatusCache(fakeredis.FakeAsyncRedis(), ttl=60)
+        assert asyncio.run(fill_after_view(cache)) is None
+        assert cache.stats()["misses"] == 2
+
+    def test_errors_fall_back(self):
+        """Test an unreachable Redis is treated as a miss"""
+        class Broken:
+            async def get(self, key):
+                raise ConnectionError("down")
+
+        cache = RedisStatusCache(Broken(), ttl=60)
+        assert asyncio.run(cache.get("tok")) is None
+        assert cache.stats()["errors"] == 1
@@ -0,0 +1,133 @@
+"""
+Tests for the chunked streaming AEAD format
+"""
+
+import io
+import os
+
+import pytest
+from app.core.encryption import EncryptionEngine
+from app.core import streaming
+
+
+def encrypt_to_bytes(engine, data, password, chunk_size=16, metadata=b""):
+    out = io.BytesIO()
+    engine.encrypt_stream(io.BytesIO(data), out, password, metadata=metadata, chunk_size=chunk_size)
+    return out.getvalue()
+
+
+def decrypt_from_bytes(engine, blob, password):
+    out = io.BytesIO()
+    metadata = engine.decrypt_stream(io.BytesIO(blob), out, password)
+    return out.getvalue(), metadata
+
+
+class TestStreaming:
+    """Test streaming encryption and decryption"""
+
+    @pytest.fixture
+    def engine(self):
+        return EncryptionEngine(kdf_algorithm="pbkdf2")
+
+    @pytest.mark.parametrize("size", [0, 1, 15, 16, 17, 64, 100])
+    def test_roundtrip_sizes(self, engine, size):
+        """Test round-trip across chunk boundaries, including empty input"""
+        data = os.urandom(size)
+        blob = encrypt_to_bytes(engine, data, "pw")
+        assert decrypt_from_bytes(engine, blob, "pw") == (data, b"")
+
+    def test_metadata_roundtrip(self, engine):
+        """Test header metadata is returned on decrypt"""
+        blob = encrypt_to_bytes(engine, b"content", "pw", metadata=b'{"filename": "a.txt"}')
+        assert decrypt_from_bytes(engine, blob, "pw") == (b"content", b'{"filename": "a.txt"}')
+
+    def test_argon2_roundtrip(self):
+        """Test the default Argon2 KDF parameters travel in the header"""
+        engine = EncryptionEngine()
+        blob = encrypt_to_bytes(engine, b"x" * 40, "pw")
+        assert decrypt_from_bytes(engine, blob, "pw")[0] == b"x" * 40
+
+    def test_wrong_password(self, engine):
+        """Test wrong password fails on the first chunk"""
+        blob = encrypt_to_bytes(engine, b"secret data", "pw")
+        with pytest.raises(ValueError, match="wrong password"):
+            decrypt_from_bytes(engine, blob, "other")
+
+    def test_truncation_detected(self, engine):
+        """Test dropping the final chunk is detected"""
+        data = os.urandom(48)
+        blob = encrypt_to_bytes(engine, data, "pw")
+        block = 16 + streaming.TAG_SIZE
+        with pytest.raises(ValueError):
+            decrypt_from_bytes(engine, blob[:-block], "pw")
+
+    def test_reorder_detected(self, engine):
+        """Test swapping two chunks is detected"""
+        data = os.urandom(48)
+        blob = encrypt_to_bytes(engine, data, "pw")
+        block = 16 + streaming.TAG_SIZE
+        header_len = len(blob) - 3 * block
+        header, chunks = blob[:header_len], blob[header_len:]
+        swapped = header + chunks[block:2 * block] + chunks[:block] + chunks[2 * block:]
+        with pytest.raises(ValueError):
+            decrypt_from_bytes(engine, swapped, "pw")
+
+    def test_trailing_data_detected(self, engine):
+        """Test data appended after the final chunk is detected"""
+        blob = encrypt_to_bytes(engine, os.urandom(32), "pw")
+        with pytest.raises(ValueError):
+            decrypt_from_bytes(engine, blob + b"extra", "pw")
+
+    def test_header_tamper_detected(self, engine):
+        """Test header edits fail authentication"""
+        blob = bytearray(encrypt_to_bytes(engine, b"data", "pw", metadata=b"name"))
+        blob[-(4 + streaming.TAG_SIZE + 1)] ^= 1  # flip a metadata byte
+        with pytest.raises(ValueError):
+            decrypt_from_bytes(engine, bytes(blob), "pw")
+
+    def test_rejects_non_stream_input(self, engine):
+        """Test garbage input is rejected before key derivation"""
+        with pytest.raises(ValueError, match="not a SecureCom"):
+            decrypt_from_bytes(engine, b"not an encrypted file at all, definitely", "pw")
+
+
+class TestParallelStreaming:
+    """Test parallel chunk processing matches the sequential format"""
+
+    def test_parallel_output_matches_sequential(self):
+        """Test parallel sealing produces the same bytes for the same header and key"""
+        header = streaming.StreamHeader(
+            kdf="pbkdf2", kdf_params={"iterations": 1000}, salt=os.urandom(16),
+            base_nonce=os.urandom(7), chunk_size=64, metadata=b"meta"
+        )
+        key = os.urandom(32)
+        data = os.urandom(64 * 50 + 7)
+        sequential = b"".join(streaming.encrypt_chunks(io.BytesIO(data), key, header, workers=1))
+        parallel = b"".join(streaming.encrypt_chunks(io.BytesIO(data), key, header, workers=4))
+        assert parallel == sequential
+
+        body = io.BytesIO(sequential)
+        streaming.StreamHeader.read(body)
+        assert b"".join(streaming.decrypt_chunks(body, key, header, workers=4)) == data
+
+    def test_cross_mode_roundtrip(self):
+        """Test files from a parallel engine decrypt sequentially and vice versa"""
+        parallel = EncryptionEngine(kdf_algorithm="pbkdf2", parallelism=4)
+        sequential = EncryptionEngine(kdf_algorithm="pbkdf2", parallelism=1)
+        data = os.urandom(1000)
+        assert decrypt_from_bytes(sequential, encrypt_to_bytes(parallel, data, "pw"), "pw")[0] == data
+        assert decrypt_from_bytes(parallel, encrypt_to_bytes(sequential, data, "pw"), "pw")[0] == data
+
+    def test_parallel_reports_first_failing_chunk(self):
+        """Test tampering is reported for the earliest bad chunk, after the good prefix"""
+        engine = EncryptionEngine(kdf_algorithm="pbkdf2", parallelism=4)
+        blob = bytearray(encrypt_to_bytes(engine, os.urandom(16 * 20), "pw"))
+        block = 16 + streaming.TAG_SIZE
+        blob[-block * 12] ^= 1
+        blob[-block * 3] ^= 1
+        _, chunks = engine.open_stream(io.BytesIO(bytes(blob)), "pw")
+        received = []
+        with pytest.raises(ValueError, match="chunk 8 "):
+            for chunk in chunks:
+                received.append(chunk)
+        assert len(received) == 8